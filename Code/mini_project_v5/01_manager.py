@@ -7,7 +7,8 @@ from protocol import (
     TaskAssignment,
     TaskAcceptance,
     TaskCompletion,
-    NodeUpdate
+    NodeUpdate,
+    PathUpdate
 )
 import random
 import time
@@ -15,6 +16,8 @@ import uuid
 import os
 import glob
 from typing import Dict, List, Optional
+from route import load_map_node_names
+from manager_routing import CFP_MAX_TRAVEL_TIME, OBJECTIVE_WEIGHTS, ManagerRouting
 
 # Clean up any corrupted storage files before starting
 def cleanup_old_storage():
@@ -41,26 +44,13 @@ cleanup_old_storage()
 
 # File path for map
 MAP_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\map.txt"
+VEHICLES_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\vehicles.txt"
 
 def load_nodes_from_map(map_file_path: str) -> List[str]:
-    """Load all node names from the map.txt file"""
-    nodes = []
+    """Load all node names from the map.txt file (via its compiled map when current)"""
     try:
-        with open(map_file_path, 'r') as file:
-            print(f"Loading nodes from: {map_file_path}")
-            for line in file:
-                line = line.strip()
-                if line:
-                    # Parse the format: {{"Node1", {250,50}},["Node2","Node3","Node4","Node5","Node6"]}.
-                    # Find the node name (between first two quotes)
-                    node_start = line.find('"') + 1
-                    if node_start > 0:
-                        node_end = line.find('"', node_start)
-                        if node_end > node_start:
-                            node_name = line[node_start:node_end]
-                            nodes.append(node_name)
-                            print(f"  Found node: {node_name}")
-        
+        print(f"Loading nodes from: {map_file_path}")
+        nodes = load_map_node_names(map_file_path)
         print(f"Loaded {len(nodes)} nodes from map file")
         return nodes
     
@@ -94,6 +84,9 @@ VEHICLE_ADDRESSES = {
     3: 'agent1q0lw72pj974rt4z5ea29zxqm32mpcjwqyexj6mwx8mady6l8ueafkxzvzr2',
 }
 
+# CFP pre-filter and planned-path decoding
+routing = ManagerRouting(MAP_FILE, VEHICLES_FILE, ALL_NODES)
+
 try:
     # Create manager agent
     manager = Agent(
@@ -170,15 +163,22 @@ async def send_call_for_proposal(ctx: Context):
     task_id = str(uuid.uuid4())[:8]
     destination = random.choice(DESTINATION_NODES)
     
+    recipients = routing.cfp_recipients(destination, VEHICLE_ADDRESSES)
+    if not recipients:
+        ctx.logger.warning(f"No vehicle can reach {destination} within {CFP_MAX_TRAVEL_TIME} time units - task skipped")
+        return
+    
     ctx.storage.set("current_task_id", task_id)
     ctx.storage.set("current_destination", destination)
     ctx.storage.set("proposals", {})
     ctx.storage.set("awaiting_responses", True)
     ctx.storage.set("last_cfp_time", time.time())
+    ctx.storage.set("cfp_recipients", len(recipients))
     
     cfp = CallForProposal(
         destination_node=destination,
-        task_id=task_id
+        task_id=task_id,
+        objective_weights=OBJECTIVE_WEIGHTS
     )
     
     ctx.logger.info("="*60)
@@ -186,8 +186,8 @@ async def send_call_for_proposal(ctx: Context):
     ctx.logger.info(f"Destination: {destination}")
     ctx.logger.info("="*60)
     
-    # Send to all vehicles
-    for vehicle_id, address in VEHICLE_ADDRESSES.items():
+    # Send to all (pre-filtered) vehicles
+    for vehicle_id, address in recipients.items():
         ctx.logger.info(f"Sending CFP to Vehicle {vehicle_id}")
         await ctx.send(address, cfp)
 
@@ -202,6 +202,8 @@ async def handle_proposal(ctx: Context, sender: str, msg: ProposalResponse):
         ctx.logger.info(f"Ignoring proposal for old task {msg.task_id}")
         return
     
+    routing.update_vehicle_location(msg.vehicle_id, msg.current_node)
+    
     # Store the proposal (convert to dict for JSON storage)
     proposals = ctx.storage.get("proposals") or {}
     proposals[msg.vehicle_id] = msg.dict()   # ✅ use dict instead of raw object
@@ -212,14 +214,15 @@ async def handle_proposal(ctx: Context, sender: str, msg: ProposalResponse):
     ctx.logger.info(f"  Current location: {msg.current_node}")
     if not msg.is_busy and msg.estimated_time:
         ctx.logger.info(f"  Estimated time: {msg.estimated_time:.2f} time units")
-        if msg.planned_path:
-            ctx.logger.info(f"  Path: {' → '.join(msg.planned_path)}")
+        planned_path = routing.decode_message_path(msg)
+        if planned_path:
+            ctx.logger.info(f"  Path: {' → '.join(planned_path)}")
     
     # Check if we've received all proposals or if timeout reached
     last_cfp_time = ctx.storage.get("last_cfp_time")
     response_timeout = 5.0
     
-    if len(proposals) >= len(VEHICLE_ADDRESSES) or \
+    if len(proposals) >= (ctx.storage.get("cfp_recipients") or len(VEHICLE_ADDRESSES)) or \
        (time.time() - last_cfp_time) > response_timeout:
         await evaluate_proposals(ctx)
 
@@ -290,8 +293,9 @@ async def handle_task_acceptance(ctx: Context, sender: str, msg: TaskAcceptance)
     
     if msg.accepted:
         ctx.logger.info(f"Task {msg.task_id} accepted by Vehicle {msg.vehicle_id}")
-        if msg.planned_path:
-            ctx.logger.info(f"Execution path: {' → '.join(msg.planned_path)}")
+        planned_path = routing.decode_message_path(msg)
+        if planned_path:
+            ctx.logger.info(f"Execution path: {' → '.join(planned_path)}")
     else:
         ctx.logger.warning(f"Task {msg.task_id} rejected by Vehicle {msg.vehicle_id}")
 
@@ -319,9 +323,17 @@ async def handle_task_completion(ctx: Context, sender: str, msg: TaskCompletion)
     
     ctx.logger.info(f"Total completed tasks: {len(completed_tasks)}")
 
+@protocol.on_message(model=PathUpdate)
+async def handle_path_update(ctx: Context, sender: str, msg: PathUpdate):
+    """Handle a vehicle rerouting its active task"""
+    planned_path = routing.decode_message_path(msg)
+    if planned_path:
+        ctx.logger.info(f"Vehicle {msg.vehicle_id} rerouted task {msg.task_id}: {' → '.join(planned_path)}")
+
 @protocol.on_message(model=NodeUpdate)
 async def handle_node_update(ctx: Context, sender: str, msg: NodeUpdate):
     """Handle position updates from vehicles"""
+    routing.update_vehicle_location(msg.vehicle_id, msg.current_node)
     ctx.logger.info(f"Vehicle {msg.vehicle_id} position update: {msg.current_node} (Progress: {msg.progress:.0f}%)")
 
 # Include protocol in agent
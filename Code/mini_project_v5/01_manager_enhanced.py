@@ -11,7 +11,8 @@ from protocol import (
     TaskAssignment,
     TaskAcceptance,
     TaskCompletion,
-    NodeUpdate
+    NodeUpdate,
+    PathUpdate
 )
 import asyncio
 import random
@@ -21,6 +22,8 @@ import os
 import glob
 import json
 from typing import Dict, List, Optional
+from route import load_map_node_names
+from manager_routing import CFP_MAX_TRAVEL_TIME, OBJECTIVE_WEIGHTS, ManagerRouting
 from datetime import datetime
 from collections import defaultdict
 
@@ -47,24 +50,13 @@ cleanup_old_storage()
 
 # File path for map
 MAP_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\map.txt"
+VEHICLES_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\vehicles.txt"
 
 def load_nodes_from_map(map_file_path: str) -> List[str]:
-    """Load all node names from the map.txt file"""
-    nodes = []
+    """Load all node names from the map.txt file (via its compiled map when current)"""
     try:
-        with open(map_file_path, 'r') as file:
-            print(f"Loading nodes from: {map_file_path}")
-            for line in file:
-                line = line.strip()
-                if line:
-                    node_start = line.find('"') + 1
-                    if node_start > 0:
-                        node_end = line.find('"', node_start)
-                        if node_end > node_start:
-                            node_name = line[node_start:node_end]
-                            nodes.append(node_name)
-                            print(f"  Found node: {node_name}")
-        
+        print(f"Loading nodes from: {map_file_path}")
+        nodes = load_map_node_names(map_file_path)
         print(f"Loaded {len(nodes)} nodes from map file")
         return nodes
     
@@ -92,6 +84,9 @@ VEHICLE_ADDRESSES = {
     3: 'agent1q0lw72pj974rt4z5ea29zxqm32mpcjwqyexj6mwx8mady6l8ueafkxzvzr2',
 }
 
+# CFP pre-filter and planned-path decoding
+routing = ManagerRouting(MAP_FILE, VEHICLES_FILE, ALL_NODES)
+
 try:
     manager = Agent(
         name="manager",
@@ -281,6 +276,12 @@ async def send_call_for_proposal(ctx: Context):
     # Generate new task
     task_id = str(uuid.uuid4())[:8]
     destination = random.choice(DESTINATION_NODES)
+    
+    recipients = routing.cfp_recipients(destination, VEHICLE_ADDRESSES)
+    if not recipients:
+        ctx.logger.warning(f"No vehicle can reach {destination} within {CFP_MAX_TRAVEL_TIME} time units - task skipped")
+        return
+    
     cfp_timestamp = time.time()
     
     # Update destination metrics
@@ -293,7 +294,7 @@ async def send_call_for_proposal(ctx: Context):
         "destination": destination,
         "cfp_timestamp": cfp_timestamp,
         "cfp_datetime": datetime.fromtimestamp(cfp_timestamp).isoformat(),
-        "vehicles_contacted": list(VEHICLE_ADDRESSES.keys()),
+        "vehicles_contacted": list(recipients.keys()),
         "status": "cfp_sent"
     }
     
@@ -307,6 +308,7 @@ async def send_call_for_proposal(ctx: Context):
     ctx.storage.set("awaiting_responses", True)
     ctx.storage.set("last_cfp_time", cfp_timestamp)
     ctx.storage.set("current_cfp_timestamp", cfp_timestamp)
+    ctx.storage.set("cfp_recipients", len(recipients))
     
     # Update message count
     message_count = ctx.storage.get("message_count") or state.message_count
@@ -321,14 +323,15 @@ async def send_call_for_proposal(ctx: Context):
     ctx.logger.info(f"📣 CALL FOR PROPOSAL #{tasks_sent_count}/{max_tasks}")
     ctx.logger.info(f"Task ID: {task_id}")
     ctx.logger.info(f"Destination: {destination}")
-    ctx.logger.info(f"Vehicles contacted: {len(VEHICLE_ADDRESSES)}")
+    ctx.logger.info(f"Vehicles contacted: {len(recipients)}")
     ctx.logger.info("="*60)
     
     # Send CFP to all vehicles
     cfp = CallForProposal(
         task_id=task_id,
         destination_node=destination,
-        timestamp=cfp_timestamp
+        timestamp=cfp_timestamp,
+        objective_weights=OBJECTIVE_WEIGHTS
     )
 
     '''
@@ -338,7 +341,7 @@ async def send_call_for_proposal(ctx: Context):
     '''
     
     send_tasks = []
-    for vehicle_id, address in VEHICLE_ADDRESSES.items():
+    for vehicle_id, address in recipients.items():
         send_tasks.append(ctx.send(address, cfp))  # Queue all sends
         ctx.logger.info(f"  → Sent to Vehicle {vehicle_id}")  # Log immediately
 
@@ -357,6 +360,8 @@ async def handle_proposal(ctx: Context, sender: str, msg: ProposalResponse):
     proposal_timestamp = time.time()
     cfp_timestamp = ctx.storage.get("current_cfp_timestamp")
     
+    routing.update_vehicle_location(msg.vehicle_id, msg.current_node)
+    
     # Calculate response time
     response_time = proposal_timestamp - cfp_timestamp if cfp_timestamp else 0
     
@@ -407,14 +412,15 @@ async def handle_proposal(ctx: Context, sender: str, msg: ProposalResponse):
         
         if msg.estimated_time:
             ctx.logger.info(f"   Estimated time: {msg.estimated_time:.2f} time units")
-            if msg.planned_path:
-                ctx.logger.info(f"   Path: {' → '.join(msg.planned_path)}")
+            planned_path = routing.decode_message_path(msg)
+            if planned_path:
+                ctx.logger.info(f"   Path: {' → '.join(planned_path)}")
     
     # Check if all responses received or timeout
     last_cfp_time = ctx.storage.get("last_cfp_time")
     response_timeout = 10.0
     
-    if len(proposals) >= len(VEHICLE_ADDRESSES) or \
+    if len(proposals) >= (ctx.storage.get("cfp_recipients") or len(VEHICLE_ADDRESSES)) or \
        (time.time() - last_cfp_time) > response_timeout:
         await evaluate_proposals(ctx)
 
@@ -485,8 +491,9 @@ async def evaluate_proposals(ctx: Context):
         ctx.logger.info(f"Task ID: {ctx.storage.get('current_task_id')}")
         ctx.logger.info(f"Destination: {destination}")
         ctx.logger.info(f"Estimated time: {best_proposal.estimated_time:.2f}")
-        if best_proposal.planned_path:
-            ctx.logger.info(f"Planned path: {' → '.join(best_proposal.planned_path)}")
+        planned_path = routing.decode_message_path(best_proposal)
+        if planned_path:
+            ctx.logger.info(f"Planned path: {' → '.join(planned_path)}")
         ctx.logger.info("="*60)
     
     # Record allocation decision
@@ -541,15 +548,16 @@ async def handle_task_acceptance(ctx: Context, sender: str, msg: TaskAcceptance)
         ctx.logger.info("="*60)
         ctx.logger.info(f"✅ TASK ACCEPTED by Vehicle {msg.vehicle_id}")
         ctx.logger.info(f"Task ID: {msg.task_id}")
-        if msg.planned_path:
-            ctx.logger.info(f"Planned path: {' → '.join(msg.planned_path)}")
+        planned_path = routing.decode_message_path(msg)
+        if planned_path:
+            ctx.logger.info(f"Planned path: {' → '.join(planned_path)}")
         ctx.logger.info("="*60)
         
         # Update active assignment with acceptance time
         active_assignments = ctx.storage.get("active_assignments") or {}
         if msg.task_id in active_assignments:
             active_assignments[msg.task_id]["acceptance_timestamp"] = time.time()
-            active_assignments[msg.task_id]["planned_path"] = msg.planned_path
+            active_assignments[msg.task_id]["planned_path"] = planned_path
             ctx.storage.set("active_assignments", active_assignments)
     else:
         ctx.logger.warning("="*60)
@@ -646,9 +654,23 @@ async def handle_task_completion(ctx: Context, sender: str, msg: TaskCompletion)
         ctx.storage.set("export_triggered", True)
         export_all_metrics(ctx)
 
+@protocol.on_message(model=PathUpdate)
+async def handle_path_update(ctx: Context, sender: str, msg: PathUpdate):
+    """Handle a vehicle rerouting its active task (e.g. around a closed road)"""
+    planned_path = routing.decode_message_path(msg)
+    if not planned_path:
+        return
+    ctx.logger.info(f"🔀 Vehicle {msg.vehicle_id} rerouted task {msg.task_id}: {' → '.join(planned_path)}")
+    
+    active_assignments = ctx.storage.get("active_assignments") or {}
+    if msg.task_id in active_assignments:
+        active_assignments[msg.task_id]["planned_path"] = planned_path
+        ctx.storage.set("active_assignments", active_assignments)
+
 @protocol.on_message(model=NodeUpdate)
 async def handle_node_update(ctx: Context, sender: str, msg: NodeUpdate):
     """Handle position updates with tracking"""
+    routing.update_vehicle_location(msg.vehicle_id, msg.current_node)
     
     # Update message count
     message_count = ctx.storage.get("message_count") or state.message_count
@@ -7,14 +7,19 @@ from protocol import (
     TaskAssignment,
     TaskAcceptance,
     TaskCompletion,
-    NodeUpdate
+    NodeUpdate,
+    PathUpdate
 )
 import asyncio
 import json
+import logging
 import sys
 import time
 from typing import Optional, List, Dict
-from route import VehicleRoutingSystem
+from routing_log import ArrowPath, get_logger, install_dump_signal
+from vehicle_routing import VehicleRouter
+
+log = get_logger('vehicle')
 
 # === Import vehicle number ===
 vehicle_number = int(sys.argv[1]) if len(sys.argv) > 1 else 1
@@ -34,6 +39,12 @@ ROUTING_PRIORITY = vehicle_number
 # File paths - same as test_dt_2.py
 MAP_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\map.txt"
 VEHICLES_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\vehicles.txt"
+# Optional time-dependent travel-time profiles (see route.iter_profile_file); ETAs use
+# distance / speed when the file is missing
+PROFILE_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\traffic_profiles.txt"
+# Optional road conditions (see route.iter_road_conditions_file), re-read whenever it changes;
+# a road set to an infinite distance is closed and the vehicle switches to a cached alternative
+ROAD_CONDITIONS_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\road_conditions.txt"
 
 # Manager address
 MANAGER_ADDRESS = "agent1qfjcg2h5c2d2qkzksc8wntkpcyflntz0w8lsh2q6nwqpe6a2dn5ps88aqq3"
@@ -58,7 +69,9 @@ class VehicleState:
         self.connected = False
         
         # Initialize routing system
-        self.routing_system = VehicleRoutingSystem(MAP_FILE, VEHICLES_FILE)
+        self.router = VehicleRouter(vehicle_id, ROUTING_PRIORITY, MAP_FILE, VEHICLES_FILE, PROFILE_FILE,
+                                    ROAD_CONDITIONS_FILE)
+        self.routing_system = self.router.routing_system
         
         # State variables
         self.current_node: str = None
@@ -70,6 +83,12 @@ class VehicleState:
         self.progress: float = 0
         self.executing_full_path: bool = False
         self.waiting_for_completion: bool = False
+        # destination -> k-shortest paths from CFPs; alternatives for the active route
+        self.alternative_paths: Dict[str, List[List[str]]] = {}
+        self.alternatives: List[List[str]] = []
+        # task_id -> objective weights from CFPs; criterion the active route was planned for
+        self.task_objectives: Dict[str, Dict[str, float]] = {}
+        self.route_criterion = self.router.route_criterion()
         
         # Message handling
         self.pending_acks = {}
@@ -94,10 +113,10 @@ class VehicleState:
         self.routing_system.update_vehicle_location(self.vehicle_id, vehicle_start)
         self.current_node = vehicle_start
         
-        print(f"[Vehicle {self.vehicle_id}] Initialized from vehicles.txt")
-        print(f"  Starting location: {vehicle_start}")
-        print(f"  Speed: {vehicle_speed} units/time")
-        print(f"  Routing Priority: {ROUTING_PRIORITY}")
+        log.info("[Vehicle %s] Initialized from vehicles.txt", self.vehicle_id)
+        log.info("  Starting location: %s", vehicle_start)
+        log.info("  Speed: %s units/time", vehicle_speed)
+        log.info("  Routing Priority: %s", ROUTING_PRIORITY)
 
 state = VehicleState(vehicle_number)
 
@@ -106,13 +125,13 @@ async def connect_to_dt():
     try:
         state.reader, state.writer = await asyncio.open_connection(DT_HOST, state.port)
         state.connected = True
-        print(f"[Vehicle {vehicle_number}] Connected to Digital Twin on port {state.port}")
+        log.info("[Vehicle %s] Connected to Digital Twin on port %s", vehicle_number, state.port)
         
         # Start listening for updates from Digital Twin
         asyncio.create_task(listen_for_dt_updates())
         
     except Exception as e:
-        print(f"[Vehicle {vehicle_number}] Failed to connect to Digital Twin: {e}")
+        log.error("[Vehicle %s] Failed to connect to Digital Twin: %s", vehicle_number, e)
         state.connected = False
 
 async def listen_for_dt_updates():
@@ -125,7 +144,7 @@ async def listen_for_dt_updates():
                 continue
                 
             if not data:
-                print(f"[Vehicle {vehicle_number}] Digital Twin disconnected")
+                log.warning("[Vehicle %s] Digital Twin disconnected", vehicle_number)
                 state.connected = False
                 break
                 
@@ -141,23 +160,25 @@ async def listen_for_dt_updates():
                     if state.pending_acks:
                         for event in state.pending_acks.values():
                             event.set()
-                    print(f"[Vehicle {vehicle_number}] Task acknowledgment received")
+                    log.debug("[Vehicle %s] Task acknowledgment received", vehicle_number)
                     
                 # Handle processed vehicle data from Digital Twin    
                 elif response.get("type") == "vehicle_data":
                     await process_vehicle_data(response.get("data", {}))
                     
             except json.JSONDecodeError:
-                print(f"[Vehicle {vehicle_number}] Received invalid JSON: {message}")
+                log.warning("[Vehicle %s] Received invalid JSON: %s", vehicle_number, message)
                 
     except Exception as e:
-        print(f"[Vehicle {vehicle_number}] Listening error: {e}")
+        log.error("[Vehicle %s] Listening error: %s", vehicle_number, e)
     finally:
         state.connected = False
 
 async def process_vehicle_data(data: dict):
     """Process vehicle data from Digital Twin and update state"""
-    print(f"[Vehicle {vehicle_number}] Data from Digital Twin: {json.dumps(data, indent=2)}")
+    # Pretty-printing every update is costly; only build it when debug logging is on
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("[Vehicle %s] Data from Digital Twin: %s", vehicle_number, json.dumps(data, indent=2))
     
     # Update state with processed data
     old_progress = state.progress
@@ -172,7 +193,7 @@ async def process_vehicle_data(data: dict):
         if new_location in state.routing_system.nodes:
             state.routing_system.update_vehicle_location(state.vehicle_id, new_location)
             state.current_node = new_location
-            print(f"[Vehicle {vehicle_number}] Reached waypoint: {new_location}")
+            log.debug("[Vehicle %s] Reached waypoint: %s", vehicle_number, new_location)
             await handle_waypoint_reached(new_location)
     
     state.progress = new_progress
@@ -180,7 +201,7 @@ async def process_vehicle_data(data: dict):
     # Check if we've completed the mission
     if new_progress == 100 and state.executing_full_path:
         if state.current_node == state.final_destination:
-            print(f"[Vehicle {vehicle_number}] MISSION COMPLETED at {state.current_node}")
+            log.info("[Vehicle %s] MISSION COMPLETED at %s", vehicle_number, state.current_node)
             await complete_current_task(success=True)
 
 async def handle_waypoint_reached(current_location: str):
@@ -190,7 +211,7 @@ async def handle_waypoint_reached(current_location: str):
         
     # Check if this is the final destination
     if current_location == state.final_destination:
-        print(f"[Vehicle {vehicle_number}] FINAL DESTINATION REACHED: {current_location}")
+        log.info("[Vehicle %s] FINAL DESTINATION REACHED: %s", vehicle_number, current_location)
         return
     
     # Find current location in the path
@@ -201,13 +222,20 @@ async def handle_waypoint_reached(current_location: str):
         if actual_index >= state.current_path_index:
             state.current_path_index = actual_index
             
-        print(f"[Vehicle {vehicle_number}] Waypoint {actual_index + 1}/{len(state.planned_path)} reached: {current_location}")
+        log.debug("[Vehicle %s] Waypoint %s/%s reached: %s", vehicle_number, actual_index + 1, len(state.planned_path), current_location)
         
         # Continue to next waypoint
         next_index = actual_index + 1
         if next_index < len(state.planned_path):
             next_waypoint = state.planned_path[next_index]
-            print(f"[Vehicle {vehicle_number}] Next waypoint: {next_waypoint}")
+            state.router.refresh()
+            if state.routing_system.get_edge_weight(current_location, next_waypoint, 'distance') == float('inf'):
+                log.warning("[Vehicle %s] Road %s → %s is closed", vehicle_number, current_location, next_waypoint)
+                if switch_to_alternative(current_location):
+                    next_index = 1
+                    next_waypoint = state.planned_path[next_index]
+                    await send_path_update()
+            log.debug("[Vehicle %s] Next waypoint: %s", vehicle_number, next_waypoint)
             
             success = await send_mission_to_dt(next_waypoint)
             if success:
@@ -215,12 +243,44 @@ async def handle_waypoint_reached(current_location: str):
                 state.waiting_for_completion = True
                 
     except ValueError:
-        print(f"[Vehicle {vehicle_number}] ERROR: Location {current_location} not in planned path")
+        log.error("[Vehicle %s] ERROR: Location %s not in planned path", vehicle_number, current_location)
+
+def switch_to_alternative(current_location: str) -> bool:
+    """Replace the planned path with the best open cached alternative from current_location
+
+    Searches again under the current weights when every cached alternative is closed
+    """
+    ranked = state.routing_system.rank_alternatives(state.alternatives, current_location, state.route_criterion)
+    if ranked and len(ranked[0][0]) >= 2:
+        path = ranked[0][0]
+    else:
+        criterion = 'distance' if state.route_criterion == 'time' else state.route_criterion
+        path, cost = state.routing_system.shortest_path(current_location, state.final_destination, criterion)
+        if len(path) < 2 or cost == float('inf'):
+            log.warning("[Vehicle %s] No open route from %s to %s", vehicle_number, current_location, state.final_destination)
+            return False
+    state.planned_path = path
+    state.current_path_index = 0
+    log.info("[Vehicle %s] Switched to alternative path: %s", vehicle_number, ArrowPath(state.planned_path))
+    return True
+
+async def send_path_update():
+    """Tell the manager the active task now follows state.planned_path"""
+    ctx = vehicle._ctx
+    if not ctx or not state.current_task_id:
+        return
+    planned_path, planned_path_ids = state.router.encode_message_path(state.planned_path)
+    await ctx.send(MANAGER_ADDRESS, PathUpdate(
+        task_id=state.current_task_id,
+        vehicle_id=state.vehicle_id,
+        planned_path=planned_path,
+        planned_path_ids=planned_path_ids
+    ))
 
 async def send_mission_to_dt(destination: str) -> bool:
     """Send mission assignment to Digital Twin"""
     if not state.connected or not state.writer:
-        print(f"[Vehicle {vehicle_number}] Not connected to Digital Twin")
+        log.warning("[Vehicle %s] Not connected to Digital Twin", vehicle_number)
         return False
         
     # Update routing system with target location
@@ -242,49 +302,49 @@ async def send_mission_to_dt(destination: str) -> bool:
         state.writer.write(message.encode())
         await state.writer.drain()
         
-        print(f"[Vehicle {vehicle_number}] Sending mission to DT: {destination}")
+        log.debug("[Vehicle %s] Sending mission to DT: %s", vehicle_number, destination)
         
         # Wait for acknowledgment
         try:
             await asyncio.wait_for(ack_event.wait(), timeout=10.0)
-            print(f"[Vehicle {vehicle_number}] Mission to {destination} assigned successfully")
+            log.debug("[Vehicle %s] Mission to %s assigned successfully", vehicle_number, destination)
             return True
                 
         except asyncio.TimeoutError:
-            print(f"[Vehicle {vehicle_number}] Mission assignment timeout")
+            log.warning("[Vehicle %s] Mission assignment timeout", vehicle_number)
             return False
         finally:
             state.pending_acks.pop(request_id, None)
             
     except Exception as e:
-        print(f"[Vehicle {vehicle_number}] Mission assignment error: {e}")
+        log.error("[Vehicle %s] Mission assignment error: %s", vehicle_number, e)
         return False
 
-async def plan_and_execute_route(destination: str) -> bool:
+async def plan_and_execute_route(destination: str, objective_weights: Optional[Dict[str, float]] = None) -> bool:
     """Plan optimal route and start execution"""
     
     # Use vehicle-specific routing
-    optimal_path_data = state.routing_system.find_optimal_path_for_vehicle(
-        state.vehicle_id,
-        destination, 
-        ROUTING_PRIORITY
-    )
+    optimal_path_data = await state.router.find_route(destination, objective_weights, start=state.current_node)
     
     if not optimal_path_data:
-        print(f"[Vehicle {vehicle_number}] No optimal path found to {destination}")
+        log.warning("[Vehicle %s] No optimal path found to %s", vehicle_number, destination)
         return False
     
     path = optimal_path_data['path']
     
     # Log route details
-    print(f"[Vehicle {vehicle_number}] Optimal path: {' → '.join(path)}")
-    print(f"  Distance: {optimal_path_data['distance']:.2f} units")
-    print(f"  Carbon: {optimal_path_data['carbon']:.2f} kg CO2")
-    print(f"  Cost: ${optimal_path_data['cost']:.2f}")
-    print(f"  Travel Time: {optimal_path_data['travel_time']:.2f} time units")
+    log.info("[Vehicle %s] Optimal path: %s", vehicle_number, ArrowPath(path))
+    log.info("  Distance: %.2f units", optimal_path_data['distance'])
+    log.info("  Carbon: %.2f kg CO2", optimal_path_data['carbon'])
+    log.info("  Cost: $%.2f", optimal_path_data['cost'])
+    log.info("  Travel Time: %.2f time units", optimal_path_data['travel_time'])
     
     # Store planned path
     state.planned_path = path
+    state.alternatives = state.alternative_paths.pop(destination, [])
+    state.alternative_paths.clear()
+    state.task_objectives.clear()
+    state.route_criterion = state.router.route_criterion(objective_weights)
     state.final_destination = destination
     state.current_path_index = 0
     state.executing_full_path = True
@@ -292,7 +352,7 @@ async def plan_and_execute_route(destination: str) -> bool:
     # Start with first waypoint (skip current location)
     if len(path) > 1:
         next_waypoint = path[1]
-        print(f"[Vehicle {vehicle_number}] Starting route execution - first waypoint: {next_waypoint}")
+        log.info("[Vehicle %s] Starting route execution - first waypoint: %s", vehicle_number, next_waypoint)
         success = await send_mission_to_dt(next_waypoint)
         
         if success:
@@ -353,6 +413,8 @@ async def handle_cfp(ctx: Context, sender: str, msg: CallForProposal):
     """Handle call for proposal from manager"""
     
     ctx.logger.info(f"Received CFP for task {msg.task_id} to {msg.destination_node}")
+    if state.router.refresh():
+        ctx.logger.info("Routing graph updated (new shared map or road conditions)")
     
     # Prepare response
     response = ProposalResponse(
@@ -369,16 +431,26 @@ async def handle_cfp(ctx: Context, sender: str, msg: CallForProposal):
     
     # If not busy, calculate estimated time
     if not state.is_busy:
+        objective_weights = msg.objective_weights
+        if objective_weights:
+            try:
+                state.routing_system.objective_key(objective_weights, state.vehicle_id)
+            except ValueError as e:
+                ctx.logger.warning(f"Ignoring objective weights for task {msg.task_id}: {e}")
+                objective_weights = None
+        
         # Get optimal path
-        optimal_path_data = state.routing_system.find_optimal_path_for_vehicle(
-            state.vehicle_id,
-            msg.destination_node,
-            ROUTING_PRIORITY
-        )
+        optimal_path_data = await state.router.find_route(msg.destination_node, objective_weights, start=state.current_node)
         
         if optimal_path_data:
+            state.alternative_paths[msg.destination_node] = await state.router.find_alternatives(
+                state.current_node, msg.destination_node, objective_weights
+            )
+            if objective_weights:
+                state.task_objectives[msg.task_id] = objective_weights
+            
             response.estimated_time = optimal_path_data['travel_time']
-            response.planned_path = optimal_path_data['path']
+            response.planned_path, response.planned_path_ids = state.router.encode_message_path(optimal_path_data['path'])
             response.distance = optimal_path_data['distance']
             response.carbon = optimal_path_data['carbon']
             response.cost = optimal_path_data['cost']
@@ -417,14 +489,16 @@ async def handle_assignment(ctx: Context, sender: str, msg: TaskAssignment):
     state.current_task_id = msg.task_id
     
     # Start route execution
-    success = await plan_and_execute_route(msg.destination_node)
+    success = await plan_and_execute_route(msg.destination_node, state.task_objectives.get(msg.task_id))
     
     # Send acceptance
+    planned_path, planned_path_ids = state.router.encode_message_path(state.planned_path if success else None)
     acceptance = TaskAcceptance(
         task_id=msg.task_id,
         vehicle_id=state.vehicle_id,
         accepted=success,
-        planned_path=state.planned_path if success else None
+        planned_path=planned_path,
+        planned_path_ids=planned_path_ids
     )
     await ctx.send(MANAGER_ADDRESS, acceptance)
     
@@ -456,4 +530,6 @@ if __name__ == "__main__":
     print(f"Vehicles file: {VEHICLES_FILE}")
     priority_names = {1: "Shortest Distance", 2: "Lowest Carbon", 3: "Lowest Cost"}
     print(f"Routing Priority: {priority_names.get(ROUTING_PRIORITY, 'Unknown')}")
+    # kill -USR1 <pid> dumps the trace ring buffer (VRS_LOG_RING) to stderr
+    install_dump_signal()
     vehicle.run()
\ No newline at end of file
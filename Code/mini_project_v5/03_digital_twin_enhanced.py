@@ -1,5 +1,6 @@
 import asyncio
 import json
+import os
 import time
 import sys
 import threading
@@ -7,6 +8,7 @@ from paho.mqtt.client import Client as MQTTClient
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional
+from route import VehicleRoutingSystem
 
 # === Import vehicle number ===
 vehicle_number = int(sys.argv[1]) if len(sys.argv) > 1 else 1
@@ -22,6 +24,11 @@ SIM_TOPIC_UPDATE = f"vehicle{vehicle_number}update"                  # simulator
 # TCP (Agent ↔ DT)
 DT_BASE_PORT = 5000  # vehicle1 → 5000, vehicle2 → 5001, ...
 
+# Road network used to snap x/y telemetry onto edges (same files as the agents); without
+# MAP_FILE the DT only reports node-level locations
+MAP_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\map.txt"
+VEHICLES_FILE = r"C:\Users\hhy26\OneDrive - University of Cambridge\Desktop\01_PhD\04_First_Year_Report\00_vehicle_simulator_0.1.2\vehicle_simulator\vehicles.txt"
+
 # === Performance Metrics Configuration ===
 CARBON_PER_UNIT_DISTANCE = 0.12  # kg CO2 per distance unit
 COST_PER_UNIT_DISTANCE = 0.50    # currency per distance unit
@@ -74,6 +81,14 @@ class DigitalTwin:
         # --- TCP connections (agent clients) ---
         self.agent_writers = set()
 
+        # --- Road network for snapping positions (None = node-level only) ---
+        self.network = None
+        if os.path.exists(MAP_FILE) and os.path.exists(VEHICLES_FILE):
+            self.network = VehicleRoutingSystem(MAP_FILE, VEHICLES_FILE)
+            self.network.build_spatial_index()
+        else:
+            print(f"[DigitalTwin {self.vehicle_id}] ⚠️ Map file not found - edge positions disabled")
+
     # ---------- MQTT (Simulator Communication) ----------
     def start_mqtt(self):
         print(f"[DigitalTwin {self.vehicle_id}] Connecting to MQTT broker {MQTT_BROKER}:{MQTT_PORT}")
@@ -339,9 +354,27 @@ class DigitalTwin:
             "conversion_timestamp": time.time(),
             "performance_metrics": self._get_current_metrics()
         }
+        converted_data.update(self._snap_position(raw_data))
         
         return converted_data
 
+    def _snap_position(self, raw_data: dict) -> dict:
+        """Edge, fractional position and remaining edge distance for the x/y telemetry"""
+        x, y = raw_data.get("x_coordinate"), raw_data.get("y_coordinate")
+        if self.network is None or x is None or y is None:
+            return {}
+        snapped = self.network.snap_to_network(x, y, toward=raw_data.get("next_location"))
+        if snapped is None:
+            return {}
+        return {
+            "edge_from": snapped["edge"][0],
+            "edge_to": snapped["edge"][1],
+            "edge_fraction": snapped["fraction"],
+            "remaining_edge_distance": snapped["remaining"],
+            "nearest_node": snapped["node"],
+            "snap_offset": snapped["offset"]
+        }
+
     # ---------- TCP (Agent Communication) ----------
     async def handle_agent(self, reader, writer):
         addr = writer.get_extra_info("peername")
@@ -0,0 +1,63 @@
+# manager_routing.py - Map-derived state shared by the manager agents
+# Both 01_manager*.py entry points build one ManagerRouting from their map: it picks the
+# vehicles a CFP goes to (optionally only those that can reach the destination in time,
+# from their last reported positions) and turns planned paths in vehicle messages back
+# into node-name lists. The settings below therefore apply to every manager.
+#
+# Usage:
+#   from manager_routing import OBJECTIVE_WEIGHTS, ManagerRouting
+#   routing = ManagerRouting(MAP_FILE, VEHICLES_FILE, ALL_NODES)
+#   recipients = routing.cfp_recipients(destination, VEHICLE_ADDRESSES)
+#   planned_path = routing.decode_message_path(msg)
+from typing import Dict, List, Optional
+
+from route import VehicleRoutingSystem, decode_path, node_table_digest
+from routing_log import get_logger
+
+log = get_logger('manager')
+
+# Objective weights sent with every task, e.g. {'time': 1.0, 'carbon': 0.5}
+# (None = each vehicle routes by its own ROUTING_PRIORITY)
+OBJECTIVE_WEIGHTS: Optional[Dict[str, float]] = None
+
+# CFPs only go to vehicles that can reach the destination within this many time units
+# (None = send every CFP to every vehicle)
+CFP_MAX_TRAVEL_TIME: Optional[float] = None
+
+
+class ManagerRouting:
+    """CFP pre-filter and planned-path decoding for one manager"""
+
+    def __init__(self, map_file: str, vehicles_file: str, node_names: List[str]):
+        self.node_names = node_names
+        self.node_table_digest = node_table_digest(node_names)
+        # Road network and last known vehicle positions for the CFP pre-filter
+        self.reachability = (VehicleRoutingSystem(map_file, vehicles_file)
+                             if CFP_MAX_TRAVEL_TIME is not None else None)
+
+    def update_vehicle_location(self, vehicle_id: int, node: Optional[str]):
+        """Record a vehicle's reported position for the CFP pre-filter"""
+        if self.reachability is not None and node:
+            self.reachability.update_vehicle_location(vehicle_id, node)
+
+    def cfp_recipients(self, destination: str, vehicle_addresses: Dict[int, str]) -> Dict[int, str]:
+        """Vehicles to send a CFP for destination: all of them, or those passing the travel-time pre-filter"""
+        if self.reachability is None:
+            return dict(vehicle_addresses)
+        within = self.reachability.vehicles_within_time(destination, CFP_MAX_TRAVEL_TIME, list(vehicle_addresses))
+        return {vehicle_id: address for vehicle_id, address in vehicle_addresses.items() if vehicle_id in within}
+
+    def decode_message_path(self, msg) -> Optional[List[str]]:
+        """Planned path of a proposal / acceptance, decoding planned_path_ids when the vehicle sent those
+
+        Compact messages carry no names, so IDs that do not decode against this manager's
+        node table (a different map, or a corrupt message) are logged as an error and give None.
+        """
+        if msg.planned_path_ids:
+            try:
+                return decode_path(msg.planned_path_ids, self.node_names, self.node_table_digest)
+            except ValueError as e:
+                log.error("Cannot decode planned path from Vehicle %s (was COMPACT_PATHS enabled with a "
+                          "different map?): %s", msg.vehicle_id, e)
+                return None
+        return msg.planned_path
@@ -0,0 +1,181 @@
+# map_generator.py - Synthetic map.txt / vehicles.txt generator for scaling experiments
+# Writes the exact formats parsed by VehicleRoutingSystem:
+#   map.txt:      {{"Node1", {250,50}},["Node2","Node3"]}.
+#   vehicles.txt: {1, 30, "Node1"}.
+#
+# Usage:
+#   python map_generator.py --topology grid --nodes 10000 --vehicles 100 --seed 42
+#   python map_generator.py --topology geometric --nodes 1000000 --vehicles 10000 --map big_map.txt
+import argparse
+import math
+import random
+from typing import List, Tuple
+
+TOPOLOGIES = ('grid', 'geometric', 'hub')
+MIN_NODES, MAX_NODES = 10, 1_000_000
+MIN_VEHICLES, MAX_VEHICLES = 3, 10_000
+
+# Mean spacing between neighbouring nodes, in map units
+NODE_SPACING = 50
+
+
+def generate_grid(node_count: int, rnd: random.Random) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Jittered near-square grid with 4-neighbour streets and a few diagonals"""
+    columns = max(1, math.ceil(math.sqrt(node_count)))
+    coords = []
+    for i in range(node_count):
+        row, col = divmod(i, columns)
+        coords.append((col * NODE_SPACING + rnd.randint(0, NODE_SPACING // 3),
+                       row * NODE_SPACING + rnd.randint(0, NODE_SPACING // 3)))
+
+    edges = []
+    for i in range(node_count):
+        row, col = divmod(i, columns)
+        if col + 1 < columns and i + 1 < node_count:
+            edges.append((i, i + 1))
+        if i + columns < node_count:
+            edges.append((i, i + columns))
+        if col + 1 < columns and i + columns + 1 < node_count and rnd.random() < 0.05:
+            edges.append((i, i + columns + 1))
+    return coords, edges
+
+
+def generate_geometric(node_count: int, rnd: random.Random,
+                       mean_degree: float = 6.0) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Random geometric graph: uniform points joined when closer than a radius
+
+    The radius is chosen for the requested mean degree; isolated points are joined to
+    their nearest neighbour so every node has at least one road
+    """
+    side = int(math.sqrt(node_count) * NODE_SPACING)
+    coords = [(rnd.randint(0, side), rnd.randint(0, side)) for _ in range(node_count)]
+    radius = math.sqrt(mean_degree * side * side / (math.pi * node_count))
+
+    # Bucket points into radius-sized cells so only neighbouring cells are compared
+    cells = {}
+    for i, (x, y) in enumerate(coords):
+        cells.setdefault((int(x // radius), int(y // radius)), []).append(i)
+
+    edges = []
+    radius_sq = radius * radius
+    for i, (x, y) in enumerate(coords):
+        cell_x, cell_y = int(x // radius), int(y // radius)
+        nearest, nearest_sq = -1, float('inf')
+        linked = False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cell_x + dx, cell_y + dy), ()):
+                    if j == i:
+                        continue
+                    dist_sq = (coords[j][0] - x) ** 2 + (coords[j][1] - y) ** 2
+                    if dist_sq <= radius_sq:
+                        linked = True
+                        if j > i:
+                            edges.append((i, j))
+                    elif dist_sq < nearest_sq:
+                        nearest, nearest_sq = j, dist_sq
+        if not linked and nearest != -1:
+            edges.append((min(i, nearest), max(i, nearest)))
+    return coords, edges
+
+
+def generate_hub_and_spoke(node_count: int, rnd: random.Random,
+                           spokes_per_hub: int = 40) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Hubs on a ring with cross links; spoke nodes form short chains out of their hub"""
+    hub_count = max(2, min(node_count // 2, node_count // spokes_per_hub))
+    ring_radius = max(NODE_SPACING, hub_count * NODE_SPACING * 4 / (2 * math.pi))
+    centre = ring_radius + 10 * NODE_SPACING
+
+    coords = []
+    edges = []
+    for h in range(hub_count):
+        angle = 2 * math.pi * h / hub_count
+        coords.append((int(centre + ring_radius * math.cos(angle)), int(centre + ring_radius * math.sin(angle))))
+        edges.append((h, (h + 1) % hub_count))
+    # Cross links between hubs roughly opposite each other on the ring
+    for h in range(0, hub_count // 2, max(1, hub_count // 8)):
+        edges.append((h, h + hub_count // 2))
+
+    # Spokes: chains of nodes leading away from their hub
+    node = hub_count
+    while node < node_count:
+        hub = rnd.randrange(hub_count)
+        hub_x, hub_y = coords[hub]
+        angle = rnd.uniform(0, 2 * math.pi)
+        previous = hub
+        for step in range(1, rnd.randint(1, 8) + 1):
+            if node >= node_count:
+                break
+            distance = step * NODE_SPACING * rnd.uniform(0.8, 1.2)
+            coords.append((int(hub_x + distance * math.cos(angle)), int(hub_y + distance * math.sin(angle))))
+            edges.append((previous, node))
+            previous = node
+            node += 1
+    return coords, edges
+
+
+GENERATORS = {
+    'grid': generate_grid,
+    'geometric': generate_geometric,
+    'hub': generate_hub_and_spoke
+}
+
+
+def write_map(map_file_path: str, coords: List[Tuple[int, int]], edges: List[Tuple[int, int]]):
+    """Write map.txt; each undirected edge is listed once, under its first endpoint"""
+    connections = [[] for _ in coords]
+    for u, v in edges:
+        if u != v:
+            connections[u].append(v)
+
+    with open(map_file_path, 'w') as file:
+        for i, (x, y) in enumerate(coords):
+            neighbours = ','.join(f'"Node{j + 1}"' for j in connections[i])
+            file.write(f'{{{{"Node{i + 1}", {{{x},{y}}}}},[{neighbours}]}}.\n')
+
+
+def write_vehicles(vehicles_file_path: str, vehicle_count: int, node_count: int, rnd: random.Random,
+                   speed_range: Tuple[int, int] = (10, 60)):
+    """Write vehicles.txt with random speeds and start nodes"""
+    with open(vehicles_file_path, 'w') as file:
+        for vehicle_id in range(1, vehicle_count + 1):
+            speed = rnd.randint(*speed_range)
+            start_node = rnd.randrange(node_count) + 1
+            file.write(f'{{{vehicle_id}, {speed}, "Node{start_node}"}}.\n')
+
+
+def generate(topology: str, node_count: int, vehicle_count: int, map_file_path: str,
+             vehicles_file_path: str, seed: int = 42) -> Tuple[int, int]:
+    """Generate and write a map and fleet; returns (nodes, edges) written"""
+    if topology not in GENERATORS:
+        raise ValueError(f"Unknown topology '{topology}'. Available: {list(TOPOLOGIES)}")
+    if not MIN_NODES <= node_count <= MAX_NODES:
+        raise ValueError(f"Node count must be between {MIN_NODES} and {MAX_NODES}")
+    if not MIN_VEHICLES <= vehicle_count <= MAX_VEHICLES:
+        raise ValueError(f"Vehicle count must be between {MIN_VEHICLES} and {MAX_VEHICLES}")
+
+    rnd = random.Random(seed)
+    coords, edges = GENERATORS[topology](node_count, rnd)
+    write_map(map_file_path, coords, edges)
+    write_vehicles(vehicles_file_path, vehicle_count, node_count, rnd)
+    return len(coords), len(edges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic map.txt and vehicles.txt files")
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='grid')
+    parser.add_argument('--nodes', type=int, default=100, help=f"{MIN_NODES} to {MAX_NODES}")
+    parser.add_argument('--vehicles', type=int, default=3, help=f"{MIN_VEHICLES} to {MAX_VEHICLES}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--map', default='map.txt', help="output map file")
+    parser.add_argument('--vehicles-file', default='vehicles.txt', help="output vehicles file")
+    args = parser.parse_args()
+
+    node_count, edge_count = generate(args.topology, args.nodes, args.vehicles, args.map,
+                                      args.vehicles_file, args.seed)
+    print(f"Wrote {args.map}: {node_count} nodes, {edge_count} edges ({args.topology}, seed {args.seed})")
+    print(f"Wrote {args.vehicles_file}: {args.vehicles} vehicles")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 # protocol.py
 from uagents import Model
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class CallForProposal(Model):
     """Manager sends this to all vehicles with the destination node"""
     destination_node: str  # e.g., "Node12"
     task_id: str  # Unique identifier for this task
+    # Per-task weights over 'distance', 'carbon', 'cost', 'time'; None = vehicle's own priority
+    objective_weights: Optional[Dict[str, float]] = None
 
 class ProposalResponse(Model):
     """Vehicle's response to call for proposal with estimated time"""
@@ -18,6 +20,8 @@ class ProposalResponse(Model):
     distance: Optional[float]
     carbon: Optional[float]
     cost: Optional[float]
+    # Same path as route.encode_path_ids text (sent instead of planned_path with COMPACT_PATHS)
+    planned_path_ids: Optional[str] = None
 
 class TaskAssignment(Model):
     """Manager assigns task to selected vehicle"""
@@ -31,6 +35,7 @@ class TaskAcceptance(Model):
     vehicle_id: int
     accepted: bool
     planned_path: Optional[List[str]]
+    planned_path_ids: Optional[str] = None  # see ProposalResponse
 
 class TaskCompletion(Model):
     """Vehicle reports task completion"""
@@ -44,4 +49,10 @@ class NodeUpdate(Model):
     vehicle_id: int
     current_node: str
     next_node: str
-    progress: float
\ No newline at end of file
+    progress: float
+class PathUpdate(Model):
+    """Vehicle reports a new planned path for its active task (e.g. after rerouting around a closed road)"""
+    task_id: str
+    vehicle_id: int
+    planned_path: Optional[List[str]]
+    planned_path_ids: Optional[str] = None  # see ProposalResponse
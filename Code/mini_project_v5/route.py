@@ -1,65 +1,487 @@
+import base64
 import math
 import random
 import heapq
-from collections import defaultdict
-from typing import Dict, List, Tuple, Optional
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict, OrderedDict
+from typing import Dict, Iterator, List, Tuple, Optional, Sequence
+import numpy as np
+from routing_log import ArrowPath, get_logger
 random.seed(42) 
 
+
+log = get_logger('route')
+
+
+class MapParseError(ValueError):
+    """Malformed line in a map.txt file"""
+    
+    def __init__(self, map_file_path: str, line_number: int, line: str, reason: str):
+        self.map_file_path = map_file_path
+        self.line_number = line_number
+        self.line = line
+        super().__init__(f"{map_file_path}:{line_number}: {reason}: {line!r}")
+
+
+# One map.txt line: {{"Node1", {250,50}},["Node2","Node3","Node4","Node5","Node6"]}.
+_MAP_LINE = re.compile(r'\{\{\s*"([^"]*)"\s*,\s*\{\s*(-?\d+)\s*,\s*(-?\d+)\s*\}\s*\}\s*(?:,\s*\[([^\]]*)\])?\s*\}\.?$')
+_QUOTED = re.compile(r'"([^"]*)"')
+
+
+def iter_map_file(map_file_path: str) -> Iterator[Tuple[str, Tuple[int, int], List[str]]]:
+    """Stream (node_name, (x, y), connections) from a map.txt file
+    
+    Raises MapParseError with the line number for any line that does not match the format
+    """
+    with open(map_file_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            match = _MAP_LINE.match(line)
+            if match is None:
+                raise MapParseError(map_file_path, line_number, line, "expected {{\"Name\", {x,y}},[\"Neighbour\",...]}.")
+            name, x, y, connections_str = match.groups()
+            connections = [conn.strip() for conn in _QUOTED.findall(connections_str or '')]
+            yield name.strip(), (int(x), int(y)), [conn for conn in connections if conn]
+
+
+# Time-dependent travel-time profiles (travel-time multipliers by time of day):
+#   {period, 1440}.
+#   {default, [{0,1.0},{420,1.8},{540,1.0}]}.
+#   {"Node1", "Node2", [{0,1.0},{420,2.0},{600,1.0}]}.
+_PROFILE_PERIOD_LINE = re.compile(r'\{\s*period\s*,\s*([0-9.eE+-]+)\s*\}\.?$')
+_PROFILE_LINE = re.compile(r'\{\s*(?:(default)|"([^"]*)"\s*,\s*"([^"]*)")\s*,\s*\[(.*)\]\s*\}\.?$')
+_PROFILE_POINT = re.compile(r'\{\s*([0-9.eE+-]+)\s*,\s*([0-9.eE+-]+)\s*\}')
+DEFAULT_PROFILE_PERIOD = 1440.0
+
+
+def iter_profile_file(profile_file_path: str) -> Iterator[Tuple[str, Optional[Tuple[str, str]], object]]:
+    """Stream ('period', None, value), ('default', None, points) and ('edge', (node1, node2), points)
+    
+    points is a list of (time, multiplier) pairs. Lines starting with '#' are comments.
+    Raises MapParseError with the line number for any malformed line
+    """
+    with open(profile_file_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            match = _PROFILE_PERIOD_LINE.match(line)
+            if match:
+                yield 'period', None, float(match.group(1))
+                continue
+            match = _PROFILE_LINE.match(line)
+            if match is None:
+                raise MapParseError(profile_file_path, line_number, line,
+                                    "expected {\"Node1\", \"Node2\", [{time,multiplier},...]}.")
+            is_default, node1, node2, points_str = match.groups()
+            points = [(float(t), float(f)) for t, f in _PROFILE_POINT.findall(points_str)]
+            if not points or any(f <= 0 for _, f in points):
+                raise MapParseError(profile_file_path, line_number, line, "profile needs positive multipliers")
+            if is_default:
+                yield 'default', None, points
+            else:
+                yield 'edge', (node1.strip(), node2.strip()), points
+
+
+# Road conditions file: current edge weight overrides, e.g. a closed road and a toll.
+# An infinite distance closes the road for every criterion:
+#   {"Node1", "Node2", distance, inf}.
+#   {"Node4", "Node7", cost, 12.5}.
+_ROAD_CONDITION_LINE = re.compile(r'\{\s*"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*(\w+)\s*,\s*(inf|[0-9.eE+-]+)\s*\}\.?$')
+
+
+def iter_road_conditions_file(conditions_file_path: str) -> Iterator[Tuple[str, str, str, float]]:
+    """Stream (node1, node2, weight_type, value) overrides from a road conditions file
+
+    A value of inf closes the road. Lines starting with '#' are comments.
+    Raises MapParseError with the line number for any malformed line
+    """
+    with open(conditions_file_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            match = _ROAD_CONDITION_LINE.match(line)
+            if match is None:
+                raise MapParseError(conditions_file_path, line_number, line,
+                                    "expected {\"Node1\", \"Node2\", weight_type, value}.")
+            node1, node2, weight_type, value = match.groups()
+            value = float(value)
+            if value < 0:
+                raise MapParseError(conditions_file_path, line_number, line, "weight must not be negative")
+            yield node1.strip(), node2.strip(), weight_type, value
+
+
+# Compiled map artifact: magic line, JSON header line, then 8-byte aligned raw arrays
+_COMPILED_MAP_MAGIC = b'VRSMAP1\n'
+_COMPILED_MAP_SECTIONS = (
+    ('node_x', 'd'), ('node_y', 'd'), ('names', 'B'),
+    ('adj_offsets', 'i'), ('adj_targets', 'i'),
+    ('weights_distance', 'd'), ('weights_carbon', 'd'), ('weights_cost', 'd'),
+    ('conn_offsets', 'i'), ('conn_targets', 'i')
+)
+
+
+def _source_signature(map_file_path: str, with_hash: bool = True) -> Dict:
+    """Size, mtime and (optionally) SHA-256 of a map source file"""
+    stat = os.stat(map_file_path)
+    signature = {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(map_file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        signature['source_sha256'] = digest.hexdigest()
+    return signature
+
+
+def write_compiled_map(cache_path: str, map_file_path: str, sections: Dict[str, array],
+                       signature: Dict = None):
+    """Write a compiled map artifact atomically (temp file + rename)
+    
+    signature is the source's _source_signature when the caller already has it
+    """
+    layout = []
+    offset = 0
+    for name, typecode in _COMPILED_MAP_SECTIONS:
+        values = sections[name]
+        layout.append([name, typecode, offset, len(values)])
+        offset += (len(values) * values.itemsize + 7) // 8 * 8
+    
+    header = dict(signature or _source_signature(map_file_path), format='vrs-map-1', sections=layout)
+    header_bytes = _COMPILED_MAP_MAGIC + json.dumps(header).encode('utf-8') + b'\n'
+    header_bytes += b'\0' * (-len(header_bytes) % 8)
+    
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(header_bytes)
+        for name, _ in _COMPILED_MAP_SECTIONS:
+            data = sections[name].tobytes()
+            file.write(data + b'\0' * (-len(data) % 8))
+    os.replace(temp_path, cache_path)
+
+
+def read_compiled_map(cache_path: str, map_file_path: str) -> Optional[Dict[str, array]]:
+    """Load a compiled map, or None if it is missing or out of date with map_file_path
+    
+    The file is mmapped and each section copied into a private array (one sequential read,
+    no parsing). The source is re-hashed only when its size or mtime differ from the
+    recorded ones; if the content still matches (touch, checkout, copy) the artifact is
+    rewritten with the new size and mtime so later loads skip the hash again
+    """
+    refreshed_signature = None
+    try:
+        with open(cache_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped[:len(_COMPILED_MAP_MAGIC)] != _COMPILED_MAP_MAGIC:
+                return None
+            header_end = mapped.find(b'\n', len(_COMPILED_MAP_MAGIC))
+            header = json.loads(mapped[len(_COMPILED_MAP_MAGIC):header_end].decode('utf-8'))
+            data_start = header_end + 1 + (-(header_end + 1) % 8)
+            
+            current = _source_signature(map_file_path, with_hash=False)
+            if (current['source_size'] != header['source_size'] or
+                    current['source_mtime_ns'] != header['source_mtime_ns']):
+                refreshed_signature = _source_signature(map_file_path)
+                if refreshed_signature['source_sha256'] != header['source_sha256']:
+                    return None
+            
+            sections = {}
+            for name, typecode, offset, length in header['sections']:
+                values = array(typecode)
+                start = data_start + offset
+                values.frombytes(mapped[start:start + length * values.itemsize])
+                sections[name] = values
+    except (OSError, ValueError, KeyError):
+        return None
+    
+    if refreshed_signature is not None:
+        try:
+            write_compiled_map(cache_path, map_file_path, sections, refreshed_signature)
+        except OSError as e:
+            log.warning("Warning: Could not refresh compiled map %s: %s", cache_path, e)
+    return sections
+
+
+def array_copy(values) -> array:
+    """Private array with the contents of an array or a typed memoryview (e.g. a shared graph view)"""
+    copy = array(values.format if isinstance(values, memoryview) else values.typecode)
+    copy.frombytes(memoryview(values).cast('B'))
+    return copy
+
+
+def default_map_cache_path(map_file_path: str) -> str:
+    """Compiled map artifact that sits next to map.txt"""
+    return map_file_path + '.vrsmap'
+
+
+def load_map_node_names(map_file_path: str) -> List[str]:
+    """Node names in file order, from the compiled map if it is current, else by streaming map.txt"""
+    sections = read_compiled_map(default_map_cache_path(map_file_path), map_file_path)
+    if sections is not None:
+        return sections['names'].tobytes().decode('utf-8').split('\n') if sections['names'] else []
+    
+    names = {}
+    for name, _, _ in iter_map_file(map_file_path):
+        names[name] = None
+    return list(names)
+
+
+def node_table_digest(node_names: Sequence[str]) -> str:
+    """Short hash of the node table, so encoded node IDs are only decoded against the same map"""
+    return hashlib.sha256('\n'.join(node_names).encode('utf-8')).hexdigest()[:8]
+
+
+def encode_path_ids(node_ids: Sequence[int], digest: str) -> str:
+    """Compact text form of a node-ID path: '<digest>:<base64 of zigzag delta varints>'
+    
+    Consecutive nodes usually have nearby IDs, so most hops take one byte
+    """
+    encoded = bytearray()
+    previous = 0
+    for node_id in node_ids:
+        delta = node_id - previous
+        previous = node_id
+        value = delta * 2 if delta >= 0 else -delta * 2 - 1
+        while value >= 0x80:
+            encoded.append(value & 0x7F | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return f"{digest}:{base64.b64encode(bytes(encoded)).decode('ascii')}"
+
+
+def decode_path_ids(encoded: str, digest: str, node_count: int) -> array:
+    """Node IDs of a path from encode_path_ids
+    
+    Raises ValueError if it was made for another node table, is truncated or malformed,
+    or holds an ID outside 0 <= node_id < node_count
+    """
+    path_digest, _, payload = encoded.partition(':')
+    if path_digest != digest:
+        raise ValueError(f"Path encoded for node table {path_digest}, expected {digest}")
+    node_ids = array('i')
+    node_id = value = shift = 0
+    for byte in base64.b64decode(payload, validate=True):
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            node_id += value >> 1 if not value & 1 else -((value + 1) >> 1)
+            if not 0 <= node_id < node_count:
+                raise ValueError(f"Node ID {node_id} outside the node table (0..{node_count - 1})")
+            node_ids.append(node_id)
+            value = shift = 0
+    if shift:
+        raise ValueError("Truncated encoded path")
+    return node_ids
+
+
+def decode_path(encoded: str, node_names: Sequence[str], digest: str = None) -> List[str]:
+    """Node names of an encoded path, for processes that hold only the node list (e.g. the manager)"""
+    node_ids = decode_path_ids(encoded, digest or node_table_digest(node_names), len(node_names))
+    return [node_names[node_id] for node_id in node_ids]
+
 class VehicleRoutingSystem:
     """Vehicle routing system that loads network data and calculates optimal paths"""
     
-    def __init__(self, map_file_path: str = "map.txt", vehicles_file_path: str = "vehicles.txt"):
+    # Point-to-point search algorithms accepted by set_search_method / shortest_path
+    SEARCH_METHODS = ('dijkstra', 'astar', 'bidirectional_astar', 'ch', 'alt', 'apsp', 'chains')
+    
+    # Display name for each routing criterion ('time' is derived from the other paths)
+    CRITERION_LABELS = {
+        'distance': 'Shortest Distance',
+        'carbon': 'Lowest Carbon Emission',
+        'cost': 'Lowest Cost',
+        'time': 'Fastest Travel Time'
+    }
+    
+    def __init__(self, map_file_path: str = "map.txt", vehicles_file_path: str = "vehicles.txt",
+                 route_cache_size: int = 1024, route_cache_max_bytes: int = 4 * 1024 * 1024,
+                 use_map_cache: bool = True, map_cache_path: str = None, load_network: bool = True):
+        """load_network=False leaves the graph empty for shared_graph.attach() to fill in"""
         self.nodes = {}
         self.connections = defaultdict(list)
         self.edge_weights = {}
+        self._compiled_connections = None
         self.vehicles = {}
         self.map_file_path = map_file_path
         self.vehicles_file_path = vehicles_file_path
+        # Compiled binary map next to map.txt (rebuilt when map.txt changes)
+        self.map_cache_path = (map_cache_path or default_map_cache_path(map_file_path)) if use_map_cache else None
         # Track current locations of vehicles (updated by Digital Twin)
         self.vehicle_current_locations = {}
         # Track target locations of vehicles (set by test_dt script)
         self.vehicle_target_locations = {}
+        # Integer node IDs and CSR adjacency index (built by _build_adjacency_index)
+        self.node_names = []
+        self.node_index = {}
+        self.adj_offsets = array('i', [0])
+        self.adj_targets = array('i')
+        self.adj_weights = {}
+        # Connected component label per node ID and node count per label (see _build_component_index)
+        self.component_labels = array('i')
+        self.component_sizes = array('i')
+        # Bumped by every API that changes the map or edge weights
+        self.graph_version = 0
+        # LRU route cache keyed by (start_node, end_node, criterion)
+        # route_cache_size=0 disables caching, route_cache_max_bytes=0 removes the memory cap
+        self.route_cache = OrderedDict()
+        self.route_cache_size = route_cache_size
+        self.route_cache_max_bytes = route_cache_max_bytes
+        self.route_cache_bytes = 0
+        self.route_cache_version = 0
+        self.route_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        # Search algorithm used by the routing APIs (see SEARCH_METHODS)
+        self.search_method = 'dijkstra'
+        # Node expansion counters, updated by every search
+        self.search_stats = {'searches': 0, 'expanded_nodes': 0, 'last_expanded_nodes': 0}
+        # A* heuristic scale per criterion, cached for one graph version
+        self._heuristic_scales = {}
+        self._heuristic_version = -1
+        # Contraction hierarchies per criterion (see build_contraction_hierarchies)
+        self.contraction_hierarchies = {}
+        # ALT landmarks (node names) and landmark-to-all distance tables per criterion
+        self.landmarks = []
+        self.landmark_tables = {}
+        # All-pairs distance / next-hop matrices per criterion (see build_all_pairs_tables)
+        self.all_pairs_tables = {}
+        # Degree-2 chain contraction of the adjacency index (see build_chain_contraction)
+        self.chain_contraction = None
+        # Uniform grid over edge segments for snapping coordinates (see build_spatial_index)
+        self.spatial_index = None
+        # Dynamic routing: shortest-path trees rooted at tracked destinations, keyed by
+        # (destination, criterion), and the planned route of each tracked vehicle
+        self.dynamic_trees = {}
+        self.tracked_routes = {}
+        # Time-dependent travel-time profiles (see load_time_profiles)
+        self.time_profiles = None
+        self.time_profile_path = None
+        # Road condition overrides: map weight of each overridden (node1, node2, weight_type)
+        # with node1 < node2 (see load_road_conditions)
+        self.road_conditions_path = None
+        self._road_condition_base = {}
+        # Blended edge weights per objective key (see objective_key), LRU, for one graph version each
+        self.blend_cache = OrderedDict()
+        self.blend_cache_size = 16
+        # Fleet ETA matrices per (destinations, criterion, vehicles), updated row-wise (see fleet_eta_matrix)
+        self.eta_matrix_cache = OrderedDict()
+        self.eta_matrix_cache_size = 4
+        # Shared-memory graph this instance is attached to (see shared_graph.py)
+        self.shared_graph = None
+        # (node_names, digest) for path encoding (see node_table_digest)
+        self._node_digest = None
         
         # Load data from files
-        self._load_network_from_file()
+        if load_network:
+            self._load_network_from_file()
         self._load_vehicles_from_file()
         
+    @property
+    def edge_weights(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Edge weights keyed by sorted node-name pair (rebuilt from the index after a cached load)"""
+        if self._edge_weights is None:
+            self._edge_weights = {}
+            for u, name in enumerate(self.node_names):
+                for slot in range(self.adj_offsets[u], self.adj_offsets[u + 1]):
+                    other = self.node_names[self.adj_targets[slot]]
+                    edge_key = tuple(sorted([name, other]))
+                    if edge_key not in self._edge_weights:
+                        self._edge_weights[edge_key] = {
+                            criterion: weights[slot] for criterion, weights in self.adj_weights.items()
+                        }
+        return self._edge_weights
+    
+    @edge_weights.setter
+    def edge_weights(self, value):
+        self._edge_weights = value
+    
+    @property
+    def connections(self) -> Dict[str, List[str]]:
+        """Connection lists as written in map.txt (rebuilt from the compiled map on first use)"""
+        if self._connections is None:
+            self._connections = defaultdict(list)
+            offsets, targets = self._compiled_connections
+            for u, name in enumerate(self.node_names):
+                self._connections[name].extend(self.node_names[targets[i]] for i in range(offsets[u], offsets[u + 1]))
+            self._compiled_connections = None
+        return self._connections
+    
+    @connections.setter
+    def connections(self, value):
+        self._connections = value
+    
+    def __getstate__(self):
+        """Pickle support for process pools: memory-mapped tables travel as file names"""
+        state = self.__dict__.copy()
+        state['route_cache'] = OrderedDict()
+        state['route_cache_bytes'] = 0
+        state['all_pairs_tables'] = {
+            criterion: dict(tables, distances=None, next_hops=None) if tables['files'] else tables
+            for criterion, tables in self.all_pairs_tables.items()
+        }
+        # Views into a shared graph cannot be pickled; workers get private copies
+        if self.shared_graph is not None:
+            state['shared_graph'] = None
+            for key in ('adj_offsets', 'adj_targets', 'node_x', 'node_y', 'component_labels', 'component_sizes'):
+                state[key] = array_copy(state[key])
+            state['adj_weights'] = {criterion: array_copy(weights) for criterion, weights in self.adj_weights.items()}
+            if self._compiled_connections is not None:
+                state['_compiled_connections'] = tuple(array_copy(values) for values in self._compiled_connections)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for tables in self.all_pairs_tables.values():
+            if tables['files']:
+                dist_file, next_file = tables['files']
+                tables['distances'] = np.load(dist_file, mmap_mode='r')
+                tables['next_hops'] = np.load(next_file, mmap_mode='r')
+    
     def update_vehicle_location(self, vehicle_id: int, current_node: str):
         """Update the current location of a vehicle (called by Digital Twin data)
         
         After startup, this becomes the authoritative location source
         """
         if vehicle_id not in self.vehicles:
-            print(f"Warning: Attempting to update location for unknown vehicle {vehicle_id}")
+            log.warning("Warning: Attempting to update location for unknown vehicle %s", vehicle_id)
             return False
             
         if current_node not in self.nodes:
-            print(f"Warning: Attempting to set invalid location '{current_node}' for vehicle {vehicle_id}")
+            log.warning("Warning: Attempting to set invalid location '%s' for vehicle %s", current_node, vehicle_id)
             return False
             
         old_location = self.vehicle_current_locations.get(vehicle_id)
         self.vehicle_current_locations[vehicle_id] = current_node
         
         if old_location:
-            print(f"Vehicle {vehicle_id} location updated: {old_location} → {current_node}")
+            log.debug("Vehicle %s location updated: %s → %s", vehicle_id, old_location, current_node)
         else:
-            print(f"Vehicle {vehicle_id} location first tracked: {current_node}")
-            print(f"  From now on, this vehicle's location is tracked by Digital Twin")
+            log.info("Vehicle %s location first tracked: %s", vehicle_id, current_node)
+            log.info("  From now on, this vehicle's location is tracked by Digital Twin")
         
         return True
         
     def set_vehicle_target(self, vehicle_id: int, target_node: str):
         """Set the target location for a vehicle (called by test_dt script)"""
         if vehicle_id not in self.vehicles:
-            print(f"Warning: Attempting to set target for unknown vehicle {vehicle_id}")
+            log.warning("Warning: Attempting to set target for unknown vehicle %s", vehicle_id)
             return False
             
         if target_node not in self.nodes:
-            print(f"Warning: Attempting to set invalid target '{target_node}' for vehicle {vehicle_id}")
+            log.warning("Warning: Attempting to set invalid target '%s' for vehicle %s", target_node, vehicle_id)
             return False
             
         self.vehicle_target_locations[vehicle_id] = target_node
-        print(f"Vehicle {vehicle_id} target set to: {target_node}")
+        log.debug("Vehicle %s target set to: %s", vehicle_id, target_node)
         return True
         
     def get_vehicle_current_location(self, vehicle_id: int) -> str:
@@ -69,7 +491,7 @@ class VehicleRoutingSystem:
         AFTER STARTUP: Returns actual tracked location from Digital Twin
         """
         if vehicle_id not in self.vehicles:
-            print(f"ERROR: Vehicle {vehicle_id} not found in system")
+            log.error("ERROR: Vehicle %s not found in system", vehicle_id)
             return None
             
         # Check if we have a tracked location (updated by Digital Twin)
@@ -82,10 +504,10 @@ class VehicleRoutingSystem:
             # Return the start node from vehicles.txt
             start_loc = self.vehicles[vehicle_id].get('start_node')
             if not start_loc:
-                print(f"CRITICAL ERROR: No start location defined for vehicle {vehicle_id} in vehicles.txt")
+                log.critical("CRITICAL ERROR: No start location defined for vehicle %s in vehicles.txt", vehicle_id)
                 return None
-            print(f"Vehicle {vehicle_id} using initial location from vehicles.txt: {start_loc}")
-            print(f"  (This should only happen at startup before Digital Twin sends first update)")
+            log.debug("Vehicle %s using initial location from vehicles.txt: %s", vehicle_id, start_loc)
+            log.debug("  (This should only happen at startup before Digital Twin sends first update)")
             return start_loc
             
     def get_vehicle_target_location(self, vehicle_id: int) -> str:
@@ -93,63 +515,96 @@ class VehicleRoutingSystem:
         return self.vehicle_target_locations.get(vehicle_id, None)
         
     def _load_network_from_file(self):
-        """Load network data from map.txt file"""
+        """Load network data from map.txt file, or from its compiled map if that is current"""
         try:
-            with open(self.map_file_path, 'r') as file:
-                print(f"Loading network from: {self.map_file_path}")
-                for line in file:
-                    line = line.strip()
-                    if line:
-                        # Parse the format: {{"Node1", {250,50}},["Node2","Node3","Node4","Node5","Node6"]}.
-                        print(f"Parsing line: {line}")
-                        
-                        # Remove outer braces and period
-                        line = line.strip('{}.}')
-                        
-                        # Find the node name (between first two quotes)
-                        node_start = line.find('"') + 1
-                        node_end = line.find('"', node_start)
-                        node_name = line[node_start:node_end]
-                        
-                        # Find coordinates (between { and })
-                        coord_start = line.find('{', node_end) + 1
-                        coord_end = line.find('}', coord_start)
-                        coords_str = line[coord_start:coord_end]
-                        
-                        # Parse coordinates
-                        coords = coords_str.split(',')
-                        x = int(coords[0].strip())
-                        y = int(coords[1].strip())
-                        
-                        self.nodes[node_name] = (x, y)
-                        
-                        # Find connections (between [ and ])
-                        bracket_start = line.find('[')
-                        if bracket_start != -1:
-                            bracket_end = line.find(']', bracket_start)
-                            if bracket_end != -1:
-                                connections_str = line[bracket_start+1:bracket_end]
-                                if connections_str.strip():
-                                    # Split by comma and clean up quotes
-                                    connections = [conn.strip().strip('"') for conn in connections_str.split('","')]
-                                    # Handle first and last items that might have extra quotes
-                                    connections = [conn.strip('"') for conn in connections]
-                                    for conn in connections:
-                                        if conn:  # Make sure connection is not empty
-                                            self.connections[node_name].append(conn)
-                        
-                        print(f"  Added node: {node_name} at {(x, y)} with connections: {self.connections[node_name]}")
-                                        
-            print(f"Loaded {len(self.nodes)} nodes from map file")
+            if self.map_cache_path and self._load_compiled_map():
+                return
+            
+            log.info("Loading network from: %s", self.map_file_path)
+            for node_name, coords, connections in iter_map_file(self.map_file_path):
+                self.nodes[node_name] = coords
+                self.connections[node_name].extend(connections)
+            
+            log.info("Loaded %d nodes from map file", len(self.nodes))
             self._build_edge_weights()
             
+            if self.map_cache_path:
+                self._write_compiled_map()
+            
         except FileNotFoundError:
-            print(f"Map file not found at {self.map_file_path}")
+            log.error("Map file not found at %s", self.map_file_path)
             raise FileNotFoundError(f"Cannot find map file: {self.map_file_path}")
+        except MapParseError as e:
+            log.error("Error parsing map file: %s", e)
+            raise
         except Exception as e:
-            print(f"Error parsing map file: {e}")
+            log.error("Error parsing map file: %s", e)
             raise Exception(f"Error loading map file: {e}")
-            
+    
+    def _network_sections(self) -> Dict[str, array]:
+        """Nodes, adjacency index, weights and connection lists as flat arrays (see _COMPILED_MAP_SECTIONS)"""
+        conn_offsets = array('i', [0])
+        conn_targets = array('i')
+        for name in self.node_names:
+            conn_targets.extend(self.node_index[conn] for conn in self.connections.get(name, []) if conn in self.node_index)
+            conn_offsets.append(len(conn_targets))
+        
+        return {
+            'node_x': self.node_x,
+            'node_y': self.node_y,
+            'names': array('B', '\n'.join(self.node_names).encode('utf-8')),
+            'adj_offsets': self.adj_offsets,
+            'adj_targets': self.adj_targets,
+            'weights_distance': self.adj_weights['distance'],
+            'weights_carbon': self.adj_weights['carbon'],
+            'weights_cost': self.adj_weights['cost'],
+            'conn_offsets': conn_offsets,
+            'conn_targets': conn_targets
+        }
+    
+    def _write_compiled_map(self):
+        """Save nodes, adjacency index, weights and connection lists as a compiled map"""
+        try:
+            write_compiled_map(self.map_cache_path, self.map_file_path, self._network_sections())
+            log.info("Wrote compiled map: %s", self.map_cache_path)
+        except OSError as e:
+            log.warning("Warning: Could not write compiled map %s: %s", self.map_cache_path, e)
+    
+    def _load_compiled_map(self) -> bool:
+        """Load the compiled map if it matches map.txt; returns False if it must be rebuilt"""
+        sections = read_compiled_map(self.map_cache_path, self.map_file_path)
+        if sections is None:
+            return False
+        self._apply_network_sections(sections)
+        log.info("Loaded %d nodes from compiled map: %s", len(self.nodes), self.map_cache_path)
+        return True
+    
+    def _apply_network_sections(self, sections: Dict, component_labels=None, component_sizes=None):
+        """Take the graph from _network_sections() arrays (or typed memoryviews over shared memory)"""
+        names_blob = sections['names'].tobytes().decode('utf-8')
+        self.node_names = names_blob.split('\n') if names_blob else []
+        self.node_index = {name: i for i, name in enumerate(self.node_names)}
+        self.node_x = sections['node_x']
+        self.node_y = sections['node_y']
+        self.nodes = {name: (int(x), int(y)) for name, x, y in zip(self.node_names, self.node_x, self.node_y)}
+        self.adj_offsets = sections['adj_offsets']
+        self.adj_targets = sections['adj_targets']
+        self.adj_weights = {
+            'distance': sections['weights_distance'],
+            'carbon': sections['weights_carbon'],
+            'cost': sections['weights_cost']
+        }
+        # Dict views are rebuilt from the arrays only if something asks for them
+        self.edge_weights = None
+        self.connections = None
+        self._compiled_connections = (sections['conn_offsets'], sections['conn_targets'])
+        if component_labels is not None:
+            self.component_labels = component_labels
+            self.component_sizes = component_sizes
+        else:
+            self._build_component_index()
+        self._bump_graph_version()
+    
     def _build_edge_weights(self):
         """Calculate distances and assign random weights for all edges"""
         random.seed(42)  # For reproducible results
@@ -174,17 +629,210 @@ class VehicleRoutingSystem:
                             'carbon': carbon_emission,
                             'cost': cost
                         }
+        
+        self._build_adjacency_index()
+        self._bump_graph_version()
+    
+    def _bump_graph_version(self):
+        """Mark the graph as changed; cached routes from older versions are dropped on next use"""
+        self.graph_version += 1
+    
+    def reload_network(self):
+        """Reload map.txt from disk and rebuild edge weights and the adjacency index"""
+        self.nodes = {}
+        self.connections = defaultdict(list)
+        self.edge_weights = {}
+        self._load_network_from_file()
+        # Profiles are attached to adjacency slots, which the reload renumbers
+        if self.time_profile_path:
+            self.load_time_profiles(self.time_profile_path)
+        self._reapply_road_conditions()
+    
+    def set_edge_weight(self, node1: str, node2: str, weight_type: str, value: float) -> bool:
+        """Change one weight of an existing edge (both directions)"""
+        return self.update_edge_weights([(node1, node2, weight_type, value)]) == 1
+    
+    def update_edge_weights(self, updates) -> int:
+        """Apply a batch of (node1, node2, weight_type, value) weight changes
+        
+        Unknown edges or weight types are skipped with a warning. Returns the number of
+        updates applied; the graph version is bumped once if anything changed
+        """
+        applied = 0
+        for node1, node2, weight_type, value in updates:
+            u = self.node_index.get(node1)
+            v = self.node_index.get(node2)
+            if u is None or v is None or self._find_edge_slot(u, v) == -1 or weight_type not in self.adj_weights:
+                log.warning("Warning: Cannot update %s weight of unknown edge %s - %s", weight_type, node1, node2)
+                continue
+            
+            if self._edge_weights is not None:
+                self._edge_weights[tuple(sorted([node1, node2]))][weight_type] = value
+            weights = self.adj_weights[weight_type]
+            if isinstance(weights, memoryview):
+                # Read-only view of a shared graph: this process switches to a private copy
+                weights = self.adj_weights[weight_type] = array_copy(weights)
+            for a, b in ((u, v), (v, u)):
+                slot = self._find_edge_slot(a, b)
+                if slot != -1:
+                    weights[slot] = value
+            applied += 1
+        
+        if applied:
+            self._bump_graph_version()
+        return applied
+    
+    def load_road_conditions(self, conditions_file_path: str) -> int:
+        """Apply the weight overrides of a road conditions file (see iter_road_conditions_file)
+        
+        Replaces the overrides of the previous call: edges no longer listed get their map
+        weights back, so deleting a closure line reopens the road. Unchanged weights are
+        not rewritten, so reloading an unchanged file keeps cached routes. Returns the
+        number of weights changed
+        """
+        entries = list(iter_road_conditions_file(conditions_file_path))
+        wanted = {}
+        for node1, node2, weight_type, value in entries:
+            u = self.node_index.get(node1)
+            v = self.node_index.get(node2)
+            if u is None or v is None or self._find_edge_slot(u, v) == -1 or weight_type not in self.adj_weights:
+                log.warning("Warning: Road condition for unknown edge %s - %s (%s) ignored", node1, node2, weight_type)
+                continue
+            wanted[(min(node1, node2), max(node1, node2), weight_type)] = value
+        # A closed road (infinite distance) must not stay open to carbon, cost or blend searches
+        closed = [(node1, node2) for (node1, node2, weight_type), value in wanted.items()
+                  if weight_type == 'distance' and value == float('inf')]
+        for node1, node2 in closed:
+            for weight_type in self.adj_weights:
+                wanted[(node1, node2, weight_type)] = float('inf')
+        
+        base = self._road_condition_base
+        for key in wanted:
+            if key not in base:
+                base[key] = self.get_edge_weight(*key)
+        for key in [key for key in base if key not in wanted]:
+            wanted[key] = base.pop(key)
+        
+        updates = [(node1, node2, weight_type, value) for (node1, node2, weight_type), value in wanted.items()
+                   if self.get_edge_weight(node1, node2, weight_type) != value]
+        changed = self.update_edge_weights(updates) if updates else 0
+        self.road_conditions_path = conditions_file_path
+        log.info("Loaded %d road conditions (%d weights changed) from %s", len(base), changed, conditions_file_path)
+        return changed
+    
+    def clear_road_conditions(self) -> int:
+        """Restore the map weights of every edge a road conditions file overrode"""
+        updates = [(node1, node2, weight_type, value)
+                   for (node1, node2, weight_type), value in self._road_condition_base.items()]
+        self._road_condition_base = {}
+        self.road_conditions_path = None
+        return self.update_edge_weights(updates) if updates else 0
+    
+    def _reapply_road_conditions(self):
+        """Re-apply road conditions after the weight arrays were replaced with map weights"""
+        self._road_condition_base = {}
+        if self.road_conditions_path:
+            self.load_road_conditions(self.road_conditions_path)
+    
+    def _build_adjacency_index(self):
+        """Build a CSR-style bidirectional adjacency index over integer node IDs
+        
+        Each edge in edge_weights is stored once per direction, so the neighbours of
+        node i are adj_targets[adj_offsets[i]:adj_offsets[i + 1]] and the matching
+        slots of adj_weights[criterion] hold the edge weights for that criterion
+        """
+        self.node_names = list(self.nodes.keys())
+        self.node_index = {name: i for i, name in enumerate(self.node_names)}
+        node_count = len(self.node_names)
+        
+        # Collect directed arcs (both directions of every undirected edge)
+        arcs = []
+        for (node1, node2), weights in self.edge_weights.items():
+            if node1 == node2:
+                continue
+            u = self.node_index[node1]
+            v = self.node_index[node2]
+            arcs.append((u, v, weights))
+            arcs.append((v, u, weights))
+        
+        # Count out-degree and turn it into offsets
+        offsets = [0] * (node_count + 1)
+        for u, _, _ in arcs:
+            offsets[u + 1] += 1
+        for i in range(node_count):
+            offsets[i + 1] += offsets[i]
+        
+        # Scatter arcs into their slots
+        fill = offsets[:-1]
+        targets = [0] * len(arcs)
+        slot_weights = {criterion: [0.0] * len(arcs) for criterion in ('distance', 'carbon', 'cost')}
+        for u, v, weights in arcs:
+            slot = fill[u]
+            fill[u] += 1
+            targets[slot] = v
+            for criterion, values in slot_weights.items():
+                values[slot] = weights[criterion]
+        
+        self.adj_offsets = array('i', offsets)
+        self.adj_targets = array('i', targets)
+        self.adj_weights = {criterion: array('d', values) for criterion, values in slot_weights.items()}
+        
+        # Coordinates by node ID for the A* heuristic
+        self.node_x = array('d', [self.nodes[name][0] for name in self.node_names])
+        self.node_y = array('d', [self.nodes[name][1] for name in self.node_names])
+        self._build_component_index()
+    
+    def _build_component_index(self):
+        """Label connected components of the adjacency index (one traversal, O(V + E))
+        
+        Nodes with different labels can never reach each other, so unreachable queries
+        are rejected without a search. Weight changes do not relabel: a closed edge
+        (infinite weight) can still split a component, so equal labels only mean the
+        nodes are connected in the map
+        """
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        node_count = len(self.node_names)
+        labels = array('i', [-1]) * node_count
+        sizes = array('i')
+        for root in range(node_count):
+            if labels[root] != -1:
+                continue
+            label = len(sizes)
+            labels[root] = label
+            stack = [root]
+            size = 0
+            while stack:
+                u = stack.pop()
+                size += 1
+                for v in targets[offsets[u]:offsets[u + 1]]:
+                    if labels[v] == -1:
+                        labels[v] = label
+                        stack.append(v)
+            sizes.append(size)
+        self.component_labels = labels
+        self.component_sizes = sizes
+        if len(sizes) > 1:
+            log.info("Map has %d connected components (largest: %d nodes)", len(sizes), max(sizes))
+    
+    def reachable(self, start_node: str, end_node: str) -> bool:
+        """O(1) check that both nodes exist and lie in the same connected component"""
+        start_id = self.node_index.get(start_node)
+        end_id = self.node_index.get(end_node)
+        if start_id is None or end_id is None:
+            return False
+        return self.component_labels[start_id] == self.component_labels[end_id]
     
     def _load_vehicles_from_file(self):
         """Load vehicle data from vehicles.txt file"""
         try:
             with open(self.vehicles_file_path, 'r') as file:
-                print(f"Loading vehicles from: {self.vehicles_file_path}")
+                log.info("Loading vehicles from: %s", self.vehicles_file_path)
                 for line in file:
                     line = line.strip()
                     if line:
                         # Parse format: {1, 30, "Node1"}.
-                        print(f"Parsing vehicle line: {line}")
+                        log.debug("Parsing vehicle line: %s", line)
                         
                         # Remove outer braces and period
                         line = line.strip('{}.')
@@ -201,84 +849,1657 @@ class VehicleRoutingSystem:
                             'start_node': start_node
                         }
                         
-                        print(f"  Added vehicle: {vehicle_id}, speed: {speed}, start: {start_node}")
+                        log.debug("  Added vehicle: %s, speed: %s, start: %s", vehicle_id, speed, start_node)
                         
-            print(f"Loaded {len(self.vehicles)} vehicles from file")
+            log.info("Loaded %d vehicles from file", len(self.vehicles))
             
         except FileNotFoundError:
-            print(f"Vehicles file not found at {self.vehicles_file_path}")
+            log.error("Vehicles file not found at %s", self.vehicles_file_path)
             raise FileNotFoundError(f"Cannot find vehicles file: {self.vehicles_file_path}")
         except Exception as e:
-            print(f"Error parsing vehicles file: {e}")
+            log.error("Error parsing vehicles file: %s", e)
             raise Exception(f"Error loading vehicles file: {e}")
     
     def get_edge_weight(self, node1: str, node2: str, weight_type: str) -> float:
         """Get edge weight between two nodes"""
-        edge_key = tuple(sorted([node1, node2]))
-        if edge_key in self.edge_weights:
-            return self.edge_weights[edge_key][weight_type]
-        return float('inf')
+        u = self.node_index.get(node1)
+        v = self.node_index.get(node2)
+        slot = self._find_edge_slot(u, v) if u is not None and v is not None else -1
+        if slot == -1:
+            return float('inf')
+        return self.adj_weights[weight_type][slot]
+    
+    def path_ids(self, path: Sequence[str]) -> array:
+        """Interned node IDs of a path of names"""
+        return array('i', [self.node_index[node] for node in path])
+    
+    def path_names(self, node_ids: Sequence[int]) -> List[str]:
+        """Node names of a path of IDs"""
+        return [self.node_names[node_id] for node_id in node_ids]
+    
+    def node_table_digest(self) -> str:
+        """node_table_digest of this map (cached until the node table is replaced)"""
+        if self._node_digest is None or self._node_digest[0] is not self.node_names:
+            self._node_digest = (self.node_names, node_table_digest(self.node_names))
+        return self._node_digest[1]
+    
+    def encode_path(self, path: Sequence[str]) -> str:
+        """Compact encoding of a path for protocol messages (see encode_path_ids)"""
+        return encode_path_ids(self.path_ids(path), self.node_table_digest())
+    
+    def decode_path(self, encoded: str) -> List[str]:
+        """Node names of a path from encode_path (ValueError if it was encoded for another map)"""
+        return self.path_names(decode_path_ids(encoded, self.node_table_digest(), len(self.node_names)))
     
     def get_all_neighbors(self, node: str) -> List[str]:
         """Get all neighbors of a node (bidirectional connections)"""
-        neighbors = list(self.connections[node])
+        node_id = self.node_index.get(node)
+        if node_id is None:
+            return []
         
-        # Add reverse connections
-        for other_node, connections in self.connections.items():
-            if node in connections and other_node not in neighbors:
-                neighbors.append(other_node)
-                
-        return neighbors
+        return [self.node_names[self.adj_targets[slot]]
+                for slot in range(self.adj_offsets[node_id], self.adj_offsets[node_id + 1])]
+    
+    def objective_key(self, objective_weights: Dict[str, float], vehicle_id: int = None,
+                      speed: float = None) -> Tuple[str, float, float, float]:
+        """Weight key for alpha*distance + beta*carbon + gamma*cost + delta*time
+        
+        objective_weights maps criteria ('distance', 'carbon', 'cost', 'time') to
+        non-negative weights; missing criteria weigh 0. Time is distance / speed, so delta
+        folds into the distance coefficient using the vehicle's speed. The key can be
+        passed wherever a criterion is accepted by the searches
+        """
+        unknown = set(objective_weights) - set(self.CRITERION_LABELS)
+        if unknown:
+            raise ValueError(f"Unknown objective criteria {sorted(unknown)}. Available: {list(self.CRITERION_LABELS)}")
+        alpha = float(objective_weights.get('distance', 0.0))
+        beta = float(objective_weights.get('carbon', 0.0))
+        gamma = float(objective_weights.get('cost', 0.0))
+        delta = float(objective_weights.get('time', 0.0))
+        
+        if delta:
+            if speed is None and vehicle_id in self.vehicles:
+                speed = self.vehicles[vehicle_id]['speed']
+            if not speed or speed <= 0:
+                raise ValueError("A positive vehicle speed is needed to weigh travel time")
+            alpha += delta / speed
+        if min(alpha, beta, gamma) < 0 or alpha + beta + gamma == 0:
+            raise ValueError("Objective weights must be non-negative and not all zero")
+        return ('blend', alpha, beta, gamma)
+    
+    def _weight_array(self, weight_type) -> array:
+        """Per-slot edge weights for a criterion name or an objective key"""
+        if not isinstance(weight_type, tuple):
+            return self.adj_weights[weight_type]
+        
+        entry = self.blend_cache.get(weight_type)
+        if entry is not None and entry[0] == self.graph_version:
+            self.blend_cache.move_to_end(weight_type)
+            return entry[1]
+        
+        # One vectorised pass over the criterion arrays; zero terms are skipped so a
+        # closed (infinite) edge never turns into 0 * inf = nan
+        blended = np.zeros(len(self.adj_targets))
+        for coefficient, criterion in zip(weight_type[1:], ('distance', 'carbon', 'cost')):
+            if coefficient:
+                blended += coefficient * np.frombuffer(self.adj_weights[criterion], dtype=np.float64)
+        weights = array('d')
+        weights.frombytes(blended.tobytes())
+        
+        self.blend_cache[weight_type] = (self.graph_version, weights)
+        self.blend_cache.move_to_end(weight_type)
+        while len(self.blend_cache) > self.blend_cache_size:
+            self.blend_cache.popitem(last=False)
+        return weights
+    
+    def _path_weight(self, path: List[str], weight_type) -> float:
+        """Total weight of a node path for a criterion or objective key (inf if an edge is missing)"""
+        weights = self._weight_array(weight_type)
+        total = 0.0
+        for node1, node2 in zip(path, path[1:]):
+            slot = self._find_edge_slot(self.node_index[node1], self.node_index[node2])
+            if slot == -1:
+                return float('inf')
+            total += weights[slot]
+        return total
+    
+    def _find_edge_slot(self, u: int, v: int) -> int:
+        """Return the adjacency slot of the arc u -> v, or -1 if the nodes are not connected"""
+        targets = self.adj_targets
+        for slot in range(self.adj_offsets[u], self.adj_offsets[u + 1]):
+            if targets[slot] == v:
+                return slot
+        return -1
+    
+    def _dijkstra(self, source: int, target: int, weight_type: str,
+                  stop_nodes: Optional[set] = None) -> Tuple[List[float], List[int]]:
+        """Dijkstra over the adjacency index; stops once target is settled (-1 = full tree)
+        
+        With stop_nodes the search instead stops once every node in that set is settled.
+        Returns the distance and predecessor lists indexed by node ID
+        """
+        remaining = set(stop_nodes) if stop_nodes is not None else None
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self._weight_array(weight_type)
+        node_count = len(self.node_names)
+        
+        distances = [float('inf')] * node_count
+        previous = [-1] * node_count
+        settled = bytearray(node_count)
+        distances[source] = 0.0
+        expanded = 0
+        
+        # Priority queue: (distance, node_id)
+        pq = [(0.0, source)]
+        
+        while pq:
+            current_distance, u = heapq.heappop(pq)
+            
+            if settled[u]:
+                continue
+            settled[u] = 1
+            expanded += 1
+            
+            if u == target:
+                break
+            if remaining is not None and u in remaining:
+                remaining.discard(u)
+                if not remaining:
+                    break
+            
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if settled[v]:
+                    continue
+                distance = current_distance + weights[slot]
+                if distance < distances[v]:
+                    distances[v] = distance
+                    previous[v] = u
+                    heapq.heappush(pq, (distance, v))
+        
+        self._record_expansions(expanded)
+        return distances, previous
+    
+    def _record_expansions(self, expanded: int):
+        """Add one search's settled-node count to search_stats"""
+        self.search_stats['searches'] += 1
+        self.search_stats['expanded_nodes'] += expanded
+        self.search_stats['last_expanded_nodes'] = expanded
+    
+    def reset_search_stats(self):
+        """Zero the node expansion counters"""
+        self.search_stats = {'searches': 0, 'expanded_nodes': 0, 'last_expanded_nodes': 0}
+    
+    def set_search_method(self, method: str):
+        """Select the point-to-point search used by the routing APIs"""
+        if method not in self.SEARCH_METHODS:
+            raise ValueError(f"Unknown search method '{method}'. Available: {list(self.SEARCH_METHODS)}")
+        self.search_method = method
+    
+    def _heuristic_scale(self, weight_type: str) -> float:
+        """Smallest weight per unit of straight-line edge length over all edges
+        
+        scale * euclidean distance never overestimates the remaining weight, so the
+        A* heuristic stays admissible and consistent for any criterion, including after
+        weight updates that make an edge cheaper than its geometric length. Zero-length
+        edges are skipped
+        """
+        if self._heuristic_version != self.graph_version:
+            self._heuristic_scales = {}
+            self._heuristic_version = self.graph_version
+        
+        scale = self._heuristic_scales.get(weight_type)
+        if scale is None:
+            offsets = np.asarray(self.adj_offsets, dtype=np.int64)
+            targets = np.asarray(self.adj_targets, dtype=np.int64)
+            sources = np.repeat(np.arange(len(self.node_names)), np.diff(offsets))
+            xs = np.asarray(self.node_x, dtype=np.float64)
+            ys = np.asarray(self.node_y, dtype=np.float64)
+            lengths = np.hypot(xs[sources] - xs[targets], ys[sources] - ys[targets])
+            weights = np.asarray(self._weight_array(weight_type), dtype=np.float64)
+            positive = lengths > 0
+            scale = float((weights[positive] / lengths[positive]).min()) if positive.any() else 0.0
+            if not math.isfinite(scale) or scale < 0:
+                scale = 0.0
+            # Guard against rounding making the heuristic overestimate
+            scale *= 1 - 1e-9
+            self._heuristic_scales[weight_type] = scale
+        return scale
+    
+    def _euclidean_heuristic(self, target: int, weight_type: str) -> List[float]:
+        """Scaled straight-line lower bound to target for every node ID"""
+        xs = np.frombuffer(self.node_x, dtype=np.float64)
+        ys = np.frombuffer(self.node_y, dtype=np.float64)
+        scale = self._heuristic_scale(weight_type)
+        return (scale * np.hypot(xs - xs[target], ys - ys[target])).tolist()
+    
+    def _astar(self, source: int, target: int, weight_type: str,
+               heuristic: Sequence[float] = None) -> Tuple[List[float], List[int]]:
+        """A* over the adjacency index
+        
+        heuristic holds a consistent lower bound to target per node ID (straight-line
+        distance by default). Returns the distance and predecessor lists indexed by node ID
+        """
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self._weight_array(weight_type)
+        if heuristic is None:
+            heuristic = self._euclidean_heuristic(target, weight_type)
+        node_count = len(self.node_names)
+        
+        distances = [float('inf')] * node_count
+        previous = [-1] * node_count
+        settled = bytearray(node_count)
+        distances[source] = 0.0
+        expanded = 0
+        
+        # Priority queue: (distance + heuristic, node_id)
+        pq = [(heuristic[source], source)]
+        
+        while pq:
+            _, u = heapq.heappop(pq)
+            
+            if settled[u]:
+                continue
+            settled[u] = 1
+            expanded += 1
+            
+            if u == target:
+                break
+            
+            current_distance = distances[u]
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if settled[v]:
+                    continue
+                distance = current_distance + weights[slot]
+                if distance < distances[v]:
+                    distances[v] = distance
+                    previous[v] = u
+                    heapq.heappush(pq, (distance + heuristic[v], v))
+        
+        self._record_expansions(expanded)
+        return distances, previous
+    
+    def build_landmarks(self, count: int = 8, criteria=('distance', 'carbon', 'cost')):
+        """Select ALT landmarks by farthest-point selection and build their distance tables
+        
+        Landmarks are chosen once on the distance criterion: each new landmark is the
+        node farthest from all landmarks picked so far (unreached components first)
+        """
+        node_count = len(self.node_names)
+        count = min(count, node_count)
+        if count == 0:
+            return
+        
+        # Start from the node farthest from node 0, then repeatedly take the farthest node
+        distances, _ = self._dijkstra(0, -1, 'distance')
+        nearest = np.array(distances)
+        nearest[np.isinf(nearest)] = -1.0
+        landmarks = [int(np.argmax(nearest))]
+        nearest = np.full(node_count, np.inf)
+        
+        while len(landmarks) < count:
+            distances, _ = self._dijkstra(landmarks[-1], -1, 'distance')
+            nearest = np.minimum(nearest, np.array(distances))
+            # Unreached nodes (inf) win, which spreads landmarks across components
+            nearest[landmarks] = -1.0
+            candidate = int(np.argmax(nearest))
+            if nearest[candidate] <= 0:
+                break
+            landmarks.append(candidate)
+        
+        self.landmarks = [self.node_names[node_id] for node_id in landmarks]
+        self.landmark_tables = {}
+        for criterion in criteria:
+            self._landmark_table(criterion)
+        log.info("Selected %d ALT landmarks: %s", len(self.landmarks), self.landmarks)
+    
+    def _landmark_table(self, criterion: str) -> np.ndarray:
+        """Landmark-to-all distance table for a criterion, recomputed if the weights changed
+        
+        Shape is (landmarks, nodes); unreachable entries are inf
+        """
+        entry = self.landmark_tables.get(criterion)
+        if entry is not None and entry['graph_version'] == self.graph_version:
+            return entry['table']
+        
+        if not self.landmarks or any(name not in self.node_index for name in self.landmarks):
+            # Map changed under us (or never built): choose landmarks again
+            self.build_landmarks(criteria=())
+        
+        table = np.empty((len(self.landmarks), len(self.node_names)))
+        for row, name in enumerate(self.landmarks):
+            distances, _ = self._dijkstra(self.node_index[name], -1, criterion)
+            table[row] = distances
+        
+        self.landmark_tables[criterion] = {'table': table, 'graph_version': self.graph_version}
+        return table
+    
+    def _alt_heuristic(self, source: int, target: int, criterion: str, active_landmarks: int = 4) -> List[float]:
+        """Triangle-inequality lower bound to target for every node ID
+        
+        Edges are undirected, so |d(L, target) - d(L, v)| bounds d(v, target) for every
+        landmark L. Only the active_landmarks giving the best bound at source are used
+        """
+        table = self._landmark_table(criterion)
+        to_target = table[:, target:target + 1]
+        
+        with np.errstate(invalid='ignore'):
+            bounds = np.abs(to_target - table)
+        # inf - inf (both unreachable from L) carries no information
+        bounds[np.isnan(bounds)] = 0.0
+        
+        if len(bounds) > active_landmarks:
+            best_rows = np.argsort(bounds[:, source])[-active_landmarks:]
+            bounds = bounds[best_rows]
+        
+        # Guard against rounding making the heuristic overestimate
+        return (bounds.max(axis=0) * (1 - 1e-9)).tolist()
+    
+    def _bidirectional_astar(self, source: int, target: int, weight_type: str) -> Tuple[List[int], float]:
+        """Bidirectional A* with average potentials (edges are undirected)
+        
+        The forward search uses p(v) = (h_target(v) - h_source(v)) / 2 and the backward
+        search uses -p(v), which keeps both consistent; the search stops once the two
+        queue minima add up to the best meeting cost found. Returns (node ID path, cost)
+        """
+        if source == target:
+            self._record_expansions(1)
+            return [source], 0.0
+        
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self._weight_array(weight_type)
+        xs, ys = self.node_x, self.node_y
+        source_x, source_y = xs[source], ys[source]
+        target_x, target_y = xs[target], ys[target]
+        half_scale = self._heuristic_scale(weight_type) / 2
+        hypot = math.hypot
+        node_count = len(self.node_names)
+        inf = float('inf')
+        
+        def potential(v):
+            return half_scale * (hypot(xs[v] - target_x, ys[v] - target_y) -
+                                 hypot(xs[v] - source_x, ys[v] - source_y))
+        
+        distances = ([inf] * node_count, [inf] * node_count)
+        previous = ([-1] * node_count, [-1] * node_count)
+        settled = (bytearray(node_count), bytearray(node_count))
+        distances[0][source] = 0.0
+        distances[1][target] = 0.0
+        queues = ([(potential(source), source)], [(-potential(target), target)])
+        signs = (1, -1)
+        
+        best = inf
+        meeting_node = -1
+        expanded = 0
+        
+        while queues[0] and queues[1]:
+            if queues[0][0][0] + queues[1][0][0] >= best:
+                break
+            
+            # Expand the side with the smaller queue
+            side = 0 if len(queues[0]) <= len(queues[1]) else 1
+            other = 1 - side
+            _, u = heapq.heappop(queues[side])
+            if settled[side][u]:
+                continue
+            settled[side][u] = 1
+            expanded += 1
+            
+            own_distances = distances[side]
+            other_distances = distances[other]
+            current_distance = own_distances[u]
+            sign = signs[side]
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if settled[side][v]:
+                    continue
+                distance = current_distance + weights[slot]
+                if distance < own_distances[v]:
+                    own_distances[v] = distance
+                    previous[side][v] = u
+                    heapq.heappush(queues[side], (distance + sign * potential(v), v))
+                    if distance + other_distances[v] < best:
+                        best = distance + other_distances[v]
+                        meeting_node = v
+        
+        self._record_expansions(expanded)
+        
+        if meeting_node == -1:
+            return [], inf
+        
+        path = self._reconstruct_path(previous[0], meeting_node)
+        current = previous[1][meeting_node]
+        while current != -1:
+            path.append(current)
+            current = previous[1][current]
+        return path, best
+    
+    @staticmethod
+    def _reconstruct_path(previous: List[int], target: int) -> List[int]:
+        """Walk the predecessor list back from target and return the node ID path"""
+        path = []
+        current = target
+        while current != -1:
+            path.append(current)
+            current = previous[current]
+        path.reverse()
+        return path
     
     def dijkstra_shortest_path(self, start_node: str, end_node: str, weight_type: str = 'distance') -> Tuple[List[str], float]:
         """Find shortest path using Dijkstra's algorithm"""
-        if start_node not in self.nodes or end_node not in self.nodes:
+        if not self.reachable(start_node, end_node):
             return [], float('inf')
         
-        # Initialize distances and previous nodes
-        distances = {node: float('inf') for node in self.nodes.keys()}
-        previous = {node: None for node in self.nodes.keys()}
-        distances[start_node] = 0
+        start_id = self.node_index[start_node]
+        end_id = self.node_index[end_node]
+        distances, previous = self._dijkstra(start_id, end_id, weight_type)
+        
+        if distances[end_id] == float('inf'):
+            return [], float('inf')
+        
+        path = [self.node_names[node_id] for node_id in self._reconstruct_path(previous, end_id)]
+        return path, distances[end_id]
+    
+    def one_to_many_paths(self, source_node: str, target_nodes: Sequence[str],
+                          criterion='distance') -> Dict[str, Tuple[List[str], float]]:
+        """Paths from one source to several targets with a single search
+        
+        The search stops once every reachable target is settled; targets in another
+        component (or unknown) get ([], inf). 'time' uses distance paths
+        """
+        results = {target: ([], float('inf')) for target in target_nodes}
+        weight_type = 'distance' if criterion == 'time' else criterion
+        stop_nodes = {self.node_index[target] for target in results if self.reachable(source_node, target)}
+        if not stop_nodes:
+            return results
+        
+        distances, previous = self._dijkstra(self.node_index[source_node], -1, weight_type, stop_nodes=stop_nodes)
+        for target in results:
+            target_id = self.node_index.get(target)
+            if target_id in stop_nodes and distances[target_id] != float('inf'):
+                path = [self.node_names[node_id] for node_id in self._reconstruct_path(previous, target_id)]
+                results[target] = (path, distances[target_id])
+        return results
+    
+    def k_shortest_paths(self, start_node: str, end_node: str, k: int = 3, criterion: str = 'distance',
+                         time_budget: float = None) -> List[Tuple[List[str], float]]:
+        """Up to k loopless paths in increasing cost (Yen's algorithm)
+        
+        One reverse search from end_node is reused by every spur search: its distances
+        are an exact heuristic on the full graph and stay admissible when Yen removes
+        edges, and when a spur node's tree path avoids the removed nodes and edges it is
+        taken directly with no search at all. With time_budget (seconds) the paths found
+        so far are returned once the budget runs out; the first path is always returned
+        """
+        if not self.reachable(start_node, end_node) or k < 1:
+            return []
+        weight_type = 'distance' if criterion == 'time' else criterion
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self._weight_array(weight_type)
+        source = self.node_index[start_node]
+        target = self.node_index[end_node]
+        
+        # Reverse tree: to_target[x] is the exact remaining cost, next_hop[x] the next node
+        to_target, next_hop = self._dijkstra(target, -1, weight_type)
+        if to_target[source] == float('inf'):
+            return []
+        
+        def tree_path(node):
+            path = [node]
+            while node != target:
+                node = next_hop[node]
+                path.append(node)
+            return path
+        
+        def arc_weight(u, v):
+            return weights[self._find_edge_slot(u, v)]
+        
+        accepted = [(tree_path(source), to_target[source])]
+        candidates = []
+        seen = {tuple(accepted[0][0])}
+        
+        out_of_time = False
+        while len(accepted) < k and not out_of_time:
+            previous_path = accepted[-1][0]
+            root_cost = 0.0
+            blocked_nodes = set()
+            for j in range(len(previous_path) - 1):
+                if deadline is not None and time.perf_counter() > deadline:
+                    out_of_time = True
+                    break
+                spur = previous_path[j]
+                root = previous_path[:j + 1]
+                # Arcs out of the spur node used by accepted paths sharing this root
+                blocked_arcs = {path[j + 1] for path, _ in accepted
+                                if len(path) > j + 1 and path[:j + 1] == root}
+                
+                spur_path = self._spur_path(spur, target, weight_type, to_target, blocked_nodes, blocked_arcs,
+                                            tree_path)
+                if spur_path is not None:
+                    candidate = root[:-1] + spur_path[0]
+                    key = tuple(candidate)
+                    if key not in seen:
+                        seen.add(key)
+                        heapq.heappush(candidates, (root_cost + spur_path[1], candidate))
+                
+                root_cost += arc_weight(spur, previous_path[j + 1])
+                blocked_nodes.add(spur)
+            
+            if out_of_time or not candidates:
+                break
+            cost, path = heapq.heappop(candidates)
+            accepted.append((path, cost))
+        
+        return [([self.node_names[i] for i in path], cost) for path, cost in accepted]
+    
+    def _spur_path(self, spur: int, target: int, weight_type: str, to_target: List[float],
+                   blocked_nodes: set, blocked_arcs: set, tree_path) -> Optional[Tuple[List[int], float]]:
+        """Cheapest spur -> target path avoiding blocked nodes and the blocked first arcs
         
-        # Priority queue: (distance, node)
-        pq = [(0, start_node)]
-        visited = set()
+        to_target is the unrestricted remaining cost, used as the A* heuristic; distances
+        live in dicts so a short spur search never touches every node
+        """
+        # The tree path is optimal if the restrictions do not touch it
+        first = tree_path(spur)
+        if len(first) > 1 and first[1] not in blocked_arcs and blocked_nodes.isdisjoint(first):
+            return first, to_target[spur]
+        
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self._weight_array(weight_type)
+        inf = float('inf')
+        distances = {spur: 0.0}
+        previous = {spur: -1}
+        settled = set()
+        expanded = 0
+        pq = [(to_target[spur], spur)]
         
         while pq:
-            current_distance, current_node = heapq.heappop(pq)
+            _, u = heapq.heappop(pq)
+            if u in settled:
+                continue
+            settled.add(u)
+            expanded += 1
+            if u == target:
+                break
             
-            if current_node in visited:
+            current_distance = distances[u]
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if v in settled or v in blocked_nodes or (u == spur and v in blocked_arcs):
+                    continue
+                distance = current_distance + weights[slot]
+                if distance < distances.get(v, inf) and to_target[v] != inf:
+                    distances[v] = distance
+                    previous[v] = u
+                    heapq.heappush(pq, (distance + to_target[v], v))
+        
+        self._record_expansions(expanded)
+        if target not in settled:
+            return None
+        path = []
+        node = target
+        while node != -1:
+            path.append(node)
+            node = previous[node]
+        path.reverse()
+        return path, distances[target]
+    
+    def rank_alternatives(self, alternatives: List[List[str]], current_node: str,
+                          criterion='distance') -> List[Tuple[List[str], float]]:
+        """Re-cost cached alternative paths from current_node under the current weights
+        
+        Only alternatives passing through current_node are kept (from that node on);
+        closed ones (infinite cost or distance, or an edge that no longer exists) are
+        dropped whatever the criterion. Sorted cheapest first, so switching routes needs no
+        new search. criterion may also be an objective key (see objective_key)
+        """
+        weight_type = 'distance' if criterion == 'time' else criterion
+        ranked = []
+        seen = set()
+        for path in alternatives:
+            if current_node not in path:
+                continue
+            remaining = path[path.index(current_node):]
+            if tuple(remaining) in seen:
+                continue
+            seen.add(tuple(remaining))
+            cost = self._path_weight(remaining, weight_type)
+            if cost != float('inf') and self._path_weight(remaining, 'distance') != float('inf'):
+                ranked.append((remaining, cost))
+        ranked.sort(key=lambda item: item[1])
+        return ranked
+    
+    def pareto_paths(self, start_node: str, end_node: str, epsilon: float = 0.0,
+                     max_labels: int = 1_000_000) -> List[Dict]:
+        """Pareto front of (distance, carbon, cost) paths by multi-criteria label search
+        
+        A label is pruned when another label at the same node, or a label already at
+        end_node plus per-criterion lower bounds (one reverse search per criterion),
+        dominates it. With epsilon > 0 a label is also pruned when it is within a factor
+        (1 + epsilon) of an existing one on every criterion, which bounds the front size
+        on big maps at the cost of an approximate front. max_labels caps the work.
+        Returns one dict per path with its path and metrics, shortest distance first
+        """
+        if not self.reachable(start_node, end_node):
+            return []
+        criteria = ('distance', 'carbon', 'cost')
+        source = self.node_index[start_node]
+        target = self.node_index[end_node]
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        w_distance, w_carbon, w_cost = (self.adj_weights[c] for c in criteria)
+        
+        bounds = [self._dijkstra(target, -1, c)[0] for c in criteria]
+        lb_distance, lb_carbon, lb_cost = bounds
+        if lb_distance[source] == float('inf'):
+            return []
+        factor = 1.0 + epsilon
+        
+        def dominated(bag, d, c, k):
+            for label in bag:
+                if alive[label] and (label_d[label] <= d * factor and label_c[label] <= c * factor
+                                     and label_k[label] <= k * factor):
+                    return True
+            return False
+        
+        # Labels as parallel lists; a label is (distance, carbon, cost, node, predecessor label)
+        label_d, label_c, label_k, label_node, label_pred, alive = [0.0], [0.0], [0.0], [source], [-1], [True]
+        bags = defaultdict(list)
+        bags[source].append(0)
+        pq = [(lb_distance[source], lb_carbon[source], lb_cost[source], 0)]
+        expanded = 0
+        
+        while pq and len(label_d) < max_labels:
+            _, _, _, label = heapq.heappop(pq)
+            if not alive[label]:
+                continue
+            u = label_node[label]
+            d, c, k = label_d[label], label_c[label], label_k[label]
+            # The front may have grown since this label was queued
+            if u != target and dominated(bags[target], d + lb_distance[u], c + lb_carbon[u], k + lb_cost[u]):
+                alive[label] = False
+                continue
+            expanded += 1
+            if u == target:
                 continue
+            
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if lb_distance[v] == float('inf'):
+                    continue
+                nd, nc, nk = d + w_distance[slot], c + w_carbon[slot], k + w_cost[slot]
+                if dominated(bags[v], nd, nc, nk):
+                    continue
+                if v != target and dominated(bags[target], nd + lb_distance[v], nc + lb_carbon[v], nk + lb_cost[v]):
+                    continue
+                
+                # Drop labels at v that the new one dominates
+                bag = bags[v]
+                for other in bag:
+                    if alive[other] and nd <= label_d[other] and nc <= label_c[other] and nk <= label_k[other]:
+                        alive[other] = False
+                bag[:] = [other for other in bag if alive[other]]
                 
-            visited.add(current_node)
+                new_label = len(label_d)
+                label_d.append(nd)
+                label_c.append(nc)
+                label_k.append(nk)
+                label_node.append(v)
+                label_pred.append(label)
+                alive.append(True)
+                bag.append(new_label)
+                heapq.heappush(pq, (nd + lb_distance[v], nc + lb_carbon[v], nk + lb_cost[v], new_label))
+        
+        self._record_expansions(expanded)
+        if pq and len(label_d) >= max_labels:
+            log.warning("Pareto search %s → %s stopped at %d labels; front may be incomplete",
+                        start_node, end_node, max_labels)
+        
+        front = []
+        for label in sorted((l for l in bags[target] if alive[l]), key=lambda l: (label_d[l], label_c[l], label_k[l])):
+            path = []
+            current = label
+            while current != -1:
+                path.append(self.node_names[label_node[current]])
+                current = label_pred[current]
+            path.reverse()
+            front.append({
+                'path': path,
+                'distance': label_d[label],
+                'carbon': label_c[label],
+                'cost': label_k[label]
+            })
+        return front
+    
+    @staticmethod
+    def select_pareto_path(front: List[Dict], objective: str = 'carbon', budget_criterion: str = 'distance',
+                           max_penalty: float = 0.1) -> Optional[Dict]:
+        """Best path on objective among those within (1 + max_penalty) of the best budget_criterion
+        
+        e.g. the greenest route that is at most 10% longer than the shortest one
+        """
+        if not front:
+            return None
+        limit = min(entry[budget_criterion] for entry in front) * (1 + max_penalty)
+        eligible = [entry for entry in front if entry[budget_criterion] <= limit]
+        return min(eligible, key=lambda entry: (entry[objective], entry[budget_criterion]))
+    
+    def _graph_fingerprint(self, criterion: str) -> str:
+        """Content hash of the node table, adjacency and one criterion's weights"""
+        digest = hashlib.sha256()
+        digest.update('\n'.join(self.node_names).encode('utf-8'))
+        digest.update(self.adj_offsets.tobytes())
+        digest.update(self.adj_targets.tobytes())
+        digest.update(self.adj_weights[criterion].tobytes())
+        return digest.hexdigest()
+    
+    def build_contraction_hierarchies(self, criteria=('distance', 'carbon', 'cost'), cache_dir: str = None,
+                                      witness_settle_limit: int = 60):
+        """Preprocess a contraction hierarchy for each criterion
+        
+        With cache_dir, a hierarchy saved by an earlier run is reused when it matches the
+        current graph and weights; otherwise it is rebuilt and written back
+        """
+        for criterion in criteria:
+            cache_file = None
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                cache_file = os.path.join(cache_dir, f"{os.path.basename(self.map_file_path)}.{criterion}.ch")
+                if os.path.exists(cache_file) and self.load_contraction_hierarchy(cache_file, criterion):
+                    continue
+            
+            started = time.perf_counter()
+            self.contraction_hierarchies[criterion] = self._contract_graph(criterion, witness_settle_limit)
+            hierarchy = self.contraction_hierarchies[criterion]
+            log.info("Built contraction hierarchy (%s): %d shortcuts in %.2fs",
+                     criterion, hierarchy['shortcuts'], time.perf_counter() - started)
+            
+            if cache_file:
+                self.save_contraction_hierarchy(criterion, cache_file)
+    
+    def _contract_graph(self, criterion: str, witness_settle_limit: int) -> Dict:
+        """Contract nodes in edge-difference order and return the upward graph
+        
+        Edges are undirected, so one upward graph (edges to higher-ranked neighbours)
+        serves both query directions. Each upward edge keeps the contracted middle node
+        it bypasses (-1 for an original edge) so paths can be unpacked
+        """
+        node_count = len(self.node_names)
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self.adj_weights[criterion]
+        
+        # Mutable remaining graph: neighbour -> (weight, middle node)
+        graph = [{} for _ in range(node_count)]
+        for u in range(node_count):
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if weights[slot] < graph[u].get(v, (float('inf'),))[0]:
+                    graph[u][v] = (weights[slot], -1)
+        
+        def witness_shortcuts(v):
+            """Shortcuts needed to preserve distances if v is contracted"""
+            neighbors = list(graph[v].items())
+            shortcuts = []
+            for i, (u, (weight_u, _)) in enumerate(neighbors[:-1]):
+                via_v = {w: weight_u + weight_w for w, (weight_w, _) in neighbors[i + 1:]}
+                max_cost = max(via_v.values())
+                
+                # Local Dijkstra from u that avoids v, until every target is settled
+                distances = {u: 0.0}
+                pq = [(0.0, u)]
+                settled = 0
+                remaining = len(via_v)
+                while pq and settled < witness_settle_limit:
+                    distance, x = heapq.heappop(pq)
+                    if distance > distances[x]:
+                        continue
+                    if distance > max_cost:
+                        break
+                    settled += 1
+                    if x in via_v:
+                        remaining -= 1
+                        if remaining == 0:
+                            break
+                    for y, (weight_y, _) in graph[x].items():
+                        if y == v:
+                            continue
+                        candidate = distance + weight_y
+                        if candidate < distances.get(y, float('inf')):
+                            distances[y] = candidate
+                            heapq.heappush(pq, (candidate, y))
+                
+                for w, cost in via_v.items():
+                    if distances.get(w, float('inf')) > cost:
+                        shortcuts.append((u, w, cost))
+            return shortcuts
+        
+        deleted_neighbors = [0] * node_count
+        queue = [(len(witness_shortcuts(v)) - len(graph[v]), v) for v in range(node_count)]
+        heapq.heapify(queue)
+        
+        rank = [0] * node_count
+        upward = [None] * node_count
+        next_rank = 0
+        shortcut_count = 0
+        
+        while queue:
+            _, v = heapq.heappop(queue)
+            if upward[v] is not None:
+                continue
             
-            if current_node == end_node:
+            # Lazy update: re-evaluate and postpone if v is no longer the cheapest
+            shortcuts = witness_shortcuts(v)
+            priority = len(shortcuts) - len(graph[v]) + deleted_neighbors[v]
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+            
+            rank[v] = next_rank
+            next_rank += 1
+            upward[v] = [(u, weight, middle) for u, (weight, middle) in graph[v].items()]
+            
+            for u in graph[v]:
+                del graph[u][v]
+                deleted_neighbors[u] += 1
+            graph[v] = {}
+            
+            for u, w, cost in shortcuts:
+                if cost < graph[u].get(w, (float('inf'),))[0]:
+                    graph[u][w] = (cost, v)
+                    graph[w][u] = (cost, v)
+                    shortcut_count += 1
+        
+        # Pack the upward graph into CSR arrays
+        up_offsets = array('i', [0])
+        up_targets = array('i')
+        up_weights = array('d')
+        up_middles = array('i')
+        for v in range(node_count):
+            for u, weight, middle in upward[v]:
+                up_targets.append(u)
+                up_weights.append(weight)
+                up_middles.append(middle)
+            up_offsets.append(len(up_targets))
+        
+        return {
+            'rank': array('i', rank),
+            'up_offsets': up_offsets,
+            'up_targets': up_targets,
+            'up_weights': up_weights,
+            'up_middles': up_middles,
+            'shortcuts': shortcut_count,
+            'fingerprint': self._graph_fingerprint(criterion),
+            'graph_version': self.graph_version
+        }
+    
+    # Array fields of a contraction hierarchy, in file order
+    _CH_ARRAYS = (('rank', 'i'), ('up_offsets', 'i'), ('up_targets', 'i'), ('up_weights', 'd'), ('up_middles', 'i'))
+    
+    def save_contraction_hierarchy(self, criterion: str, file_path: str):
+        """Write a contraction hierarchy to disk (JSON header line followed by raw arrays)"""
+        hierarchy = self.contraction_hierarchies[criterion]
+        header = {
+            'format': 'vrs-ch-1',
+            'criterion': criterion,
+            'fingerprint': hierarchy['fingerprint'],
+            'shortcuts': hierarchy['shortcuts'],
+            'lengths': {name: len(hierarchy[name]) for name, _ in self._CH_ARRAYS}
+        }
+        with open(file_path, 'wb') as file:
+            file.write(json.dumps(header).encode('utf-8') + b'\n')
+            for name, _ in self._CH_ARRAYS:
+                hierarchy[name].tofile(file)
+        log.info("Saved contraction hierarchy (%s) to %s", criterion, file_path)
+    
+    def load_contraction_hierarchy(self, file_path: str, criterion: str) -> bool:
+        """Load a saved contraction hierarchy; returns False if it does not match the current graph"""
+        try:
+            with open(file_path, 'rb') as file:
+                header = json.loads(file.readline().decode('utf-8'))
+                if (header.get('format') != 'vrs-ch-1' or header.get('criterion') != criterion or
+                        header.get('fingerprint') != self._graph_fingerprint(criterion)):
+                    log.info("Contraction hierarchy %s is stale, rebuilding", file_path)
+                    return False
+                
+                hierarchy = {}
+                for name, typecode in self._CH_ARRAYS:
+                    values = array(typecode)
+                    values.fromfile(file, header['lengths'][name])
+                    hierarchy[name] = values
+        except (OSError, ValueError, KeyError, EOFError) as e:
+            log.warning("Could not load contraction hierarchy %s: %s", file_path, e)
+            return False
+        
+        hierarchy.update({
+            'shortcuts': header['shortcuts'],
+            'fingerprint': header['fingerprint'],
+            'graph_version': self.graph_version
+        })
+        self.contraction_hierarchies[criterion] = hierarchy
+        log.info("Loaded contraction hierarchy (%s) from %s", criterion, file_path)
+        return True
+    
+    def _ch_query(self, source: int, target: int, criterion: str) -> Tuple[List[int], float]:
+        """Bidirectional upward search on a contraction hierarchy, returns (node ID path, cost)"""
+        hierarchy = self.contraction_hierarchies[criterion]
+        up_offsets = hierarchy['up_offsets']
+        up_targets = hierarchy['up_targets']
+        up_weights = hierarchy['up_weights']
+        inf = float('inf')
+        
+        distances = ({source: 0.0}, {target: 0.0})
+        previous = ({source: -1}, {target: -1})
+        queues = ([(0.0, source)], [(0.0, target)])
+        best = inf
+        meeting_node = -1
+        expanded = 0
+        
+        while queues[0] or queues[1]:
+            # Alternate on the smaller key; a side is done once its minimum reaches best
+            side = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+            distance, u = heapq.heappop(queues[side])
+            if distance >= best:
+                queues[side].clear()
+                continue
+            if distance > distances[side][u]:
+                continue
+            expanded += 1
+            
+            other_distance = distances[1 - side].get(u)
+            if other_distance is not None and distance + other_distance < best:
+                best = distance + other_distance
+                meeting_node = u
+            
+            own_distances = distances[side]
+            for slot in range(up_offsets[u], up_offsets[u + 1]):
+                v = up_targets[slot]
+                candidate = distance + up_weights[slot]
+                if candidate < own_distances.get(v, inf):
+                    own_distances[v] = candidate
+                    previous[side][v] = u
+                    heapq.heappush(queues[side], (candidate, v))
+        
+        self._record_expansions(expanded)
+        
+        if meeting_node == -1:
+            return [], inf
+        
+        # Sequence of hierarchy nodes source -> meeting node -> target
+        up_path = []
+        current = meeting_node
+        while current != -1:
+            up_path.append(current)
+            current = previous[0][current]
+        up_path.reverse()
+        current = previous[1][meeting_node]
+        while current != -1:
+            up_path.append(current)
+            current = previous[1][current]
+        
+        path = [up_path[0]]
+        for a, b in zip(up_path, up_path[1:]):
+            self._ch_unpack_edge(hierarchy, a, b, path)
+        return path, best
+    
+    @staticmethod
+    def _ch_unpack_edge(hierarchy: Dict, a: int, b: int, path: List[int]):
+        """Append the original nodes of hierarchy edge a -> b (excluding a) to path"""
+        rank = hierarchy['rank']
+        up_offsets = hierarchy['up_offsets']
+        up_targets = hierarchy['up_targets']
+        up_middles = hierarchy['up_middles']
+        
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            # The edge is stored at its lower-ranked endpoint
+            low, high = (a, b) if rank[a] < rank[b] else (b, a)
+            middle = -1
+            for slot in range(up_offsets[low], up_offsets[low + 1]):
+                if up_targets[slot] == high:
+                    middle = up_middles[slot]
+                    break
+            if middle == -1:
+                path.append(b)
+            else:
+                # Push in reverse so (a, middle) is unpacked first
+                stack.append((middle, b))
+                stack.append((a, middle))
+    
+    def build_all_pairs_tables(self, criteria=('distance', 'carbon', 'cost'), method: str = 'dijkstra',
+                               cache_dir: str = None, workers: int = None, max_nodes: int = 2000):
+        """Precompute all-pairs distance and next-hop matrices for small and medium maps
+        
+        method is 'dijkstra' (one full search per source, spread over a process pool) or
+        'floyd_warshall' (blocked, vectorised). With cache_dir the matrices are written to
+        .npy files named by the graph fingerprint and memory-mapped read-only, so agent
+        processes using the same cache directory share one copy through the page cache
+        """
+        node_count = len(self.node_names)
+        if node_count > max_nodes:
+            raise ValueError(f"All-pairs tables need {node_count}^2 entries; map exceeds max_nodes={max_nodes}")
+        if method not in ('dijkstra', 'floyd_warshall'):
+            raise ValueError(f"Unknown all-pairs method '{method}'. Available: ['dijkstra', 'floyd_warshall']")
+        
+        for criterion in criteria:
+            fingerprint = self._graph_fingerprint(criterion)
+            dist_file = next_file = None
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                stem = os.path.join(cache_dir, f"{os.path.basename(self.map_file_path)}.{criterion}.{fingerprint[:16]}")
+                dist_file = stem + '.dist.npy'
+                next_file = stem + '.next.npy'
+            
+            if dist_file and os.path.exists(dist_file) and os.path.exists(next_file):
+                log.info("Loading all-pairs tables (%s) from %s", criterion, stem)
+            else:
+                started = time.perf_counter()
+                if method == 'floyd_warshall':
+                    distances, next_hops = self._floyd_warshall(criterion)
+                else:
+                    distances, next_hops = self._all_pairs_dijkstra(criterion, workers)
+                log.info("Built all-pairs tables (%s, %s) for %d nodes in %.2fs",
+                         criterion, method, node_count, time.perf_counter() - started)
+                
+                if dist_file:
+                    # Write under a temporary name so other processes never map a partial file
+                    for file_path, matrix in ((dist_file, distances), (next_file, next_hops)):
+                        temp_path = f"{file_path}.{os.getpid()}.tmp"
+                        with open(temp_path, 'wb') as file:
+                            np.save(file, matrix)
+                        os.replace(temp_path, file_path)
+            
+            if dist_file:
+                distances = np.load(dist_file, mmap_mode='r')
+                next_hops = np.load(next_file, mmap_mode='r')
+            
+            self.all_pairs_tables[criterion] = {
+                'distances': distances,
+                'next_hops': next_hops,
+                'files': (dist_file, next_file) if dist_file else None,
+                'graph_version': self.graph_version
+            }
+    
+    def _floyd_warshall(self, criterion: str, block_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+        """Blocked Floyd-Warshall with a next-hop matrix (-1 = unreachable)"""
+        node_count = len(self.node_names)
+        distances = np.full((node_count, node_count), np.inf)
+        next_hops = np.full((node_count, node_count), -1, dtype=np.int32)
+        
+        offsets = np.frombuffer(self.adj_offsets, dtype=np.int32)
+        sources = np.repeat(np.arange(node_count, dtype=np.int32), np.diff(offsets))
+        targets = np.frombuffer(self.adj_targets, dtype=np.int32)
+        np.minimum.at(distances, (sources, targets), np.frombuffer(self.adj_weights[criterion], dtype=np.float64))
+        next_hops[np.isfinite(distances)] = np.broadcast_to(np.arange(node_count, dtype=np.int32),
+                                                           distances.shape)[np.isfinite(distances)]
+        np.fill_diagonal(distances, 0.0)
+        np.fill_diagonal(next_hops, np.arange(node_count, dtype=np.int32))
+        
+        for k in range(node_count):
+            row_k = distances[k]
+            # Only rows that can reach k can improve through it
+            rows = np.flatnonzero(np.isfinite(distances[:, k]))
+            for start in range(0, len(rows), block_size):
+                block = rows[start:start + block_size]
+                via_k = distances[block, k][:, None] + row_k
+                current = distances[block]
+                better = via_k < current
+                if better.any():
+                    distances[block] = np.where(better, via_k, current)
+                    next_hops[block] = np.where(better, next_hops[block, k][:, None], next_hops[block])
+        
+        return distances, next_hops
+    
+    def _all_pairs_dijkstra(self, criterion: str, workers: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """One full Dijkstra per source, in chunks across a process pool"""
+        node_count = len(self.node_names)
+        chunk = max(1, node_count // ((workers or os.cpu_count() or 1) * 4))
+        chunks = [range(start, min(start + chunk, node_count)) for start in range(0, node_count, chunk)]
+        
+        distances = np.empty((node_count, node_count))
+        next_hops = np.empty((node_count, node_count), dtype=np.int32)
+        
+        if workers == 1:
+            results = (self._shortest_path_tree_rows(rows, criterion) for rows in chunks)
+            for rows, (dist_rows, next_rows) in zip(chunks, results):
+                distances[rows.start:rows.stop] = dist_rows
+                next_hops[rows.start:rows.stop] = next_rows
+            return distances, next_hops
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_routing_worker, initargs=(self,)) as pool:
+            for rows, (dist_rows, next_rows) in zip(chunks, pool.map(_routing_worker_tree_rows, chunks,
+                                                                     [criterion] * len(chunks))):
+                distances[rows.start:rows.stop] = dist_rows
+                next_hops[rows.start:rows.stop] = next_rows
+        return distances, next_hops
+    
+    def _shortest_path_tree_rows(self, sources: range, criterion: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Distance and next-hop rows for a range of source node IDs"""
+        node_count = len(self.node_names)
+        dist_rows = np.empty((len(sources), node_count))
+        next_rows = np.empty((len(sources), node_count), dtype=np.int32)
+        
+        for row, source in enumerate(sources):
+            distances, previous = self._dijkstra(source, -1, criterion)
+            dist_rows[row] = distances
+            
+            # First hop on the tree path: children of the source point at themselves,
+            # then pointer jumping carries that label down every branch
+            previous = np.array(previous, dtype=np.int32)
+            unreachable = previous == -1
+            hops = np.where(previous == source, np.arange(node_count, dtype=np.int32), previous)
+            hops[unreachable] = np.flatnonzero(unreachable)
+            while True:
+                jumped = hops[hops]
+                if np.array_equal(jumped, hops):
+                    break
+                hops = jumped
+            hops[unreachable] = -1
+            hops[source] = source
+            next_rows[row] = hops
+        
+        return dist_rows, next_rows
+    
+    def _all_pairs_query(self, source: int, target: int, criterion: str) -> Tuple[List[int], float]:
+        """Look up a path in the all-pairs tables, returns (node ID path, cost)"""
+        tables = self.all_pairs_tables[criterion]
+        value = float(tables['distances'][source, target])
+        self._record_expansions(0)
+        if value == float('inf'):
+            return [], float('inf')
+        
+        next_hops = tables['next_hops']
+        path = [source]
+        while path[-1] != target:
+            path.append(int(next_hops[path[-1], target]))
+        return path, value
+    
+    def build_chain_contraction(self):
+        """Merge chains of degree-2 nodes into super-edges for the 'chains' search method
+        
+        Nodes with exactly two distinct neighbours add search work but no choices, so
+        every maximal run of them between two other nodes becomes one edge of a reduced
+        graph. Each chain keeps its full node and slot sequence: super-edge weights are
+        summed per criterion on demand (so weight updates need no rebuild) and results
+        are expanded back to every intermediate node. A cycle made only of degree-2
+        nodes keeps one of them as an endpoint
+        """
+        started = time.perf_counter()
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        node_count = len(self.node_names)
+        
+        kept = bytearray(node_count)
+        for u in range(node_count):
+            first = offsets[u]
+            if offsets[u + 1] - first != 2 or targets[first] == targets[first + 1]:
+                kept[u] = 1
+        
+        # Chain c is chain_nodes[chain_offsets[c]:chain_offsets[c + 1]]; chain_slots[i] is
+        # the arc chain_nodes[i] -> chain_nodes[i + 1] (-1 after the last node)
+        chain_offsets = array('i', [0])
+        chain_nodes = array('i')
+        chain_slots = array('i')
+        node_chain = array('i', [-1]) * node_count
+        node_position = array('i', [0]) * node_count
+        
+        def walk_chains(u):
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if not kept[v] and node_chain[v] != -1:
+                    continue  # found from its other end already
+                if kept[v] and v < u:
+                    continue  # direct edge between endpoints, recorded once
+                chain = len(chain_offsets) - 1
+                nodes = [u]
+                slots = [slot]
+                previous, current = u, v
+                while not kept[current]:
+                    node_chain[current] = chain
+                    node_position[current] = len(nodes)
+                    nodes.append(current)
+                    first = offsets[current]
+                    next_slot = first if targets[first] != previous else first + 1
+                    slots.append(next_slot)
+                    previous, current = current, targets[next_slot]
+                nodes.append(current)
+                slots.append(-1)
+                chain_nodes.extend(nodes)
+                chain_slots.extend(slots)
+                chain_offsets.append(len(chain_nodes))
+        
+        for u in range(node_count):
+            if kept[u]:
+                walk_chains(u)
+        for u in range(node_count):
+            if not kept[u] and node_chain[u] == -1:
+                kept[u] = 1
+                walk_chains(u)
+        
+        kept_nodes = array('i', [u for u in range(node_count) if kept[u]])
+        reduced_index = array('i', [-1]) * node_count
+        for reduced_id, u in enumerate(kept_nodes):
+            reduced_index[u] = reduced_id
+        
+        # Reduced CSR: one arc per chain direction; loops back to the same endpoint never help
+        arcs = []
+        for chain in range(len(chain_offsets) - 1):
+            a = reduced_index[chain_nodes[chain_offsets[chain]]]
+            b = reduced_index[chain_nodes[chain_offsets[chain + 1] - 1]]
+            if a != b:
+                arcs.append((a, b, chain, 1))
+                arcs.append((b, a, chain, 0))
+        arcs.sort()
+        reduced_offsets = array('i', [0]) * (len(kept_nodes) + 1)
+        for a, _, _, _ in arcs:
+            reduced_offsets[a + 1] += 1
+        for i in range(len(kept_nodes)):
+            reduced_offsets[i + 1] += reduced_offsets[i]
+        
+        self.chain_contraction = {
+            'adj_targets': targets,
+            'kept_nodes': kept_nodes,
+            'reduced_index': reduced_index,
+            'offsets': reduced_offsets,
+            'targets': array('i', [b for _, b, _, _ in arcs]),
+            'slot_chain': array('i', [chain for _, _, chain, _ in arcs]),
+            'slot_forward': bytearray(forward for _, _, _, forward in arcs),
+            'chain_offsets': chain_offsets,
+            'chain_nodes': chain_nodes,
+            'chain_slots': chain_slots,
+            'node_chain': node_chain,
+            'node_position': node_position,
+            'weights': {},
+            'weights_version': self.graph_version
+        }
+        log.info("Contracted degree-2 chains: %d -> %d nodes, %d -> %d arcs in %.2fs",
+                 node_count, len(kept_nodes), len(targets), len(arcs), time.perf_counter() - started)
+        return self.chain_contraction
+    
+    def _chain_weights(self, criterion) -> array:
+        """Total weight of every chain for one criterion, cached for one graph version"""
+        contraction = self.chain_contraction
+        if contraction['weights_version'] != self.graph_version:
+            contraction['weights'] = {}
+            contraction['weights_version'] = self.graph_version
+        totals = contraction['weights'].get(criterion)
+        if totals is None:
+            weights = self._weight_array(criterion)
+            chain_offsets = contraction['chain_offsets']
+            chain_slots = contraction['chain_slots']
+            totals = array('d', [
+                sum(weights[chain_slots[i]] for i in range(chain_offsets[c], chain_offsets[c + 1] - 1))
+                for c in range(len(chain_offsets) - 1)
+            ])
+            contraction['weights'][criterion] = totals
+        return totals
+    
+    def _chains_query(self, source: int, target: int, criterion) -> Tuple[List[int], float]:
+        """Dijkstra on the chain-contracted graph, expanded to the full node ID path
+        
+        A source or target inside a chain is attached to both chain endpoints with the
+        partial chain weights; two nodes on the same chain also try the direct stretch
+        """
+        if source == target:
+            self._record_expansions(0)
+            return [source], 0.0
+        contraction = self.chain_contraction
+        weights = self._weight_array(criterion)
+        chain_weights = self._chain_weights(criterion)
+        chain_offsets = contraction['chain_offsets']
+        chain_nodes = contraction['chain_nodes']
+        chain_slots = contraction['chain_slots']
+        node_chain = contraction['node_chain']
+        node_position = contraction['node_position']
+        reduced_index = contraction['reduced_index']
+        
+        def attach(node):
+            """{reduced endpoint: (cost, full path from node to that endpoint)}"""
+            if reduced_index[node] != -1:
+                return {reduced_index[node]: (0.0, [node])}
+            start = chain_offsets[node_chain[node]]
+            end = chain_offsets[node_chain[node] + 1]
+            middle = start + node_position[node]
+            to_first = sum(weights[chain_slots[i]] for i in range(start, middle))
+            to_last = sum(weights[chain_slots[i]] for i in range(middle, end - 1))
+            ends = {reduced_index[chain_nodes[start]]: (to_first, list(reversed(chain_nodes[start:middle + 1])))}
+            last = reduced_index[chain_nodes[end - 1]]
+            if to_last < ends.get(last, (float('inf'),))[0]:
+                ends[last] = (to_last, list(chain_nodes[middle:end]))
+            return ends
+        
+        seeds = attach(source)
+        exits = attach(target)
+        
+        # Both on one chain: the stretch between them is a candidate too
+        best, best_end, direct = float('inf'), -1, None
+        if node_chain[source] != -1 and node_chain[source] == node_chain[target]:
+            start = chain_offsets[node_chain[source]]
+            low, high = sorted((node_position[source], node_position[target]))
+            best = sum(weights[chain_slots[i]] for i in range(start + low, start + high))
+            direct = list(chain_nodes[start + low:start + high + 1])
+            if node_position[source] > node_position[target]:
+                direct.reverse()
+        
+        offsets = contraction['offsets']
+        targets = contraction['targets']
+        slot_chain = contraction['slot_chain']
+        distances = {}
+        previous = {}
+        pq = []
+        for node, (cost, _) in seeds.items():
+            distances[node] = cost
+            previous[node] = -1
+            pq.append((cost, node))
+        heapq.heapify(pq)
+        settled = set()
+        expanded = 0
+        
+        while pq:
+            distance, u = heapq.heappop(pq)
+            if distance >= best:
+                break
+            if u in settled:
+                continue
+            settled.add(u)
+            expanded += 1
+            if u in exits and distance + exits[u][0] < best:
+                best, best_end = distance + exits[u][0], u
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                candidate = distance + chain_weights[slot_chain[slot]]
+                if candidate < distances.get(v, float('inf')):
+                    distances[v] = candidate
+                    previous[v] = slot
+                    heapq.heappush(pq, (candidate, v))
+        
+        self._record_expansions(expanded)
+        if best == float('inf'):
+            return [], float('inf')
+        if best_end == -1:
+            return direct, best
+        
+        # Expand: source -> first endpoint, each super-edge's chain, last endpoint -> target
+        slots = []
+        node = best_end
+        while previous[node] != -1:
+            slot = previous[node]
+            slots.append(slot)
+            start = chain_offsets[slot_chain[slot]]
+            end = chain_offsets[slot_chain[slot] + 1]
+            node = reduced_index[chain_nodes[start if contraction['slot_forward'][slot] else end - 1]]
+        path = list(seeds[node][1])
+        for slot in reversed(slots):
+            start = chain_offsets[slot_chain[slot]]
+            end = chain_offsets[slot_chain[slot] + 1]
+            segment = chain_nodes[start:end] if contraction['slot_forward'][slot] else reversed(chain_nodes[start:end])
+            path.extend(list(segment)[1:])
+        path.extend(reversed(exits[best_end][1][:-1]))
+        return path, best
+    
+    def shortest_path(self, start_node: str, end_node: str, criterion: str = 'distance', method: str = None) -> Tuple[List[str], float]:
+        """Find the optimal path for one criterion with the selected search method"""
+        if not self.reachable(start_node, end_node):
+            return [], float('inf')
+        
+        method = method or self.search_method
+        start_id = self.node_index[start_node]
+        end_id = self.node_index[end_node]
+        
+        if method == 'ch':
+            hierarchy = self.contraction_hierarchies.get(criterion)
+            if hierarchy is None or hierarchy['graph_version'] != self.graph_version:
+                # No hierarchy for these weights yet - answer with a plain search
+                method = 'bidirectional_astar'
+        
+        if method == 'apsp':
+            tables = self.all_pairs_tables.get(criterion)
+            if tables is None or tables['graph_version'] != self.graph_version:
+                method = 'bidirectional_astar'
+        
+        if method == 'chains':
+            contraction = self.chain_contraction
+            if contraction is None or contraction['adj_targets'] is not self.adj_targets:
+                # Not built, or built for an adjacency index that has since been reloaded
+                method = 'bidirectional_astar'
+        
+        if method == 'ch':
+            path_ids, value = self._ch_query(start_id, end_id, criterion)
+        elif method == 'chains':
+            path_ids, value = self._chains_query(start_id, end_id, criterion)
+        elif method == 'apsp':
+            path_ids, value = self._all_pairs_query(start_id, end_id, criterion)
+        elif method == 'bidirectional_astar':
+            path_ids, value = self._bidirectional_astar(start_id, end_id, criterion)
+        elif method in ('dijkstra', 'astar', 'alt'):
+            if method == 'dijkstra':
+                distances, previous = self._dijkstra(start_id, end_id, criterion)
+            elif method == 'astar':
+                distances, previous = self._astar(start_id, end_id, criterion)
+            else:
+                heuristic = self._alt_heuristic(start_id, end_id, criterion)
+                distances, previous = self._astar(start_id, end_id, criterion, heuristic)
+            value = distances[end_id]
+            path_ids = self._reconstruct_path(previous, end_id) if value != float('inf') else []
+        else:
+            raise ValueError(f"Unknown search method '{method}'. Available: {list(self.SEARCH_METHODS)}")
+        
+        if not path_ids:
+            return [], float('inf')
+        return [self.node_names[node_id] for node_id in path_ids], value
+    
+    def load_time_profiles(self, profile_file_path: str) -> int:
+        """Load piecewise-linear travel-time multipliers per edge (see iter_profile_file)
+        
+        Travel time over an edge entered at time t is distance / speed * multiplier(t),
+        with the multiplier interpolated linearly between profile points and wrapping
+        every period. Identical profiles are stored once; each adjacency slot holds a
+        profile ID (-1 = no profile, multiplier 1.0). Returns the number of edges assigned
+        """
+        entries = list(iter_profile_file(profile_file_path))
+        period = next((value for kind, _, value in entries if kind == 'period'), DEFAULT_PROFILE_PERIOD)
+        if period <= 0:
+            raise ValueError(f"Profile period must be positive, got {period}")
+        
+        profile_ids = {}
+        offsets = array('i', [0])
+        times = array('d')
+        factors = array('d')
+        slot_profile = array('i', [-1]) * len(self.adj_targets)
+        
+        def intern(points):
+            # One point per time of day, sorted, so lookups can bisect
+            normalised = tuple(sorted(dict((t % period, f) for t, f in points).items()))
+            profile_id = profile_ids.get(normalised)
+            if profile_id is None:
+                profile_id = len(profile_ids)
+                profile_ids[normalised] = profile_id
+                for t, f in normalised:
+                    times.append(t)
+                    factors.append(f)
+                offsets.append(len(times))
+            return profile_id
+        
+        default_id = -1
+        assigned = 0
+        for kind, edge, points in entries:
+            if kind == 'default':
+                default_id = intern(points)
+            elif kind == 'edge':
+                node1, node2 = edge
+                u = self.node_index.get(node1)
+                v = self.node_index.get(node2)
+                slots = [] if u is None or v is None else [self._find_edge_slot(u, v), self._find_edge_slot(v, u)]
+                if not slots or -1 in slots:
+                    log.warning("Warning: Time profile for unknown edge %s - %s ignored", node1, node2)
+                    continue
+                profile_id = intern(points)
+                for slot in slots:
+                    slot_profile[slot] = profile_id
+                assigned += 1
+        
+        if default_id != -1:
+            for slot, profile_id in enumerate(slot_profile):
+                if profile_id == -1:
+                    slot_profile[slot] = default_id
+        
+        # Smallest multiplier any slot can see, for an admissible time heuristic
+        min_factor = min(factors) if factors else 1.0
+        if -1 in slot_profile:
+            min_factor = min(min_factor, 1.0)
+        
+        self.time_profiles = {
+            'period': period,
+            'offsets': offsets,
+            'times': times,
+            'factors': factors,
+            'slot_profile': slot_profile,
+            'min_factor': min_factor
+        }
+        self.time_profile_path = profile_file_path
+        log.info("Loaded time profiles for %d edges (%d distinct profiles, period %g) from %s",
+                 assigned, len(profile_ids), period, profile_file_path)
+        return assigned
+    
+    def clear_time_profiles(self):
+        """Drop time profiles; travel time is distance / speed again"""
+        self.time_profiles = None
+        self.time_profile_path = None
+    
+    def profile_clock(self, timestamp: float = None) -> float:
+        """Local time of day of a Unix timestamp (default now) mapped onto the profile period"""
+        period = self.time_profiles['period'] if self.time_profiles else DEFAULT_PROFILE_PERIOD
+        timestamp = time.time() if timestamp is None else timestamp
+        local = time.localtime(timestamp)
+        seconds = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + (timestamp % 1)
+        return seconds / 86400 * period
+    
+    def _profile_factor(self, profile_id: int, t: float) -> float:
+        """Multiplier of one profile at time t (linear interpolation, wrapping every period)"""
+        if profile_id < 0:
+            return 1.0
+        profiles = self.time_profiles
+        lo = profiles['offsets'][profile_id]
+        hi = profiles['offsets'][profile_id + 1]
+        times = profiles['times']
+        factors = profiles['factors']
+        if hi - lo == 1:
+            return factors[lo]
+        
+        period = profiles['period']
+        local = t % period
+        i = bisect_right(times, local, lo, hi) - 1
+        if i < lo:
+            # Before the first point: interpolate from the last point of the previous period
+            t0, f0, t1, f1 = times[hi - 1] - period, factors[hi - 1], times[lo], factors[lo]
+        elif i == hi - 1:
+            t0, f0, t1, f1 = times[i], factors[i], times[lo] + period, factors[lo]
+        else:
+            t0, f0, t1, f1 = times[i], factors[i], times[i + 1], factors[i + 1]
+        return f0 + (f1 - f0) * (local - t0) / (t1 - t0)
+    
+    def _td_search(self, source: int, target: int, departure_time: float, speed: float) -> Tuple[List[int], float]:
+        """Time-dependent A* on arrival times; returns (node ID path, travel time)
+        
+        Label-setting is exact when profiles are FIFO (entering an edge later never gets
+        you out earlier). The heuristic is the scaled straight-line distance at the
+        smallest multiplier in any profile, so it never overestimates the remaining time
+        """
+        if speed <= 0:
+            return [], float('inf')
+        
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        lengths = self.adj_weights['distance']
+        profiles = self.time_profiles
+        slot_profile = profiles['slot_profile'] if profiles else None
+        min_factor = profiles['min_factor'] if profiles else 1.0
+        heuristic = self._euclidean_heuristic(target, 'distance')
+        h_scale = min_factor / speed
+        node_count = len(self.node_names)
+        
+        arrival = [float('inf')] * node_count
+        previous = [-1] * node_count
+        settled = bytearray(node_count)
+        arrival[source] = departure_time
+        expanded = 0
+        
+        # Priority queue: (arrival + heuristic, arrival, node_id)
+        pq = [(departure_time + heuristic[source] * h_scale, departure_time, source)]
+        
+        while pq:
+            _, t, u = heapq.heappop(pq)
+            if settled[u]:
+                continue
+            settled[u] = 1
+            expanded += 1
+            if u == target:
                 break
             
-            # Check all neighbors (bidirectional)
-            neighbors = self.get_all_neighbors(current_node)
-            for neighbor in neighbors:
-                if neighbor not in visited and neighbor in self.nodes:
-                    weight = self.get_edge_weight(current_node, neighbor, weight_type)
-                    distance = current_distance + weight
-                    
-                    if distance < distances[neighbor]:
-                        distances[neighbor] = distance
-                        previous[neighbor] = current_node
-                        heapq.heappush(pq, (distance, neighbor))
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                if settled[v]:
+                    continue
+                factor = self._profile_factor(slot_profile[slot], t) if slot_profile else 1.0
+                t_v = t + lengths[slot] / speed * factor
+                if t_v < arrival[v]:
+                    arrival[v] = t_v
+                    previous[v] = u
+                    heapq.heappush(pq, (t_v + heuristic[v] * h_scale, t_v, v))
+        
+        self._record_expansions(expanded)
+        if arrival[target] == float('inf'):
+            return [], float('inf')
+        return self._reconstruct_path(previous, target), arrival[target] - departure_time
+    
+    def td_shortest_path(self, start_node: str, end_node: str, departure_time: float,
+                         vehicle_id: int = None, speed: float = None) -> Tuple[List[str], float]:
+        """Fastest path leaving start_node at departure_time, for a vehicle or an explicit speed
         
-        # Reconstruct path
-        if distances[end_node] == float('inf'):
+        Returns (path, travel_time); ([], inf) if there is no path
+        """
+        if not self.reachable(start_node, end_node):
             return [], float('inf')
+        if speed is None:
+            if vehicle_id not in self.vehicles:
+                raise ValueError(f"Vehicle {vehicle_id} not found and no speed given")
+            speed = self.vehicles[vehicle_id]['speed']
         
-        path = []
-        current = end_node
-        while current is not None:
-            path.append(current)
-            current = previous[current]
-        path.reverse()
+        path_ids, travel_time = self._td_search(self.node_index[start_node], self.node_index[end_node],
+                                                departure_time, speed)
+        return [self.node_names[i] for i in path_ids], travel_time
+    
+    def calculate_travel_time_at(self, path: List[str], vehicle_id: int, departure_time: float) -> float:
+        """Travel time of a path for a vehicle leaving at departure_time, using time profiles"""
+        if len(path) < 2:
+            return 0
+        if vehicle_id not in self.vehicles:
+            log.warning("Warning: Vehicle %s not found in vehicles data. Available vehicles: %s", vehicle_id, list(self.vehicles))
+            return float('inf')
+        speed = self.vehicles[vehicle_id]['speed']
+        if speed <= 0:
+            log.warning("Warning: Vehicle %s has invalid speed: %s", vehicle_id, speed)
+            return float('inf')
         
-        return path, distances[end_node]
+        lengths = self.adj_weights['distance']
+        slot_profile = self.time_profiles['slot_profile'] if self.time_profiles else None
+        t = departure_time
+        for node1, node2 in zip(path, path[1:]):
+            slot = self._find_edge_slot(self.node_index[node1], self.node_index[node2])
+            if slot == -1:
+                return float('inf')
+            factor = self._profile_factor(slot_profile[slot], t) if slot_profile else 1.0
+            t += lengths[slot] / speed * factor
+        return t - departure_time
     
     def calculate_path_metrics(self, path: List[str]) -> Dict[str, float]:
         """Calculate all metrics for a given path"""
@@ -289,10 +2510,19 @@ class VehicleRoutingSystem:
         total_carbon = 0
         total_cost = 0
         
+        distance_weights = self.adj_weights['distance']
+        carbon_weights = self.adj_weights['carbon']
+        cost_weights = self.adj_weights['cost']
+        
         for i in range(len(path) - 1):
-            total_distance += self.get_edge_weight(path[i], path[i+1], 'distance')
-            total_carbon += self.get_edge_weight(path[i], path[i+1], 'carbon')
-            total_cost += self.get_edge_weight(path[i], path[i+1], 'cost')
+            u = self.node_index.get(path[i])
+            v = self.node_index.get(path[i+1])
+            slot = self._find_edge_slot(u, v) if u is not None and v is not None else -1
+            if slot == -1:
+                return {'distance': float('inf'), 'carbon': float('inf'), 'cost': float('inf')}
+            total_distance += distance_weights[slot]
+            total_carbon += carbon_weights[slot]
+            total_cost += cost_weights[slot]
         
         return {
             'distance': total_distance,
@@ -308,8 +2538,8 @@ class VehicleRoutingSystem:
         vehicle_times = {}
         path_metrics = self.calculate_path_metrics(path)
         
-        print(f"Calculating travel times for path: {' → '.join(path)}")
-        print(f"Path distance: {path_metrics['distance']:.2f} units")
+        log.debug("Calculating travel times for path: %s", ArrowPath(path))
+        log.debug("Path distance: %.2f units", path_metrics['distance'])
         
         for vehicle_id, vehicle_data in self.vehicles.items():
             speed = vehicle_data['speed']
@@ -323,7 +2553,7 @@ class VehicleRoutingSystem:
                 'cost': path_metrics['cost']
             }
             
-            print(f"  Vehicle {vehicle_id}: Speed={speed}, Time={travel_time:.2f}")
+            log.debug("  Vehicle %s: Speed=%s, Time=%.2f", vehicle_id, speed, travel_time)
         
         return vehicle_times
         """Calculate travel time for a path using specific vehicle speed"""
@@ -331,7 +2561,7 @@ class VehicleRoutingSystem:
             return 0
             
         if vehicle_id not in self.vehicles:
-            print(f"Warning: Vehicle {vehicle_id} not found in vehicles data. Available vehicles: {list(self.vehicles.keys())}")
+            log.warning("Warning: Vehicle %s not found in vehicles data. Available vehicles: %s", vehicle_id, list(self.vehicles))
             return float('inf')
         
         vehicle_speed = self.vehicles[vehicle_id]['speed']
@@ -339,11 +2569,11 @@ class VehicleRoutingSystem:
         total_distance = path_metrics['distance']
         
         if vehicle_speed <= 0:
-            print(f"Warning: Vehicle {vehicle_id} has invalid speed: {vehicle_speed}")
+            log.warning("Warning: Vehicle %s has invalid speed: %s", vehicle_id, vehicle_speed)
             return float('inf')
             
         travel_time = total_distance / vehicle_speed
-        print(f"Vehicle {vehicle_id} (speed: {vehicle_speed}) - Distance: {total_distance:.2f}, Time: {travel_time:.2f}")
+        log.debug("Vehicle %s (speed: %s) - Distance: %.2f, Time: %.2f", vehicle_id, vehicle_speed, total_distance, travel_time)
         
     def calculate_travel_time(self, path: List[str], vehicle_id: int) -> float:
         """Calculate travel time for a path using specific vehicle speed"""
@@ -351,7 +2581,7 @@ class VehicleRoutingSystem:
             return 0
             
         if vehicle_id not in self.vehicles:
-            print(f"Warning: Vehicle {vehicle_id} not found in vehicles data. Available vehicles: {list(self.vehicles.keys())}")
+            log.warning("Warning: Vehicle %s not found in vehicles data. Available vehicles: %s", vehicle_id, list(self.vehicles))
             return float('inf')
         
         vehicle_speed = self.vehicles[vehicle_id]['speed']
@@ -359,7 +2589,7 @@ class VehicleRoutingSystem:
         total_distance = path_metrics['distance']
         
         if vehicle_speed <= 0:
-            print(f"Warning: Vehicle {vehicle_id} has invalid speed: {vehicle_speed}")
+            log.warning("Warning: Vehicle %s has invalid speed: %s", vehicle_id, vehicle_speed)
             return float('inf')
             
         travel_time = total_distance / vehicle_speed
@@ -367,16 +2597,84 @@ class VehicleRoutingSystem:
         
         return travel_time
         
+    def find_criterion_paths(self, start_node: str, end_node: str, criteria=('distance', 'carbon', 'cost')) -> Dict[str, Tuple[List[str], float]]:
+        """Run one shortest-path search per requested criterion (distance, carbon, cost)
+        
+        Duplicate criteria are searched once; criteria that are not requested are skipped
+        """
+        results = {}
+        if start_node not in self.nodes or end_node not in self.nodes:
+            return results
+        
+        for criterion in criteria:
+            if criterion not in results:
+                results[criterion] = self._cached_shortest_path(start_node, end_node, criterion)
+        
+        return results
+    
+    def _cached_shortest_path(self, start_node: str, end_node: str, criterion: str) -> Tuple[List[str], float]:
+        """Shortest path through the LRU route cache"""
+        if self.route_cache_version != self.graph_version:
+            if self.route_cache:
+                self.route_cache_stats['invalidations'] += 1
+            self.clear_route_cache()
+            self.route_cache_version = self.graph_version
+        
+        key = (start_node, end_node, criterion)
+        entry = self.route_cache.get(key)
+        if entry is not None:
+            self.route_cache.move_to_end(key)
+            self.route_cache_stats['hits'] += 1
+            path_ids, value, _ = entry
+            return [self.node_names[node_id] for node_id in path_ids], value
+        
+        self.route_cache_stats['misses'] += 1
+        path, value = self.shortest_path(start_node, end_node, criterion)
+        
+        if self.route_cache_size > 0:
+            path_ids = array('i', [self.node_index[node] for node in path])
+            size = sys.getsizeof(path_ids) + sys.getsizeof(key)
+            self.route_cache[key] = (path_ids, value, size)
+            self.route_cache_bytes += size
+            
+            # Evict least recently used entries until both limits hold
+            while self.route_cache and (len(self.route_cache) > self.route_cache_size or
+                                        (self.route_cache_max_bytes and
+                                         self.route_cache_bytes > self.route_cache_max_bytes)):
+                _, (_, _, evicted_size) = self.route_cache.popitem(last=False)
+                self.route_cache_bytes -= evicted_size
+                self.route_cache_stats['evictions'] += 1
+        
+        return path, value
+    
+    def clear_route_cache(self):
+        """Drop all cached routes (counters are kept)"""
+        self.route_cache.clear()
+        self.route_cache_bytes = 0
+    
+    def get_route_cache_stats(self) -> Dict:
+        """Return route cache counters and current size"""
+        stats = dict(self.route_cache_stats)
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'entries': len(self.route_cache),
+            'bytes': self.route_cache_bytes,
+            'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+            'graph_version': self.graph_version
+        })
+        return stats
+    
     def get_all_vehicle_times_for_route(self, start_node: str, end_node: str, priority: int = 1) -> Dict[str, Dict]:
         """Calculate optimal paths and times for ALL vehicles for a specific route"""
         results = {}
         
         # Get all possible optimal paths (distance, carbon, cost only - time is derived)
         priority_map = {1: 'distance', 2: 'carbon', 3: 'cost'}
+        criterion_paths = self.find_criterion_paths(start_node, end_node, priority_map.values())
         
         for priority_num, criterion_name in priority_map.items():
             # Get optimal path for this criterion
-            path, _ = self.dijkstra_shortest_path(start_node, end_node, criterion_name)
+            path, _ = criterion_paths.get(criterion_name, ([], float('inf')))
             
             if not path:
                 continue
@@ -406,157 +2704,929 @@ class VehicleRoutingSystem:
         
         return results
     
-    def find_all_optimal_paths(self, start_node: str, end_node: str, vehicle_id: int) -> Dict[str, Dict]:
-        """Find optimal paths for all criteria and return with metrics"""
+    def _vehicle_node(self, vehicle_id: int) -> Optional[str]:
+        """Tracked location of a vehicle, or its start node from vehicles.txt (no logging)"""
+        return self.vehicle_current_locations.get(vehicle_id) or self.vehicles[vehicle_id].get('start_node')
+    
+    def get_fleet_routes_to_destination(self, destination: str, criterion: str = 'distance',
+                                        vehicle_ids: List[int] = None) -> Dict[int, Dict]:
+        """Optimal path, metrics and travel time from every vehicle's current node to one destination
+        
+        Runs a single search outward from the destination (edges are undirected, so this is
+        the reverse search) that stops once every vehicle node is settled. The result is
+        ordered by travel time, fastest first; unreachable vehicles come last with an empty path
+        """
+        if destination not in self.nodes:
+            log.error("Error: Destination '%s' not found in network", destination)
+            return {}
+        
+        if vehicle_ids is None:
+            vehicle_ids = list(self.vehicles.keys())
+        
+        vehicle_nodes = {}
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in self.vehicles:
+                log.warning("Warning: Vehicle %s not found in vehicles data", vehicle_id)
+                continue
+            node = self._vehicle_node(vehicle_id)
+            if node in self.node_index:
+                vehicle_nodes[vehicle_id] = self.node_index[node]
+        
+        weight_type = 'distance' if criterion == 'time' else criterion
+        destination_id = self.node_index[destination]
+        # Vehicles in other components are unreachable; leaving them out lets the search stop early
+        label = self.component_labels[destination_id]
+        stop_nodes = {node_id for node_id in vehicle_nodes.values() if self.component_labels[node_id] == label}
+        if stop_nodes:
+            distances, previous = self._dijkstra(destination_id, -1, weight_type, stop_nodes=stop_nodes)
+        else:
+            distances = [float('inf')] * len(self.node_names)
+            previous = [-1] * len(self.node_names)
+        
+        results = {}
+        for vehicle_id, node_id in vehicle_nodes.items():
+            speed = self.vehicles[vehicle_id]['speed']
+            if distances[node_id] == float('inf'):
+                results[vehicle_id] = {
+                    'start_node': self.node_names[node_id],
+                    'path': [],
+                    'distance': float('inf'),
+                    'carbon': float('inf'),
+                    'cost': float('inf'),
+                    'travel_time': float('inf'),
+                    'speed': speed
+                }
+                continue
+            
+            # Predecessors point towards the destination, so walking them gives the forward path
+            path = []
+            current = node_id
+            while current != -1:
+                path.append(self.node_names[current])
+                current = previous[current]
+            
+            metrics = self.calculate_path_metrics(path)
+            results[vehicle_id] = {
+                'start_node': path[0],
+                'path': path,
+                'distance': metrics['distance'],
+                'carbon': metrics['carbon'],
+                'cost': metrics['cost'],
+                'travel_time': metrics['distance'] / speed if speed > 0 else float('inf'),
+                'speed': speed
+            }
+        
+        return dict(sorted(results.items(), key=lambda item: item[1]['travel_time']))
+    
+    def _bounded_dijkstra(self, source: int, limit: float, weight_type: str = 'distance') -> Dict[int, float]:
+        """Distances from source to every node within limit (node ID -> distance)"""
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self._weight_array(weight_type)
+        distances = {source: 0.0}
+        settled = {}
+        pq = [(0.0, source)]
+        while pq:
+            distance, u = heapq.heappop(pq)
+            if u in settled:
+                continue
+            settled[u] = distance
+            for slot in range(offsets[u], offsets[u + 1]):
+                v = targets[slot]
+                candidate = distance + weights[slot]
+                if candidate <= limit and candidate < distances.get(v, float('inf')):
+                    distances[v] = candidate
+                    heapq.heappush(pq, (candidate, v))
+        self._record_expansions(len(settled))
+        return settled
+    
+    def isochrone(self, vehicle_id: int, time_limit: float, start_node: str = None) -> Dict[str, float]:
+        """Every node the vehicle can reach within time_limit, with its travel time
+        
+        Starts from the vehicle's current node unless start_node is given. Travel time is
+        distance / speed, so this is one search bounded at time_limit * speed
+        """
+        if vehicle_id not in self.vehicles:
+            raise ValueError(f"Vehicle {vehicle_id} not found. Available vehicles: {list(self.vehicles)}")
+        start_node = start_node or self._vehicle_node(vehicle_id)
+        speed = self.vehicles[vehicle_id]['speed']
+        if start_node not in self.node_index or speed <= 0 or time_limit < 0:
+            return {}
+        reached = self._bounded_dijkstra(self.node_index[start_node], time_limit * speed)
+        return {self.node_names[node_id]: distance / speed for node_id, distance in reached.items()}
+    
+    def vehicles_within_time(self, destination: str, time_limit: float,
+                             vehicle_ids: List[int] = None) -> Dict[int, float]:
+        """Vehicles that can reach destination within time_limit, with their travel times
+        
+        For pre-filtering a call for proposals: vehicles in another component are dropped
+        in O(1), the rest share one reverse search from the destination bounded by the
+        fastest vehicle's reach. Ordered fastest first
+        """
+        if destination not in self.node_index:
+            return {}
+        if vehicle_ids is None:
+            vehicle_ids = list(self.vehicles.keys())
+        
+        destination_id = self.node_index[destination]
+        label = self.component_labels[destination_id]
+        candidates = {}
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in self.vehicles or self.vehicles[vehicle_id]['speed'] <= 0:
+                continue
+            node = self._vehicle_node(vehicle_id)
+            if node in self.node_index and self.component_labels[self.node_index[node]] == label:
+                candidates[vehicle_id] = self.node_index[node]
+        if not candidates:
+            return {}
+        
+        max_speed = max(self.vehicles[vehicle_id]['speed'] for vehicle_id in candidates)
+        reached = self._bounded_dijkstra(destination_id, time_limit * max_speed)
+        within = {}
+        for vehicle_id, node_id in candidates.items():
+            if node_id in reached:
+                travel_time = reached[node_id] / self.vehicles[vehicle_id]['speed']
+                if travel_time <= time_limit:
+                    within[vehicle_id] = travel_time
+        return dict(sorted(within.items(), key=lambda item: item[1]))
+
+    def build_spatial_index(self, cell_size: float = None):
+        """Uniform grid over the edge segments (and isolated nodes) for snap_to_network
+        
+        Each segment is listed in every cell its bounding box overlaps, so a query only
+        looks at the cells around the point. The default cell size targets a couple of
+        segments per cell but is never below the median edge length
+        """
+        started = time.perf_counter()
+        offsets = np.asarray(self.adj_offsets, dtype=np.int64)
+        targets = np.asarray(self.adj_targets, dtype=np.int64)
+        sources = np.repeat(np.arange(len(self.node_names)), np.diff(offsets))
+        forward = sources < targets
+        isolated = np.flatnonzero(np.diff(offsets) == 0)
+        seg_u = np.concatenate([sources[forward], isolated])
+        seg_v = np.concatenate([targets[forward], isolated])
+        
+        node_x = np.asarray(self.node_x, dtype=float)
+        node_y = np.asarray(self.node_y, dtype=float)
+        x1, y1, x2, y2 = node_x[seg_u], node_y[seg_u], node_x[seg_v], node_y[seg_v]
+        min_x, min_y = (float(node_x.min()), float(node_y.min())) if len(node_x) else (0.0, 0.0)
+        max_x, max_y = (float(node_x.max()), float(node_y.max())) if len(node_x) else (0.0, 0.0)
+        if cell_size is None:
+            lengths = np.hypot(x2 - x1, y2 - y1)
+            area = max(max_x - min_x, 1.0) * max(max_y - min_y, 1.0)
+            cell_size = max(math.sqrt(area / max(len(seg_u), 1)) * 1.5,
+                            float(np.median(lengths)) if len(lengths) else 1.0, 1e-9)
+        columns = int((max_x - min_x) // cell_size) + 1
+        rows = int((max_y - min_y) // cell_size) + 1
+        
+        col_lo = ((np.minimum(x1, x2) - min_x) // cell_size).astype(np.int64)
+        col_hi = ((np.maximum(x1, x2) - min_x) // cell_size).astype(np.int64)
+        row_lo = ((np.minimum(y1, y2) - min_y) // cell_size).astype(np.int64)
+        row_hi = ((np.maximum(y1, y2) - min_y) // cell_size).astype(np.int64)
+        widths = col_hi - col_lo + 1
+        counts = widths * (row_hi - row_lo + 1)
+        segment = np.repeat(np.arange(len(seg_u)), counts)
+        within = np.arange(len(segment)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (row_lo[segment] + within // widths[segment]) * columns + col_lo[segment] + within % widths[segment]
+        order = np.argsort(cells, kind='stable')
+        
+        self.spatial_index = {
+            'adj_targets': self.adj_targets,
+            'origin': (min_x, min_y),
+            'cell_size': cell_size,
+            'columns': columns,
+            'rows': rows,
+            'cell_offsets': np.searchsorted(cells[order], np.arange(columns * rows + 1)),
+            'cell_segments': segment[order],
+            'segments': np.stack([x1, y1, x2 - x1, y2 - y1]),
+            'seg_u': seg_u,
+            'seg_v': seg_v
+        }
+        log.info("Spatial index: %d segments in %dx%d cells of %.2f (%.3fs)", len(seg_u), columns, rows,
+                 cell_size, time.perf_counter() - started)
+    
+    def snap_to_network(self, x: float, y: float, toward: str = None) -> Optional[Dict]:
+        """Nearest point of the network to (x, y): the edge, position along it and nearest node
+        
+        Returns {'edge': (from, to), 'fraction' (0 at from, 1 at to), 'remaining' (distance
+        weight left to 'to'), 'node' (nearer endpoint), 'offset' (distance from the point),
+        'x', 'y'}, or None for an empty graph. When toward is an endpoint of the chosen edge
+        the edge is oriented towards it; among equally near edges (e.g. at a junction) one
+        ending at toward is preferred. Builds the index on first use
+        """
+        index = self.spatial_index
+        if index is None or index['adj_targets'] is not self.adj_targets:
+            self.build_spatial_index()
+            index = self.spatial_index
+        if not len(index['seg_u']):
+            return None
+        
+        cell_size = index['cell_size']
+        columns, rows = index['columns'], index['rows']
+        column = min(max(int((x - index['origin'][0]) // cell_size), 0), columns - 1)
+        row = min(max(int((y - index['origin'][1]) // cell_size), 0), rows - 1)
+        cell_offsets = index['cell_offsets']
+        toward_id = self.node_index.get(toward, -1)
+        
+        # Search square blocks of cells around the point, doubling the radius until the
+        # nearest segment found is closer than anything outside the block can be
+        radius = 0
+        while True:
+            row_lo, row_hi = max(row - radius, 0), min(row + radius, rows - 1)
+            col_lo, col_hi = max(column - radius, 0), min(column + radius, columns - 1)
+            block = (np.arange(row_lo, row_hi + 1)[:, None] * columns + np.arange(col_lo, col_hi + 1)).ravel()
+            starts = cell_offsets[block]
+            counts = cell_offsets[block + 1] - starts
+            total = int(counts.sum())
+            whole_grid = row_lo == 0 and col_lo == 0 and row_hi == rows - 1 and col_hi == columns - 1
+            if total:
+                positions = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+                found = index['cell_segments'][positions]
+                sx, sy, dx, dy = index['segments'][:, found]
+                length2 = dx * dx + dy * dy
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    fraction = np.where(length2 > 0, ((x - sx) * dx + (y - sy) * dy) / length2, 0.0)
+                fraction = np.clip(fraction, 0.0, 1.0)
+                offsets = np.hypot(sx + fraction * dx - x, sy + fraction * dy - y)
+                best_offset = float(offsets.min())
+                if best_offset <= radius * cell_size or whole_grid:
+                    break
+            elif whole_grid:
+                return None
+            radius = radius * 2 or 1
+        
+        tied = np.flatnonzero(offsets <= best_offset + 1e-9 * max(1.0, cell_size))
+        pick = tied[0]
+        if toward_id != -1:
+            touching = tied[(index['seg_u'][found[tied]] == toward_id) | (index['seg_v'][found[tied]] == toward_id)]
+            if len(touching):
+                pick = touching[0]
+        
+        segment = found[pick]
+        u, v = int(index['seg_u'][segment]), int(index['seg_v'][segment])
+        t = float(fraction[pick])
+        if u == toward_id and v != toward_id:
+            u, v, t = v, u, 1.0 - t
+        slot = self._find_edge_slot(u, v) if u != v else -1
+        length = self.adj_weights['distance'][slot] if slot != -1 else 0.0
+        return {
+            'edge': (self.node_names[u], self.node_names[v]),
+            'fraction': t,
+            'remaining': length * (1.0 - t),
+            'node': self.node_names[u] if t < 0.5 else self.node_names[v],
+            'offset': float(offsets[pick]),
+            'x': float(self.node_x[u] + t * (self.node_x[v] - self.node_x[u])),
+            'y': float(self.node_y[u] + t * (self.node_y[v] - self.node_y[u]))
+        }
+    
+    def _tree_metrics(self, previous: List[int], root: int, node_ids) -> Dict[int, Tuple[float, float, float]]:
+        """(distance, carbon, cost) along the search tree from each node back to root
+        
+        Each tree node is summed once, so many targets of one search cost little more than one
+        """
+        distance_weights = self.adj_weights['distance']
+        carbon_weights = self.adj_weights['carbon']
+        cost_weights = self.adj_weights['cost']
+        unreachable = (float('inf'),) * 3
+        memo = {root: (0.0, 0.0, 0.0)}
+        for node_id in node_ids:
+            chain = []
+            current = node_id
+            while current not in memo and previous[current] != -1:
+                chain.append(current)
+                current = previous[current]
+            if current not in memo:
+                for chained in chain:
+                    memo[chained] = unreachable
+                memo[node_id] = unreachable
+                continue
+            for chained in reversed(chain):
+                parent = previous[chained]
+                distance, carbon, cost = memo[parent]
+                slot = self._find_edge_slot(parent, chained)
+                memo[chained] = (distance + distance_weights[slot], carbon + carbon_weights[slot],
+                                 cost + cost_weights[slot])
+        return {node_id: memo[node_id] for node_id in node_ids}
+    
+    def _eta_search(self, source: int, node_ids, criterion) -> Dict[int, Tuple[float, float, float]]:
+        """Metrics of the criterion-optimal paths from source to node_ids, with one search"""
+        label = self.component_labels[source]
+        stop_nodes = {node_id for node_id in node_ids if self.component_labels[node_id] == label}
+        if not stop_nodes:
+            return dict.fromkeys(node_ids, (float('inf'),) * 3)
+        _, previous = self._dijkstra(source, -1, criterion, stop_nodes=stop_nodes)
+        return self._tree_metrics(previous, source, node_ids)
+    
+    def fleet_eta_matrix(self, destinations: Sequence[str], criterion='distance',
+                         vehicle_ids: List[int] = None) -> Dict:
+        """Travel time, distance, carbon and cost for every (vehicle, destination) pair
+        
+        Returns NumPy arrays of shape (vehicles, destinations), rows in vehicle_ids order
+        (default: all vehicles), along the criterion-optimal path from each vehicle's current
+        node; unreachable pairs are inf. Travel time is distance / speed ('time' routes by
+        distance). A fresh matrix takes one search per destination or per distinct vehicle
+        node, whichever is fewer. Calling again for the same destinations re-searches only the
+        rows of vehicles that moved, unless the graph changed
+        """
+        destinations = list(destinations)
+        vehicle_ids = list(self.vehicles) if vehicle_ids is None else list(vehicle_ids)
+        for destination in destinations:
+            if destination not in self.node_index:
+                raise ValueError(f"Destination '{destination}' not found in network")
+        for vehicle_id in vehicle_ids:
+            if vehicle_id not in self.vehicles:
+                raise ValueError(f"Vehicle {vehicle_id} not found. Available vehicles: {list(self.vehicles)}")
+        weight_type = 'distance' if criterion == 'time' else criterion
+        
+        destination_ids = [self.node_index[destination] for destination in destinations]
+        vehicle_nodes = [self.node_index.get(self._vehicle_node(vehicle_id), -1) for vehicle_id in vehicle_ids]
+        key = (tuple(destinations), weight_type, tuple(vehicle_ids))
+        entry = self.eta_matrix_cache.get(key)
+        if entry is not None and entry['graph_version'] == self.graph_version:
+            self.eta_matrix_cache.move_to_end(key)
+            metrics = entry['metrics']
+            stale = [row for row, node_id in enumerate(vehicle_nodes) if node_id != entry['nodes'][row]]
+        else:
+            metrics = np.full((3, len(vehicle_ids), len(destinations)), np.inf)
+            stale = list(range(len(vehicle_ids)))
+        
+        # Rows to (re)compute, grouped by vehicle node; vehicles off the map stay inf
+        rows_by_node = defaultdict(list)
+        for row in stale:
+            metrics[:, row, :] = np.inf
+            if vehicle_nodes[row] != -1:
+                rows_by_node[vehicle_nodes[row]].append(row)
+        
+        searches = 0
+        if rows_by_node and len(destination_ids) < len(rows_by_node):
+            # Few destinations: search outward from each one to all the stale vehicle nodes
+            for column, destination_id in enumerate(destination_ids):
+                reached = self._eta_search(destination_id, list(rows_by_node), weight_type)
+                searches += 1
+                for node_id, rows in rows_by_node.items():
+                    metrics[:, rows, column] = np.array(reached[node_id])[:, None]
+        else:
+            for node_id, rows in rows_by_node.items():
+                reached = self._eta_search(node_id, destination_ids, weight_type)
+                searches += 1
+                values = np.array([reached[destination_id] for destination_id in destination_ids]).T
+                metrics[:, rows, :] = values[:, None, :]
+        
+        self.eta_matrix_cache[key] = {'graph_version': self.graph_version, 'nodes': vehicle_nodes,
+                                      'metrics': metrics}
+        self.eta_matrix_cache.move_to_end(key)
+        while len(self.eta_matrix_cache) > self.eta_matrix_cache_size:
+            self.eta_matrix_cache.popitem(last=False)
+        
+        speeds = np.array([self.vehicles[vehicle_id]['speed'] for vehicle_id in vehicle_ids], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            travel_time = np.where(speeds[:, None] > 0, metrics[0] / speeds[:, None], np.inf)
+        return {
+            'vehicle_ids': vehicle_ids,
+            'destinations': destinations,
+            'travel_time': travel_time,
+            'distance': metrics[0].copy(),
+            'carbon': metrics[1].copy(),
+            'cost': metrics[2].copy(),
+            'updated_rows': len(stale),
+            'searches': searches
+        }
+    
+    def _dynamic_tree(self, destination: str, criterion: str) -> Dict:
+        """Shortest-path tree rooted at a destination, rebuilt if the graph changed under it
+        
+        parents[x] is the next hop from x towards the destination, so walking parents from
+        any node gives its optimal path there (edges are undirected)
+        """
+        key = (destination, criterion)
+        tree = self.dynamic_trees.get(key)
+        if tree is None or tree['graph_version'] != self.graph_version:
+            distances, parents = self._dijkstra(self.node_index[destination], -1, criterion)
+            tree = {
+                'distances': distances,
+                'parents': parents,
+                'graph_version': self.graph_version,
+                'vehicles': tree['vehicles'] if tree else set()
+            }
+            self.dynamic_trees[key] = tree
+        return tree
+    
+    def _tree_path(self, tree: Dict, node_id: int) -> List[str]:
+        """Path from node_id to the tree's root, or [] if unreachable"""
+        if tree['distances'][node_id] == float('inf'):
+            return []
+        parents = tree['parents']
+        path = []
+        while node_id != -1:
+            path.append(self.node_names[node_id])
+            node_id = parents[node_id]
+        return path
+    
+    def track_vehicle_route(self, vehicle_id: int, destination: str, criterion: str = 'distance',
+                            path: List[str] = None) -> Optional[List[str]]:
+        """Keep a shortest-path tree for a vehicle's destination and remember its planned path
+        
+        Vehicles heading to the same destination share one tree. 'time' ranks paths by
+        distance, like find_all_optimal_paths. If path is not given, the current optimal
+        path from the vehicle's node is planned. Returns the planned path (None on error)
+        """
+        if vehicle_id not in self.vehicles:
+            log.error("Error: Vehicle %s not found in vehicles data!", vehicle_id)
+            return None
+        if destination not in self.node_index:
+            log.error("Error: Destination '%s' not found in network", destination)
+            return None
+        weight_type = 'distance' if criterion == 'time' else criterion
+        if weight_type not in self.adj_weights:
+            raise ValueError(f"Unknown criterion '{criterion}'. Available: {list(self.CRITERION_LABELS)}")
+        node = self._vehicle_node(vehicle_id)
+        if path is None and node not in self.node_index:
+            log.error("Error: Vehicle %s location '%s' not found in network", vehicle_id, node)
+            return None
+        
+        self.untrack_vehicle_route(vehicle_id)
+        tree = self._dynamic_tree(destination, weight_type)
+        tree['vehicles'].add(vehicle_id)
+        if path is None:
+            path = self._tree_path(tree, self.node_index[node])
+        self.tracked_routes[vehicle_id] = {'destination': destination, 'criterion': weight_type, 'path': list(path)}
+        return path
+    
+    def untrack_vehicle_route(self, vehicle_id: int):
+        """Stop tracking a vehicle; its destination's tree is dropped once no vehicle uses it"""
+        route = self.tracked_routes.pop(vehicle_id, None)
+        if route is None:
+            return
+        key = (route['destination'], route['criterion'])
+        tree = self.dynamic_trees.get(key)
+        if tree is not None:
+            tree['vehicles'].discard(vehicle_id)
+            if not tree['vehicles']:
+                del self.dynamic_trees[key]
+    
+    def apply_weight_updates(self, updates, tolerance: float = 1e-9) -> Dict[int, Dict]:
+        """Apply a batch of (node1, node2, weight_type, value) changes and repair tracked trees
+        
+        Only the parts of each destination tree affected by the changed edges are
+        recomputed. Returns, for every tracked vehicle whose remaining planned path is
+        now worse than the optimum, its planned and optimal cost and the optimal path
+        """
+        updates = list(updates)
+        
+        # Old weights are needed to tell increases from decreases; the last update of an edge wins
+        changes = defaultdict(dict)
+        for node1, node2, weight_type, value in updates:
+            if weight_type not in self.adj_weights or node1 not in self.node_index or node2 not in self.node_index:
+                continue
+            u = self.node_index[node1]
+            v = self.node_index[node2]
+            slot = self._find_edge_slot(u, v)
+            if slot != -1:
+                edge = (min(u, v), max(u, v))
+                old = changes[weight_type][edge][2] if edge in changes[weight_type] else self.adj_weights[weight_type][slot]
+                changes[weight_type][edge] = (u, v, old, value)
+        
+        # Trees that were already stale cannot be repaired, only rebuilt
+        current = {key for key, tree in self.dynamic_trees.items() if tree['graph_version'] == self.graph_version}
+        if not self.update_edge_weights(updates):
+            return {}
+        for key, tree in self.dynamic_trees.items():
+            if key in current:
+                self._repair_tree(tree, key[1], changes[key[1]].values())
+                tree['graph_version'] = self.graph_version
+            else:
+                self._dynamic_tree(*key)
+        
+        suboptimal = {}
+        for vehicle_id, route in self.tracked_routes.items():
+            tree = self._dynamic_tree(route['destination'], route['criterion'])
+            node = self._vehicle_node(vehicle_id)
+            if node not in self.node_index:
+                log.warning("Warning: Vehicle %s is at unknown node '%s' - skipped", vehicle_id, node)
+                continue
+            path = route['path']
+            remaining = path[path.index(node):] if node in path else path
+            planned_cost = self.calculate_path_metrics(remaining)[route['criterion']] if len(remaining) > 1 else 0.0
+            if not remaining or remaining[-1] != route['destination']:
+                planned_cost = float('inf')
+            optimal_cost = tree['distances'][self.node_index[node]]
+            
+            if planned_cost > optimal_cost + tolerance * max(1.0, optimal_cost):
+                suboptimal[vehicle_id] = {
+                    'destination': route['destination'],
+                    'criterion': route['criterion'],
+                    'planned_path': remaining,
+                    'planned_cost': planned_cost,
+                    'optimal_path': self._tree_path(tree, self.node_index[node]),
+                    'optimal_cost': optimal_cost
+                }
+        
+        if suboptimal:
+            log.info("%d tracked vehicle(s) have suboptimal planned paths after %d weight update(s)",
+                     len(suboptimal), len(updates))
+        return suboptimal
+    
+    def _repair_tree(self, tree: Dict, criterion: str, changes):
+        """Dynamic SSSP repair of one tree for (u, v, old_weight, new_weight) edge changes
+        
+        An increased tree edge invalidates the subtree hanging below it; those nodes are
+        re-seeded from their best unaffected neighbour. A decreased edge seeds whichever
+        endpoint it now improves. A Dijkstra pass from the seeds then settles only the
+        region whose distances actually change
+        """
+        offsets = self.adj_offsets
+        targets = self.adj_targets
+        weights = self.adj_weights[criterion]
+        distances = tree['distances']
+        parents = tree['parents']
+        inf = float('inf')
+        
+        # Collect every node below an increased tree edge (children are neighbours whose parent is the node)
+        affected = set()
+        for u, v, old, new in changes:
+            if new <= old:
+                continue
+            if parents[u] == v:
+                root = u
+            elif parents[v] == u:
+                root = v
+            else:
+                continue
+            if root in affected:
+                continue
+            affected.add(root)
+            stack = [root]
+            while stack:
+                x = stack.pop()
+                for slot in range(offsets[x], offsets[x + 1]):
+                    y = targets[slot]
+                    if parents[y] == x and y not in affected:
+                        affected.add(y)
+                        stack.append(y)
+        
+        for x in affected:
+            distances[x] = inf
+            parents[x] = -1
+        
+        pq = []
+        for x in affected:
+            best, best_parent = inf, -1
+            for slot in range(offsets[x], offsets[x + 1]):
+                y = targets[slot]
+                if y not in affected and distances[y] + weights[slot] < best:
+                    best, best_parent = distances[y] + weights[slot], y
+            if best_parent != -1:
+                distances[x] = best
+                parents[x] = best_parent
+                pq.append((best, x))
+        
+        for u, v, old, new in changes:
+            if new >= old:
+                continue
+            for a, b in ((u, v), (v, u)):
+                if distances[b] + new < distances[a]:
+                    distances[a] = distances[b] + new
+                    parents[a] = b
+                    pq.append((distances[a], a))
+        
+        heapq.heapify(pq)
+        expanded = 0
+        while pq:
+            current_distance, x = heapq.heappop(pq)
+            if current_distance > distances[x]:
+                continue
+            expanded += 1
+            for slot in range(offsets[x], offsets[x + 1]):
+                y = targets[slot]
+                distance = current_distance + weights[slot]
+                if distance < distances[y]:
+                    distances[y] = distance
+                    parents[y] = x
+                    heapq.heappush(pq, (distance, y))
+        
+        self._record_expansions(expanded)
+    
+    def weighted_shortest_path(self, start_node: str, end_node: str, objective_weights: Dict[str, float],
+                               vehicle_id: int = None, method: str = None) -> Tuple[List[str], float]:
+        """Path minimising a weighted sum of criteria; returns (path, weighted score)
+        
+        Goes through the route cache. CH, ALT and APSP tables are built per criterion, so
+        those methods answer blended queries with bidirectional A* / A* instead
+        """
+        key = self.objective_key(objective_weights, vehicle_id)
+        method = method or self.search_method
+        if method == self.search_method and method != 'alt':
+            return self._cached_shortest_path(start_node, end_node, key)
+        return self.shortest_path(start_node, end_node, key, 'astar' if method == 'alt' else method)
+    
+    def find_weighted_path_for_vehicle(self, vehicle_id: int, destination: str, objective_weights: Dict[str, float],
+                                       override_start: str = None) -> Optional[Dict]:
+        """Like find_optimal_path_for_vehicle, but for a per-task weight vector instead of a priority"""
+        if vehicle_id not in self.vehicles:
+            log.critical("CRITICAL ERROR: Vehicle %s not found. Available vehicles: %s", vehicle_id, list(self.vehicles))
+            return None
+        start_node = override_start or self.get_vehicle_current_location(vehicle_id)
+        if not start_node or start_node not in self.nodes:
+            log.critical("CRITICAL ERROR: Cannot determine starting location for Vehicle %s", vehicle_id)
+            return None
+        if destination not in self.nodes:
+            log.critical("CRITICAL ERROR: Destination '%s' not found in network (%d nodes)", destination, len(self.nodes))
+            return None
+        
+        self.set_vehicle_target(vehicle_id, destination)
+        path, score = self.weighted_shortest_path(start_node, destination, objective_weights, vehicle_id)
+        if not path:
+            log.critical("CRITICAL ERROR: No path found for Vehicle %s from %s to %s", vehicle_id, start_node, destination)
+            return None
+        
+        metrics = self.calculate_path_metrics(path)
+        weights_text = ', '.join(f"{criterion}={weight:g}" for criterion, weight in objective_weights.items())
+        result = {
+            'path': path,
+            'distance': metrics['distance'],
+            'carbon': metrics['carbon'],
+            'cost': metrics['cost'],
+            'travel_time': self.calculate_travel_time(path, vehicle_id),
+            'score': score,
+            'criterion': f"Weighted ({weights_text})"
+        }
+        log.info("Path found: %s (Time: %.2f, weighted score: %.2f)", ArrowPath(path), result['travel_time'], score)
+        return result
+    
+    def optimize_stop_order(self, vehicle_id: int, stops: List[str], criterion='distance',
+                            override_start: str = None, return_to_start: bool = False,
+                            time_budget: float = None) -> Optional[Dict]:
+        """Visit several stops in one trip: order them and stitch the legs into one path
+        
+        Builds the criterion cost matrix between the start and the stops (one search per
+        point), constructs a nearest-neighbour order, then improves it with 2-opt and
+        Or-opt moves until no move helps or time_budget (seconds) runs out. criterion may
+        be a name or an objective key; 'time' orders by distance. Returns the visiting
+        order, the stitched node path, per-leg metrics and totals
+        """
+        if vehicle_id not in self.vehicles:
+            log.critical("CRITICAL ERROR: Vehicle %s not found. Available vehicles: %s", vehicle_id, list(self.vehicles))
+            return None
+        start_node = override_start or self.get_vehicle_current_location(vehicle_id)
+        if not start_node or start_node not in self.nodes:
+            log.critical("CRITICAL ERROR: Cannot determine starting location for Vehicle %s", vehicle_id)
+            return None
+        missing = [stop for stop in stops if stop not in self.nodes]
+        if missing:
+            log.critical("CRITICAL ERROR: Stops %s not found in network (%d nodes)", missing, len(self.nodes))
+            return None
+        
+        weight_type = 'distance' if criterion == 'time' else criterion
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        # Point 0 is the start; duplicate stops and stops at the start are visited once
+        points = [self.node_index[start_node]]
+        for stop in stops:
+            if self.node_index[stop] not in points:
+                points.append(self.node_index[stop])
+        count = len(points)
+        
+        # Cost matrix and one predecessor tree per point (edges are undirected, so it is symmetric)
+        matrix = []
+        trees = []
+        for source in points:
+            distances, previous = self._dijkstra(source, -1, weight_type, stop_nodes=set(points))
+            matrix.append([distances[target] for target in points])
+            trees.append(previous)
+        unreachable = [self.node_names[points[i]] for i in range(1, count) if matrix[0][i] == float('inf')]
+        if unreachable:
+            log.error("ERROR: Stops %s are unreachable from %s", unreachable, start_node)
+            return None
+        
+        # End point: back to the start, or a free end (an extra point with zero cost to everything)
+        end = 0
+        if not return_to_start:
+            end = count
+            for row in matrix:
+                row.append(0.0)
+            matrix.append([0.0] * (count + 1))
+        
+        # Nearest-neighbour construction
+        order = [0]
+        unvisited = set(range(1, count))
+        while unvisited:
+            row = matrix[order[-1]]
+            nearest = min(unvisited, key=lambda i: (row[i], i))
+            order.append(nearest)
+            unvisited.discard(nearest)
+        order.append(end)
+        
+        def out_of_time():
+            return deadline is not None and time.perf_counter() > deadline
+        
+        def two_opt():
+            """Reverse order[i..j] if that shortens the route; first improvement wins"""
+            for i in range(1, len(order) - 2):
+                a, b = order[i - 1], order[i]
+                for j in range(i + 1, len(order) - 1):
+                    c, e = order[j], order[j + 1]
+                    if matrix[a][c] + matrix[b][e] < matrix[a][b] + matrix[c][e] - 1e-9:
+                        order[i:j + 1] = order[i:j + 1][::-1]
+                        return True
+                if out_of_time():
+                    return False
+            return False
+        
+        def or_opt():
+            """Move a run of 1-3 stops (either way round) to a cheaper place in the route"""
+            for length in (1, 2, 3):
+                for i in range(1, len(order) - length):
+                    first, last = order[i], order[i + length - 1]
+                    before, after = order[i - 1], order[i + length]
+                    saving = matrix[before][first] + matrix[last][after] - matrix[before][after]
+                    rest = order[:i] + order[i + length:]
+                    for p in range(len(rest) - 1):
+                        if p == i - 1:
+                            continue
+                        x, y = rest[p], rest[p + 1]
+                        forward = matrix[x][first] + matrix[last][y] - matrix[x][y]
+                        backward = matrix[x][last] + matrix[first][y] - matrix[x][y]
+                        if min(forward, backward) < saving - 1e-9:
+                            segment = order[i:i + length]
+                            if backward < forward:
+                                segment.reverse()
+                            order[:] = rest[:p + 1] + segment + rest[p + 1:]
+                            return True
+                    if out_of_time():
+                        return False
+            return False
+        
+        passes = 0
+        while not out_of_time() and (two_opt() or or_opt()):
+            passes += 1
+        
+        # Stitch the legs from the predecessor trees
+        visits = order[1:] if return_to_start else order[1:-1]
+        path = [start_node]
+        legs = []
+        previous_point = 0
+        for point in visits:
+            leg_ids = self._reconstruct_path(trees[previous_point], points[point])
+            leg_path = [self.node_names[node_id] for node_id in leg_ids]
+            metrics = self.calculate_path_metrics(leg_path)
+            legs.append({
+                'from': leg_path[0],
+                'to': leg_path[-1],
+                'path': leg_path,
+                'distance': metrics['distance'],
+                'carbon': metrics['carbon'],
+                'cost': metrics['cost'],
+                'travel_time': self.calculate_travel_time(leg_path, vehicle_id)
+            })
+            path.extend(leg_path[1:])
+            previous_point = point
+        
+        result = {
+            'order': [self.node_names[points[point]] for point in order[1:-1]],
+            'path': path,
+            'legs': legs,
+            'distance': sum(leg['distance'] for leg in legs),
+            'carbon': sum(leg['carbon'] for leg in legs),
+            'cost': sum(leg['cost'] for leg in legs),
+            'travel_time': sum(leg['travel_time'] for leg in legs),
+            'objective': sum(matrix[a][b] for a, b in zip(order, order[1:])),
+            'improvement_passes': passes
+        }
+        log.info("Multi-stop route for Vehicle %s: %s (%d legs, Time: %.2f)",
+                 vehicle_id, ArrowPath([start_node] + result['order']), len(legs), result['travel_time'])
+        return result
+    
+    def find_all_optimal_paths(self, start_node: str, end_node: str, vehicle_id: int, criteria=None,
+                               departure_time: float = None) -> Dict[str, Dict]:
+        """Find optimal paths for all criteria (or only the requested ones) and return with metrics
+        
+        Each distance/carbon/cost search runs at most once per call. The 'time' path is
+        the fastest of the paths already found; travel time is distance / speed, so the
+        shortest-distance path is always a candidate and a lone 'time' request only
+        needs the distance search
+        
+        With a departure_time and time profiles loaded, travel times follow the profiles
+        and the 'time' path comes from the time-dependent search
+        """
         # Validate inputs
         if start_node not in self.nodes:
-            print(f"Error: Start node '{start_node}' not found in network. Available nodes: {list(self.nodes.keys())}")
+            log.error("Error: Start node '%s' not found in network (%d nodes)", start_node, len(self.nodes))
             return {}
             
         if end_node not in self.nodes:
-            print(f"Error: End node '{end_node}' not found in network. Available nodes: {list(self.nodes.keys())}")
+            log.error("Error: End node '%s' not found in network (%d nodes)", end_node, len(self.nodes))
             return {}
             
         if vehicle_id not in self.vehicles:
-            print(f"Error: Vehicle {vehicle_id} not found. Available vehicles: {list(self.vehicles.keys())}")
+            log.error("Error: Vehicle %s not found. Available vehicles: %s", vehicle_id, list(self.vehicles))
             return {}
             
-        print(f"Finding optimal paths from {start_node} to {end_node} for Vehicle {vehicle_id}")
-        print(f"Vehicle {vehicle_id} speed: {self.vehicles[vehicle_id]['speed']} units/time")
+        log.debug("Finding optimal paths from %s to %s for Vehicle %s", start_node, end_node, vehicle_id)
+        log.debug("Vehicle %s speed: %s units/time", vehicle_id, self.vehicles[vehicle_id]['speed'])
+        
+        requested = list(self.CRITERION_LABELS) if criteria is None else [c for c in criteria if c in self.CRITERION_LABELS]
+        
+        time_dependent = departure_time is not None and self.time_profiles is not None
+        
+        # Work out which searches are needed ('time' is derived from the others)
+        searches = [c for c in ('distance', 'carbon', 'cost') if c in requested]
+        if 'time' in requested and 'distance' not in searches and not time_dependent:
+            searches.insert(0, 'distance')
+        criterion_paths = self.find_criterion_paths(start_node, end_node, searches)
+        if time_dependent and 'time' in requested:
+            searches.append('time')
+            criterion_paths['time'] = self.td_shortest_path(start_node, end_node, departure_time, vehicle_id)
+        
+        # Metrics and travel time are computed once per search result
+        candidates = {}
+        for criterion in searches:
+            path, _ = criterion_paths[criterion]
+            if path:
+                metrics = self.calculate_path_metrics(path)
+                candidates[criterion] = {
+                    'path': path,
+                    'distance': metrics['distance'],
+                    'carbon': metrics['carbon'],
+                    'cost': metrics['cost'],
+                    'travel_time': (self.calculate_travel_time_at(path, vehicle_id, departure_time) if time_dependent
+                                    else self.calculate_travel_time(path, vehicle_id)),
+                    'criterion': self.CRITERION_LABELS[criterion]
+                }
         
         results = {}
-        
-        # 1. Shortest Distance Path
-        distance_path, distance_value = self.dijkstra_shortest_path(start_node, end_node, 'distance')
-        if distance_path:
-            distance_metrics = self.calculate_path_metrics(distance_path)
-            travel_time = self.calculate_travel_time(distance_path, vehicle_id)
-            
-            results['distance'] = {
-                'path': distance_path,
-                'distance': distance_metrics['distance'],
-                'carbon': distance_metrics['carbon'],
-                'cost': distance_metrics['cost'],
-                'travel_time': travel_time,
-                'criterion': 'Shortest Distance'
-            }
-        
-        # 2. Lowest Carbon Emission Path
-        carbon_path, carbon_value = self.dijkstra_shortest_path(start_node, end_node, 'carbon')
-        if carbon_path:
-            carbon_metrics = self.calculate_path_metrics(carbon_path)
-            travel_time = self.calculate_travel_time(carbon_path, vehicle_id)
-            
-            results['carbon'] = {
-                'path': carbon_path,
-                'distance': carbon_metrics['distance'],
-                'carbon': carbon_metrics['carbon'],
-                'cost': carbon_metrics['cost'],
-                'travel_time': travel_time,
-                'criterion': 'Lowest Carbon Emission'
-            }
-        
-        # 3. Lowest Cost Path
-        cost_path, cost_value = self.dijkstra_shortest_path(start_node, end_node, 'cost')
-        if cost_path:
-            cost_metrics = self.calculate_path_metrics(cost_path)
-            travel_time = self.calculate_travel_time(cost_path, vehicle_id)
-            
-            results['cost'] = {
-                'path': cost_path,
-                'distance': cost_metrics['distance'],
-                'carbon': cost_metrics['carbon'],
-                'cost': cost_metrics['cost'],
-                'travel_time': travel_time,
-                'criterion': 'Lowest Cost'
-            }
-        
-        # 4. Find fastest travel time (try all paths and pick fastest)
-        fastest_time = float('inf')
-        fastest_path = []
-        
-        for criterion in ['distance', 'carbon', 'cost']:
-            temp_path, _ = self.dijkstra_shortest_path(start_node, end_node, criterion)
-            if temp_path:
-                temp_time = self.calculate_travel_time(temp_path, vehicle_id)
-                if temp_time < fastest_time:
-                    fastest_time = temp_time
-                    fastest_path = temp_path
-        
-        if fastest_path:
-            time_metrics = self.calculate_path_metrics(fastest_path)
-            results['time'] = {
-                'path': fastest_path,
-                'distance': time_metrics['distance'],
-                'carbon': time_metrics['carbon'],
-                'cost': time_metrics['cost'],
-                'travel_time': fastest_time,
-                'criterion': 'Fastest Travel Time'
-            }
+        for criterion in requested:
+            if criterion == 'time':
+                # Fastest travel time among the paths found (first wins on ties)
+                fastest = None
+                for candidate in candidates.values():
+                    if fastest is None or candidate['travel_time'] < fastest['travel_time']:
+                        fastest = candidate
+                if fastest:
+                    results['time'] = dict(fastest, criterion=self.CRITERION_LABELS['time'])
+            elif criterion in candidates:
+                results[criterion] = candidates[criterion]
         
         return results
     
-    def find_optimal_path_for_vehicle(self, vehicle_id: int, destination: str, priority: int = 1, override_start: str = None) -> Optional[Dict]:
-        """Find optimal path for a specific vehicle using their current location - NO DANGEROUS DEFAULTS"""
+    def find_optimal_path_for_vehicle(self, vehicle_id: int, destination: str, priority: int = 1, override_start: str = None,
+                                      departure_time: float = None) -> Optional[Dict]:
+        """Find optimal path for a specific vehicle using their current location - NO DANGEROUS DEFAULTS
+        
+        departure_time (profile time, see profile_clock) makes travel times time-dependent
+        """
         
         # Validate vehicle exists
         if vehicle_id not in self.vehicles:
-            print(f"CRITICAL ERROR: Vehicle {vehicle_id} not found. Available vehicles: {list(self.vehicles.keys())}")
+            log.critical("CRITICAL ERROR: Vehicle %s not found. Available vehicles: %s", vehicle_id, list(self.vehicles))
             return None
             
         # Get current location (either override or tracked location)
         if override_start:
             start_node = override_start
-            print(f"Using override start location for Vehicle {vehicle_id}: {start_node}")
+            log.debug("Using override start location for Vehicle %s: %s", vehicle_id, start_node)
         else:
             start_node = self.get_vehicle_current_location(vehicle_id)
             
         if not start_node:
-            print(f"CRITICAL ERROR: Cannot determine starting location for Vehicle {vehicle_id}")
+            log.critical("CRITICAL ERROR: Cannot determine starting location for Vehicle %s", vehicle_id)
             return None
         
         # Validate start node exists in network
         if start_node not in self.nodes:
-            print(f"CRITICAL ERROR: Start node '{start_node}' not found in network for Vehicle {vehicle_id}")
+            log.critical("CRITICAL ERROR: Start node '%s' not found in network for Vehicle %s", start_node, vehicle_id)
             return None
             
         # Validate destination
         if destination not in self.nodes:
-            print(f"CRITICAL ERROR: Destination '{destination}' not found in network. Available nodes: {list(self.nodes.keys())}")
+            log.critical("CRITICAL ERROR: Destination '%s' not found in network (%d nodes)", destination, len(self.nodes))
             return None
             
         # Set target for tracking
         self.set_vehicle_target(vehicle_id, destination)
         
-        # Reduced logging - only show key info
-        print(f"Route: Vehicle {vehicle_id} ({start_node} → {destination})")
+        log.info("Route: Vehicle %s (%s → %s)", vehicle_id, start_node, destination)
         
         # Get optimal path based on priority
-        optimal_path_data = self.get_optimal_path_by_priority(start_node, destination, vehicle_id, priority)
+        optimal_path_data = self.get_optimal_path_by_priority(start_node, destination, vehicle_id, priority,
+                                                              departure_time)
         
         if optimal_path_data:
-            print(f"Path found: {' → '.join(optimal_path_data['path'])} (Time: {optimal_path_data['travel_time']:.2f})")
+            log.info("Path found: %s (Time: %.2f)", ArrowPath(optimal_path_data['path']), optimal_path_data['travel_time'])
         else:
-            print(f"CRITICAL ERROR: No path found for Vehicle {vehicle_id} from {start_node} to {destination}")
+            log.critical("CRITICAL ERROR: No path found for Vehicle %s from %s to %s", vehicle_id, start_node, destination)
         
         return optimal_path_data
-    def get_optimal_path_by_priority(self, start_node: str, end_node: str, vehicle_id: int, priority: int) -> Optional[Dict]:
+    def get_optimal_path_by_priority(self, start_node: str, end_node: str, vehicle_id: int, priority: int,
+                                     departure_time: float = None) -> Optional[Dict]:
         """Get optimal path based on priority (1=distance, 2=carbon, 3=cost, 4=time)"""
         # Validate that we have the correct vehicle
         if vehicle_id not in self.vehicles:
-            print(f"Error: Vehicle {vehicle_id} not found in vehicles data!")
+            log.error("Error: Vehicle %s not found in vehicles data!", vehicle_id)
             return None
             
         # Route calculation with vehicle-specific data
-        print(f"Route calculation: Vehicle {vehicle_id} from {start_node} to {end_node} (Priority: {priority})")
-        print(f"Vehicle {vehicle_id} data: Speed={self.vehicles[vehicle_id]['speed']}, "
-              f"Start node from file={self.vehicles[vehicle_id]['start_node']}")
-        
-        all_paths = self.find_all_optimal_paths(start_node, end_node, vehicle_id)
-        
-        if not all_paths:
-            print(f"No paths found from {start_node} to {end_node} for Vehicle {vehicle_id}")
-            return None
+        log.debug("Route calculation: Vehicle %s from %s to %s (Priority: %s)", vehicle_id, start_node, end_node, priority)
+        log.debug("Vehicle %s data: Speed=%s, Start node from file=%s",
+                  vehicle_id, self.vehicles[vehicle_id]['speed'], self.vehicles[vehicle_id]['start_node'])
         
         priority_map = {
             1: 'distance',
@@ -566,14 +3636,23 @@ class VehicleRoutingSystem:
         }
         
         criterion = priority_map.get(priority, 'distance')
+        
+        # Only the search for the requested priority is run
+        all_paths = self.find_all_optimal_paths(start_node, end_node, vehicle_id, criteria=[criterion],
+                                                departure_time=departure_time)
+        
+        if not all_paths:
+            log.warning("No paths found from %s to %s for Vehicle %s", start_node, end_node, vehicle_id)
+            return None
+        
         selected_path = all_paths.get(criterion)
         
         if selected_path:
-            print(f"Selected path ({criterion}) for Vehicle {vehicle_id}: {' → '.join(selected_path['path'])}")
-            print(f"Using Vehicle {vehicle_id} speed: {self.vehicles[vehicle_id]['speed']} for time calculation")
-            print(f"Travel time for Vehicle {vehicle_id}: {selected_path['travel_time']:.2f} time units")
+            log.debug("Selected path (%s) for Vehicle %s: %s", criterion, vehicle_id, ArrowPath(selected_path['path']))
+            log.debug("Using Vehicle %s speed: %s for time calculation", vehicle_id, self.vehicles[vehicle_id]['speed'])
+            log.debug("Travel time for Vehicle %s: %.2f time units", vehicle_id, selected_path['travel_time'])
         else:
-            print(f"No {criterion} path found for Vehicle {vehicle_id}")
+            log.warning("No %s path found for Vehicle %s", criterion, vehicle_id)
         
         return selected_path
         
@@ -666,5 +3745,20 @@ class VehicleRoutingSystem:
             print(f"  Travel Time: {data['travel_time']:.2f} time units")
 
 
+# Routing system owned by a process pool worker (set by _init_routing_worker)
+_worker_routing_system = None
+
+
+def _init_routing_worker(routing_system: VehicleRoutingSystem):
+    """Process pool initializer: keep one copy of the routing system per worker"""
+    global _worker_routing_system
+    _worker_routing_system = routing_system
+
+
+def _routing_worker_tree_rows(sources: range, criterion: str):
+    """Process pool task: all-pairs rows for a chunk of sources"""
+    return _worker_routing_system._shortest_path_tree_rows(sources, criterion)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,173 @@
+# routing_log.py - Levelled, lazily formatted logging for route.py and the agents
+# Messages use %-style arguments so nothing is formatted when a level is disabled; an
+# optional ring buffer keeps recent records (unformatted) so a quiet production run can
+# still be dumped on demand.
+#
+# Environment:
+#   VRS_LOG_LEVEL   console level: DEBUG, INFO (default), WARNING, ERROR or OFF
+#   VRS_LOG_RING    ring buffer capacity in records (0 = disabled, the default)
+#   VRS_LOG_FORMAT  'text' (default, message only) or 'json' (one object per line)
+#
+# Usage:
+#   from routing_log import get_logger
+#   log = get_logger('route')
+#   log.debug("Path found: %s (Time: %.2f)", ArrowPath(path), travel_time)
+#
+#   import routing_log
+#   routing_log.configure(level='OFF', ring_size=5000)   # quiet, but keep a trace
+#   routing_log.install_dump_signal()                    # kill -USR1 <pid> dumps it
+import json
+import logging
+import os
+import signal
+import sys
+from collections import deque
+from typing import Optional
+
+ROOT_LOGGER = 'vrs'
+DEFAULT_LEVEL = os.environ.get('VRS_LOG_LEVEL', 'INFO')
+DEFAULT_RING_SIZE = int(os.environ.get('VRS_LOG_RING', '0'))
+DEFAULT_FORMAT = os.environ.get('VRS_LOG_FORMAT', 'text')
+
+# Level above CRITICAL: nothing is enabled
+OFF = logging.CRITICAL + 10
+
+_console_handler = None
+_ring_handler = None
+_configured = False
+
+
+class ArrowPath:
+    """Lazily joined 'A → B → C' path text; only built if the record is formatted"""
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+    def __str__(self):
+        return ' → '.join(self.path)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """StreamHandler that writes to the current sys.stdout (so redirect_stdout works)"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed with extra={'fields': {...}} are merged in"""
+
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent records in memory; formatting is deferred until dump()"""
+
+    def __init__(self, capacity: int = 10000, level=logging.DEBUG):
+        super().__init__(level)
+        self.buffer = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.buffer.append(record)
+
+    def dump(self, stream=None, clear: bool = False) -> int:
+        """Write buffered records, oldest first; returns the number written"""
+        stream = stream or sys.stderr
+        records = list(self.buffer)
+        for record in records:
+            stream.write(self.format(record) + '\n')
+        stream.flush()
+        if clear:
+            self.buffer.clear()
+        return len(records)
+
+    def clear(self):
+        self.buffer.clear()
+
+
+def _parse_level(level) -> int:
+    if isinstance(level, int):
+        return level
+    name = str(level).upper()
+    if name in ('OFF', 'QUIET', 'NONE'):
+        return OFF
+    value = logging.getLevelName(name)
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level '{level}'")
+    return value
+
+
+def configure(level=None, ring_size: int = None, ring_level=logging.DEBUG, fmt: str = None, stream=None):
+    """(Re)configure the 'vrs' logger tree
+
+    The logger's own level is the lowest level any sink wants, so a disabled level is
+    rejected by logger.isEnabledFor() before any message or record is built
+    """
+    global _console_handler, _ring_handler, _configured
+    level = _parse_level(DEFAULT_LEVEL if level is None else level)
+    ring_size = DEFAULT_RING_SIZE if ring_size is None else ring_size
+    ring_level = _parse_level(ring_level)
+    formatter = JsonFormatter() if (fmt or DEFAULT_FORMAT) == 'json' else logging.Formatter('%(message)s')
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in (_console_handler, _ring_handler):
+        if handler is not None:
+            logger.removeHandler(handler)
+    _console_handler = _ring_handler = None
+    logger.propagate = False
+
+    if level < OFF:
+        _console_handler = logging.StreamHandler(stream) if stream is not None else _StdoutHandler()
+        _console_handler.setLevel(level)
+        _console_handler.setFormatter(formatter)
+        logger.addHandler(_console_handler)
+    if ring_size > 0:
+        _ring_handler = RingBufferHandler(ring_size, ring_level)
+        _ring_handler.setFormatter(formatter)
+        logger.addHandler(_ring_handler)
+
+    logger.setLevel(min(level, ring_level if _ring_handler else OFF))
+    _configured = True
+    return logger
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Logger for one component (e.g. 'route', 'vehicle'); configures defaults on first use"""
+    if not _configured:
+        configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{component}")
+
+
+def ring_buffer() -> Optional[RingBufferHandler]:
+    return _ring_handler
+
+
+def dump_ring_buffer(stream=None, clear: bool = False) -> int:
+    """Dump the ring buffer if one is configured; returns the number of records written"""
+    if _ring_handler is None:
+        return 0
+    return _ring_handler.dump(stream, clear)
+
+
+def install_dump_signal(signum: int = None) -> bool:
+    """Dump the ring buffer to stderr on a signal (SIGUSR1 by default, where available)"""
+    if signum is None:
+        signum = getattr(signal, 'SIGUSR1', None)
+    if signum is None:
+        return False
+    signal.signal(signum, lambda *_: dump_ring_buffer())
+    return True
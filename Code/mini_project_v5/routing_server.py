@@ -0,0 +1,479 @@
+# routing_server.py - One routing process serving every agent on a host
+# The server owns a VehicleRoutingSystem and answers newline-delimited JSON requests over
+# localhost TCP or a Unix socket:  {"id": 1, "op": "route", "start": "A", "end": "B"}  ->
+# {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}. Unreachable costs are Infinity.
+#
+# Point-to-point routes and ETA-matrix cells that arrive within a short batch window are
+# grouped per criterion by shared source (or shared target, searched in reverse) and each
+# group is answered by one one-to-many search. Searches and the heavier per-vehicle queries
+# run on a process pool whose workers each hold a copy of the graph; the pool is restarted
+# after edge-weight updates.
+#
+# Usage:
+#   python routing_server.py map.txt vehicles.txt --address 127.0.0.1:8765 --workers 4
+#
+#   from routing_server import RoutingClient
+#   client = await RoutingClient.connect('127.0.0.1:8765')   # or 'unix:/tmp/vrs.sock'
+#   path, cost = await client.route('A', 'B', 'carbon')
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from route import VehicleRoutingSystem
+from routing_log import get_logger
+
+log = get_logger('routing_server')
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+BATCH_WINDOW = 0.002     # seconds to collect point-to-point queries before searching
+MAX_BATCH = 512          # flush early once this many queries are waiting
+STREAM_LIMIT = 2 ** 24   # largest request / response line (bytes)
+
+
+class RoutingServerError(Exception):
+    """Error reported by the routing server for one request"""
+
+
+# Routing system used by the worker functions (set by _init_server_worker, or the server
+# itself when it runs without a pool)
+_worker_routing = None
+
+
+def _init_server_worker(routing: VehicleRoutingSystem):
+    """Process pool initializer: keep one copy of the routing system per worker"""
+    global _worker_routing
+    _worker_routing = routing
+
+
+def _worker_one_to_many(source: str, targets: List[str], criterion, reverse: bool):
+    """Pool task: one search answering every (source, target) pair of a batch group"""
+    results = _worker_routing.one_to_many_paths(source, targets, criterion)
+    if reverse:
+        # The graph is undirected, so a search from the shared target gives the reversed paths
+        return {node: (path[::-1], cost) for node, (path, cost) in results.items()}
+    return results
+
+
+def _worker_call(method: str, locations: Dict[int, str], kwargs: Dict):
+    """Pool task: one VehicleRoutingSystem query, with the server's vehicle locations"""
+    _worker_routing.vehicle_current_locations.update(locations)
+    return getattr(_worker_routing, method)(**kwargs)
+
+
+def _criterion(value):
+    """Criterion from JSON: objective keys arrive as lists"""
+    return tuple(value) if isinstance(value, list) else value
+
+
+class RoutingServer:
+    """Batching request handler around one VehicleRoutingSystem"""
+
+    def __init__(self, routing: VehicleRoutingSystem, workers: Optional[int] = None,
+                 batch_window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        self.routing = routing
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.pool = None
+        self.pool_version = None
+        # criterion -> [(start, end, future)] waiting for the next flush
+        self.pending = defaultdict(list)
+        self.pending_count = 0
+        self.flush_handle = None
+        self.stats = defaultdict(int)
+
+    # ---- execution ----
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        """Worker pool matching the current graph (None = run in the server process)"""
+        if self.workers <= 0:
+            return None
+        if self.pool is None or self.pool_version != self.routing.graph_version:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_server_worker,
+                                            initargs=(self.routing,))
+            self.pool_version = self.routing.graph_version
+            log.info("Started %d routing workers (graph version %d)", self.workers, self.pool_version)
+        return self.pool
+
+    async def _run(self, func, *args):
+        executor = self._executor()
+        if executor is None:
+            _init_server_worker(self.routing)
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    async def _call(self, method: str, **kwargs):
+        return await self._run(_worker_call, method, dict(self.routing.vehicle_current_locations), kwargs)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    # ---- batching ----
+
+    def _pairs(self, pairs: Sequence[Tuple[str, str]], criterion) -> List[asyncio.Future]:
+        """Queue point-to-point queries for the next batch; one future per pair"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for start, end in pairs:
+            future = loop.create_future()
+            self.pending[criterion].append((start, end, future))
+            futures.append(future)
+        self.pending_count += len(futures)
+        self.stats['queries'] += len(futures)
+        if self.pending_count >= self.max_batch:
+            self._schedule_flush(0)
+        elif self.flush_handle is None:
+            self._schedule_flush(self.batch_window)
+        return futures
+
+    def _schedule_flush(self, delay: float):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self.flush_handle = loop.call_later(delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self):
+        """Answer every queued query with one search per shared source or target"""
+        pending, self.pending = self.pending, defaultdict(list)
+        self.pending_count = 0
+        self.flush_handle = None
+
+        searches = []
+        for criterion, queries in pending.items():
+            sources = {start for start, _, _ in queries}
+            targets = {end for _, end, _ in queries}
+            reverse = len(targets) < len(sources)
+            groups = defaultdict(list)
+            for start, end, future in queries:
+                if reverse:
+                    groups[end].append((start, future))
+                else:
+                    groups[start].append((end, future))
+            for node, members in groups.items():
+                others = list({other for other, _ in members})
+                searches.append((members, self._run(_worker_one_to_many, node, others, criterion, reverse)))
+        self.stats['batches'] += 1
+        self.stats['searches'] += len(searches)
+
+        results = await asyncio.gather(*(search for _, search in searches), return_exceptions=True)
+        for (members, _), result in zip(searches, results):
+            for other, future in members:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result[other])
+
+    # ---- requests ----
+
+    async def handle(self, request: Dict):
+        """Result for one decoded request (raises RoutingServerError on bad input)"""
+        op = request.get('op')
+        self.stats[f"op_{op}"] += 1
+        routing = self.routing
+        criterion = _criterion(request.get('criterion', 'distance'))
+
+        if op == 'route':
+            self._check_nodes(request['start'], request['end'])
+            path, cost = await self._pairs([(request['start'], request['end'])], criterion)[0]
+            return {'path': path, 'cost': cost}
+
+        if op == 'eta_matrix':
+            sources, targets = request['sources'], request['targets']
+            self._check_nodes(*sources, *targets)
+            speed = request.get('speed')
+            if speed is None and request.get('vehicle_id') is not None:
+                speed = self._vehicle(request['vehicle_id'])['speed']
+            futures = self._pairs([(s, t) for s in sources for t in targets], criterion)
+            costs = [cost for _, cost in await asyncio.gather(*futures)]
+            if speed:
+                costs = [cost / speed for cost in costs]
+            width = len(targets)
+            return {'matrix': [costs[row * width:(row + 1) * width] for row in range(len(sources))]}
+
+        if op == 'k_shortest':
+            self._check_nodes(request['start'], request['end'])
+            paths = await self._call('k_shortest_paths', start_node=request['start'], end_node=request['end'],
+                                     k=request.get('k', 3), criterion=criterion,
+                                     time_budget=request.get('time_budget'))
+            return {'paths': paths}
+
+        if op == 'multi_criteria':
+            self._check_nodes(request['start'], request['end'])
+            self._vehicle(request['vehicle_id'])
+            return await self._call('find_all_optimal_paths', start_node=request['start'],
+                                    end_node=request['end'], vehicle_id=request['vehicle_id'],
+                                    criteria=request.get('criteria'),
+                                    departure_time=request.get('departure_time'))
+
+        if op == 'vehicle_route':
+            self._check_nodes(request['destination'], *filter(None, [request.get('start')]))
+            self._vehicle(request['vehicle_id'])
+            if request.get('objective_weights'):
+                return await self._call('find_weighted_path_for_vehicle', vehicle_id=request['vehicle_id'],
+                                        destination=request['destination'],
+                                        objective_weights=request['objective_weights'],
+                                        override_start=request.get('start'))
+            return await self._call('find_optimal_path_for_vehicle', vehicle_id=request['vehicle_id'],
+                                    destination=request['destination'], priority=request.get('priority', 1),
+                                    override_start=request.get('start'),
+                                    departure_time=request.get('departure_time'))
+
+        if op == 'fleet_to_destination':
+            self._check_nodes(request['destination'])
+            routes = await self._call('get_fleet_routes_to_destination', destination=request['destination'],
+                                      criterion=criterion, vehicle_ids=request.get('vehicle_ids'))
+            return {str(vehicle_id): route for vehicle_id, route in routes.items()}
+
+        if op == 'update_location':
+            self._check_nodes(request['node'])
+            self._vehicle(request['vehicle_id'])
+            routing.update_vehicle_location(request['vehicle_id'], request['node'])
+            return {'ok': True}
+
+        if op == 'update_weights':
+            updates = [tuple(update) for update in request['updates']]
+            changed = routing.update_edge_weights(updates)
+            return {'changed': changed, 'graph_version': routing.graph_version}
+
+        if op == 'stats':
+            return dict(self.stats, graph_version=routing.graph_version, workers=self.workers,
+                        nodes=len(routing.node_names))
+
+        raise RoutingServerError(f"Unknown op '{op}'")
+
+    def _check_nodes(self, *nodes: str):
+        for node in nodes:
+            if node not in self.routing.node_index:
+                raise RoutingServerError(f"Unknown node '{node}'")
+
+    def _vehicle(self, vehicle_id) -> Dict:
+        if vehicle_id not in self.routing.vehicles:
+            raise RoutingServerError(f"Unknown vehicle {vehicle_id}")
+        return self.routing.vehicles[vehicle_id]
+
+    # ---- connections ----
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Read pipelined requests from one connection; responses are sent as they finish"""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request):
+            reply = {'id': request.get('id')}
+            try:
+                reply['result'] = await self.handle(request)
+            except (RoutingServerError, KeyError, TypeError, ValueError) as exc:
+                reply['error'] = f"{type(exc).__name__}: {exc}"
+            except Exception as exc:
+                log.exception("Request %s failed", request.get('op'))
+                reply['error'] = f"{type(exc).__name__}: {exc}"
+            async with write_lock:
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    request = {'op': None, 'bad_json': str(exc)}
+                if not isinstance(request, dict):
+                    request = {'op': None}
+                task = asyncio.ensure_future(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # client went away, or the server is shutting down
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def start(self, address: str = DEFAULT_ADDRESS) -> asyncio.AbstractServer:
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            if os.path.exists(path):
+                os.unlink(path)
+            return await asyncio.start_unix_server(self.serve_client, path, limit=STREAM_LIMIT)
+        host, port = _split_address(address)
+        return await asyncio.start_server(self.serve_client, host, port, limit=STREAM_LIMIT)
+
+
+def _split_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+class RoutingClient:
+    """Async client for a routing server; concurrent calls share one pipelined connection"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting: Dict[int, asyncio.Future] = {}
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, address: str = DEFAULT_ADDRESS) -> 'RoutingClient':
+        if address.startswith('unix:'):
+            reader, writer = await asyncio.open_unix_connection(address[len('unix:'):], limit=STREAM_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(*_split_address(address), limit=STREAM_LIMIT)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        error = ConnectionError("Routing server closed the connection")
+        try:
+            while line := await self.reader.readline():
+                reply = json.loads(line)
+                future = self.waiting.pop(reply.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in reply:
+                    future.set_exception(RoutingServerError(reply['error']))
+                else:
+                    future.set_result(reply['result'])
+        except Exception as exc:
+            error = exc
+        for future in self.waiting.values():
+            if not future.done():
+                future.set_exception(error)
+        self.waiting.clear()
+
+    async def request(self, op: str, **params):
+        """Send one request and wait for its result"""
+        if self.receiver.done():
+            raise ConnectionError("Routing server connection is closed")
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        self.writer.write(json.dumps(dict(params, id=self.next_id, op=op)).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def route(self, start: str, end: str, criterion='distance') -> Tuple[List[str], float]:
+        result = await self.request('route', start=start, end=end, criterion=criterion)
+        return result['path'], result['cost']
+
+    async def eta_matrix(self, sources: Sequence[str], targets: Sequence[str], criterion='distance',
+                         vehicle_id: int = None, speed: float = None) -> List[List[float]]:
+        """Costs (or travel times, given a vehicle or speed) for every source x target"""
+        result = await self.request('eta_matrix', sources=list(sources), targets=list(targets),
+                                    criterion=criterion, vehicle_id=vehicle_id, speed=speed)
+        return result['matrix']
+
+    async def k_shortest_paths(self, start: str, end: str, k: int = 3, criterion='distance',
+                               time_budget: float = None) -> List[Tuple[List[str], float]]:
+        result = await self.request('k_shortest', start=start, end=end, k=k, criterion=criterion,
+                                    time_budget=time_budget)
+        return [(path, cost) for path, cost in result['paths']]
+
+    async def multi_criteria(self, start: str, end: str, vehicle_id: int, criteria=None,
+                             departure_time: float = None) -> Dict[str, Dict]:
+        return await self.request('multi_criteria', start=start, end=end, vehicle_id=vehicle_id,
+                                  criteria=criteria, departure_time=departure_time)
+
+    async def vehicle_route(self, vehicle_id: int, destination: str, start: str = None, priority: int = 1,
+                            objective_weights: Dict[str, float] = None,
+                            departure_time: float = None) -> Optional[Dict]:
+        """find_optimal_path_for_vehicle (or the weighted variant) on the server"""
+        return await self.request('vehicle_route', vehicle_id=vehicle_id, destination=destination, start=start,
+                                  priority=priority, objective_weights=objective_weights,
+                                  departure_time=departure_time)
+
+    async def fleet_to_destination(self, destination: str, criterion='distance',
+                                   vehicle_ids: List[int] = None) -> Dict[int, Dict]:
+        result = await self.request('fleet_to_destination', destination=destination, criterion=criterion,
+                                    vehicle_ids=vehicle_ids)
+        return {int(vehicle_id): route for vehicle_id, route in result.items()}
+
+    async def update_location(self, vehicle_id: int, node: str):
+        await self.request('update_location', vehicle_id=vehicle_id, node=node)
+
+    async def update_weights(self, updates) -> int:
+        result = await self.request('update_weights', updates=[list(update) for update in updates])
+        return result['changed']
+
+    async def stats(self) -> Dict:
+        return await self.request('stats')
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        await self.receiver
+
+
+async def serve(routing: VehicleRoutingSystem, address: str, workers: Optional[int], batch_window: float):
+    server = RoutingServer(routing, workers=workers, batch_window=batch_window)
+    listener = await server.start(address)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+    print(f"Routing server on {address} ({server.workers} workers) - Ctrl+C to stop")
+    started = time.perf_counter()
+    try:
+        async with listener:
+            await stop.wait()
+    finally:
+        server.close()
+        log.info("Served %d queries in %d searches over %.0fs", server.stats['queries'],
+                 server.stats['searches'], time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve routing queries for local agents")
+    parser.add_argument('map_file', help="map.txt to route on")
+    parser.add_argument('vehicles_file', help="vehicles.txt")
+    parser.add_argument('--address', default=DEFAULT_ADDRESS,
+                        help="host:port, or unix:/path/to.sock (default %(default)s)")
+    parser.add_argument('--workers', type=int, help="routing worker processes (0 = in the server process)")
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW * 1000, metavar='MS',
+                        help="how long to collect queries into one batch (default %(default)s ms)")
+    parser.add_argument('--method', choices=VehicleRoutingSystem.SEARCH_METHODS, help="search method")
+    parser.add_argument('--landmarks', action='store_true', help="build ALT landmark tables")
+    parser.add_argument('--ch', action='store_true', help="build contraction hierarchies")
+    parser.add_argument('--shared-graph', metavar='NAME', help="attach to a shared_graph.py publisher instead of loading the map")
+    args = parser.parse_args()
+
+    if args.shared_graph:
+        import shared_graph
+        routing = shared_graph.attach(args.shared_graph, args.vehicles_file)
+    else:
+        routing = VehicleRoutingSystem(args.map_file, args.vehicles_file)
+    if args.method:
+        routing.search_method = args.method
+    if args.landmarks:
+        routing.build_landmarks()
+    if args.ch:
+        routing.build_contraction_hierarchies()
+
+    try:
+        asyncio.run(serve(routing, args.address, args.workers, args.batch_window / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
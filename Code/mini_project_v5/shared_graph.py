@@ -0,0 +1,328 @@
+# shared_graph.py - One copy of the routing graph for every agent process on a host
+# The publisher writes the compiled-map arrays (nodes, adjacency index, weights, connection
+# lists), the component labels and any current ALT / all-pairs tables into one
+# multiprocessing.shared_memory block. Agent processes attach read-only: route.py's arrays
+# become zero-copy memoryviews and the tables read-only NumPy arrays over that block, so
+# only the node-name index is built per process. A process that changes edge weights
+# gets a private copy of that one weight array (see update_edge_weights).
+#
+# A small control block holds a generation counter. Republishing (e.g. after map.txt
+# changes) writes a new data block, bumps the counter, then unlinks the old block;
+# attached processes keep their mapping until refresh() moves them to the new one.
+# The publisher must keep running (on Windows a block disappears with its last handle).
+#
+# Usage:
+#   python shared_graph.py map.txt --name vrs_graph --landmarks --watch 5
+#
+#   import shared_graph
+#   routing = shared_graph.attach('vrs_graph', 'vehicles.txt')
+#   shared_graph.refresh(routing)   # cheap; re-attaches if a new generation was published
+import argparse
+import json
+import os
+import signal
+import struct
+import sys
+import time
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List
+
+import numpy as np
+
+from route import VehicleRoutingSystem
+from routing_log import get_logger
+
+log = get_logger('shared_graph')
+
+DEFAULT_NAME = 'vrs_graph'
+_FORMAT = 'vrs-shared-1'
+_GENERATION = struct.Struct('<q')
+_HEADER_LENGTH = struct.Struct('<q')
+
+# Blocks created by a publisher in this process (their tracker registration is the publisher's)
+_published = set()
+
+
+def _control_name(name: str) -> str:
+    return f"{name}_ctl"
+
+
+def _block_name(name: str, generation: int) -> str:
+    return f"{name}_g{generation}"
+
+
+class _AttachedBlock(shared_memory.SharedMemory):
+    """Attached block that may still have views into it when the process exits"""
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass  # the OS unmaps it with the process
+
+
+def _open_block(block_name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without letting this process's exit unlink it"""
+    if sys.version_info >= (3, 13):
+        return _AttachedBlock(block_name, track=False)
+    block = _AttachedBlock(block_name)
+    if os.name == 'posix' and block.name not in _published:
+        # Attaching registers the block with this process's resource tracker, which would
+        # unlink it when the agent exits; only the publisher owns it
+        resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+def _graph_payload(routing: VehicleRoutingSystem):
+    """(header, [(offset, bytes-like)], data size) for the arrays and current tables of routing"""
+    arrays = dict(routing._network_sections(),
+                  component_labels=routing.component_labels, component_sizes=routing.component_sizes)
+    tables = []
+    for criterion, entry in routing.landmark_tables.items():
+        if entry['graph_version'] == routing.graph_version:
+            tables.append((f"landmarks/{criterion}", entry['table']))
+    for criterion, entry in routing.all_pairs_tables.items():
+        if entry['graph_version'] == routing.graph_version:
+            tables.append((f"apsp_distances/{criterion}", entry['distances']))
+            tables.append((f"apsp_next_hops/{criterion}", entry['next_hops']))
+
+    chunks = []
+    offset = 0
+    array_layout = []
+    for name, values in arrays.items():
+        typecode = values.format if isinstance(values, memoryview) else values.typecode
+        array_layout.append([name, typecode, offset, len(values)])
+        chunks.append((offset, values))
+        offset += (len(values) * values.itemsize + 7) // 8 * 8
+    table_layout = []
+    for key, table in tables:
+        table = np.ascontiguousarray(table)
+        table_layout.append([key, table.dtype.str, list(table.shape), offset])
+        chunks.append((offset, table))
+        offset += (table.nbytes + 7) // 8 * 8
+
+    header = {
+        'format': _FORMAT,
+        'map_file_path': routing.map_file_path,
+        'arrays': array_layout,
+        'tables': table_layout,
+        'landmarks': list(routing.landmarks)
+    }
+    return header, chunks, offset
+
+
+class GraphPublisher:
+    """Owns the control block and the current data block of one shared graph"""
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self.name = name
+        try:
+            self.control = shared_memory.SharedMemory(_control_name(name), create=True, size=_GENERATION.size)
+            _GENERATION.pack_into(self.control.buf, 0, 0)
+            _published.add(self.control.name)
+        except FileExistsError:
+            # Left behind by a publisher that did not shut down; carry on from its generation
+            self.control = shared_memory.SharedMemory(_control_name(name))
+        self.generation = _GENERATION.unpack_from(self.control.buf, 0)[0]
+        self.block = None
+
+    def publish(self, routing: VehicleRoutingSystem) -> int:
+        """Write routing's graph as the next generation, then retire the previous block"""
+        started = time.perf_counter()
+        header, chunks, data_size = _graph_payload(routing)
+        generation = self.generation + 1
+        header['generation'] = generation
+        header_bytes = json.dumps(header).encode('utf-8')
+        data_start = (_HEADER_LENGTH.size + len(header_bytes) + 7) // 8 * 8
+
+        block = shared_memory.SharedMemory(_block_name(self.name, generation), create=True,
+                                           size=max(1, data_start + data_size))
+        _published.add(block.name)
+        _HEADER_LENGTH.pack_into(block.buf, 0, len(header_bytes))
+        block.buf[_HEADER_LENGTH.size:_HEADER_LENGTH.size + len(header_bytes)] = header_bytes
+        for offset, values in chunks:
+            data = memoryview(values).cast('B')
+            block.buf[data_start + offset:data_start + offset + len(data)] = data
+
+        # Readers only look at the new block once the counter says it is complete
+        _GENERATION.pack_into(self.control.buf, 0, generation)
+        previous, self.block, self.generation = self.block, block, generation
+        if previous is not None:
+            previous.close()
+            previous.unlink()
+            _published.discard(previous.name)
+        log.info("Published %s generation %d: %d nodes, %.1f MB in %.2fs", self.name, generation,
+                 len(routing.node_names), block.size / 1e6, time.perf_counter() - started)
+        return generation
+
+    def close(self):
+        """Unlink the data and control blocks (attached processes keep their current mapping)"""
+        for block in (self.block, self.control):
+            if block is not None:
+                block.close()
+                block.unlink()
+                _published.discard(block.name)
+        self.block = self.control = None
+
+
+class SharedGraphHandle:
+    """An attached process's view of one shared graph: blocks kept open while views exist"""
+
+    def __init__(self, name: str, control: shared_memory.SharedMemory):
+        self.name = name
+        self.control = control
+        self.generation = -1
+        self.block = None
+        self.retired: List[shared_memory.SharedMemory] = []
+
+    def published_generation(self) -> int:
+        return _GENERATION.unpack_from(self.control.buf, 0)[0]
+
+    def open_current(self):
+        """Open the newest data block; returns (block, header)"""
+        while True:
+            generation = self.published_generation()
+            try:
+                block = _open_block(_block_name(self.name, generation))
+            except FileNotFoundError:
+                # Swapped between reading the counter and opening; read it again
+                if self.published_generation() == generation:
+                    raise
+                continue
+            header_length = _HEADER_LENGTH.unpack_from(block.buf, 0)[0]
+            header = json.loads(bytes(block.buf[_HEADER_LENGTH.size:_HEADER_LENGTH.size + header_length]))
+            if header.get('format') != _FORMAT:
+                block.close()
+                raise ValueError(f"Shared graph {self.name} has unknown format {header.get('format')!r}")
+            header['data_start'] = (_HEADER_LENGTH.size + header_length + 7) // 8 * 8
+            return block, header
+
+    def retire(self, block: shared_memory.SharedMemory):
+        """Close an old block, or keep it until the views still pointing into it are gone"""
+        self.retired.append(block)
+        still_open = []
+        for old in self.retired:
+            try:
+                old.close()
+            except BufferError:
+                still_open.append(old)
+        self.retired = still_open
+
+
+def _apply(routing: VehicleRoutingSystem, handle: SharedGraphHandle, block, header: Dict):
+    """Point routing's arrays and tables at a newly opened data block"""
+    view = block.buf.toreadonly()
+    start = header['data_start']
+    arrays = {}
+    for name, typecode, offset, length in header['arrays']:
+        size = length * array(typecode).itemsize
+        arrays[name] = view[start + offset:start + offset + size].cast(typecode)
+    labels = arrays.pop('component_labels')
+    sizes = arrays.pop('component_sizes')
+    routing._apply_network_sections(arrays, labels, sizes)
+
+    routing.landmark_tables = {}
+    routing.all_pairs_tables = {}
+    routing.landmarks = list(header['landmarks'])
+    tables = {}
+    for key, dtype, shape, offset in header['tables']:
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape)) if shape else 1
+        tables[key] = np.frombuffer(view, dtype=dtype, count=count, offset=start + offset).reshape(shape)
+    for key, table in tables.items():
+        kind, criterion = key.split('/', 1)
+        if kind == 'landmarks':
+            routing.landmark_tables[criterion] = {'table': table, 'graph_version': routing.graph_version}
+        elif kind == 'apsp_distances':
+            routing.all_pairs_tables[criterion] = {
+                'distances': table,
+                'next_hops': tables[f"apsp_next_hops/{criterion}"],
+                'files': None,
+                'graph_version': routing.graph_version
+            }
+
+    previous = handle.block
+    handle.block = block
+    handle.generation = header['generation']
+    routing.shared_graph = handle
+    if previous is not None:
+        handle.retire(previous)
+
+
+def attach(name: str = DEFAULT_NAME, vehicles_file_path: str = "vehicles.txt", **kwargs) -> VehicleRoutingSystem:
+    """Routing system over the published shared graph (read-only, zero-copy)
+
+    Extra keyword arguments go to VehicleRoutingSystem (e.g. route_cache_size)
+    """
+    started = time.perf_counter()
+    handle = SharedGraphHandle(name, _open_block(_control_name(name)))
+    block, header = handle.open_current()
+    routing = VehicleRoutingSystem(header['map_file_path'], vehicles_file_path, use_map_cache=False,
+                                   load_network=False, **kwargs)
+    _apply(routing, handle, block, header)
+    log.info("Attached to %s generation %d: %d nodes in %.3fs", name, handle.generation,
+             len(routing.node_names), time.perf_counter() - started)
+    return routing
+
+
+def refresh(routing: VehicleRoutingSystem) -> bool:
+    """Move an attached routing system to the newest generation; True if it changed
+
+    Only reads the generation counter when nothing new was published, so it can be
+    called before every query. Cached routes and trees are invalidated through the
+    graph version. No-op for a routing system that is not attached
+    """
+    handle = routing.shared_graph
+    if handle is None or handle.published_generation() == handle.generation:
+        return False
+    block, header = handle.open_current()
+    _apply(routing, handle, block, header)
+    # Profiles are attached to adjacency slots, which the new generation may renumber
+    if routing.time_profile_path:
+        routing.load_time_profiles(routing.time_profile_path)
+    # The new block carries map weights, so private road-condition overrides are gone
+    routing._reapply_road_conditions()
+    log.info("Switched to %s generation %d", handle.name, handle.generation)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a map as a shared-memory routing graph")
+    parser.add_argument('map_file', help="map.txt to publish")
+    parser.add_argument('--vehicles', default="vehicles.txt", help="vehicles.txt (only read, not shared)")
+    parser.add_argument('--name', default=DEFAULT_NAME, help="shared graph name agents attach to")
+    parser.add_argument('--landmarks', action='store_true', help="also share ALT landmark tables")
+    parser.add_argument('--apsp', action='store_true', help="also share all-pairs tables (small maps only)")
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="poll map.txt and republish as a new generation when it changes")
+    args = parser.parse_args()
+
+    def build():
+        routing = VehicleRoutingSystem(args.map_file, args.vehicles)
+        if args.landmarks:
+            routing.build_landmarks()
+        if args.apsp:
+            routing.build_all_pairs_tables()
+        return routing
+
+    publisher = GraphPublisher(args.name)
+    # Unlink the blocks on a plain kill as well as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        publisher.publish(build())
+        print(f"Publishing {args.map_file} as '{args.name}' - Ctrl+C to stop")
+        mtime = os.stat(args.map_file).st_mtime_ns
+        while True:
+            time.sleep(args.watch or 3600)
+            if args.watch and os.stat(args.map_file).st_mtime_ns != mtime:
+                mtime = os.stat(args.map_file).st_mtime_ns
+                publisher.publish(build())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+
+
+if __name__ == "__main__":
+    main()
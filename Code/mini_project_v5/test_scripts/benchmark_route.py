@@ -0,0 +1,118 @@
+# benchmark_route.py - Query time vs. map size for VehicleRoutingSystem
+# Compares the CSR adjacency index against the old neighbour scan that walked
+# every node's connection list on each Dijkstra relaxation, then compares node
+# expansions for each search method on the same grids.
+import heapq
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Import the routing system from mini_project_v5, not the older copy in test_scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route import VehicleRoutingSystem
+import map_generator
+import routing_log
+
+# === Config ===
+GRID_SIZES = [100, 400, 900, 2025, 3600]   # nodes per generated grid map
+QUERIES_PER_SIZE = 20
+LEGACY_MAX_NODES = 2500              # the old scan is too slow to time beyond this
+EXPANSION_METHODS = ('dijkstra', 'astar', 'bidirectional_astar', 'alt', 'chains')
+SEED = 42
+
+
+def legacy_dijkstra(routing: VehicleRoutingSystem, start_node: str, end_node: str, weight_type: str):
+    """Dijkstra with the pre-index neighbour lookup (full scan for reverse edges)"""
+    def legacy_neighbors(node):
+        neighbors = list(routing.connections[node])
+        for other_node, connections in routing.connections.items():
+            if node in connections and other_node not in neighbors:
+                neighbors.append(other_node)
+        return neighbors
+
+    distances = {node: float('inf') for node in routing.nodes}
+    distances[start_node] = 0
+    pq = [(0, start_node)]
+    visited = set()
+    while pq:
+        current_distance, current_node = heapq.heappop(pq)
+        if current_node in visited:
+            continue
+        visited.add(current_node)
+        if current_node == end_node:
+            break
+        for neighbor in legacy_neighbors(current_node):
+            if neighbor not in visited and neighbor in routing.nodes:
+                distance = current_distance + routing.get_edge_weight(current_node, neighbor, weight_type)
+                if distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    heapq.heappush(pq, (distance, neighbor))
+    return distances[end_node]
+
+
+def time_queries(query_fn, queries):
+    """Return mean seconds per query"""
+    start = time.perf_counter()
+    for start_node, end_node in queries:
+        query_fn(start_node, end_node)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def expansions_per_query(routing: VehicleRoutingSystem, queries, method: str, criterion: str):
+    """Return mean nodes expanded per query for one search method"""
+    routing.reset_search_stats()
+    for start_node, end_node in queries:
+        routing.shortest_path(start_node, end_node, criterion, method)
+    return routing.search_stats['expanded_nodes'] / len(queries)
+
+
+def main():
+    expansion_rows = []
+    # The loader logs each load step through routing_log (to stderr); keep the output to the tables
+    routing_log.configure(level='WARNING')
+
+    print(f"{'Nodes':>8} {'Edges':>8} {'Before (ms)':>12} {'After (ms)':>12} {'Speed-up':>10}")
+    print("-" * 54)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in GRID_SIZES:
+            map_path = os.path.join(directory, f"grid_{size}.txt")
+            vehicles_path = os.path.join(directory, f"vehicles_{size}.txt")
+            map_generator.generate('grid', size, 3, map_path, vehicles_path, SEED)
+            routing = VehicleRoutingSystem(map_path, vehicles_path)
+            routing.build_landmarks()
+            routing.build_chain_contraction()
+
+            rnd = random.Random(SEED)
+            names = list(routing.nodes.keys())
+            queries = [(rnd.choice(names), rnd.choice(names)) for _ in range(QUERIES_PER_SIZE)]
+
+            after = time_queries(lambda s, t: routing.dijkstra_shortest_path(s, t, 'distance'), queries)
+
+            if len(names) <= LEGACY_MAX_NODES:
+                before = time_queries(lambda s, t: legacy_dijkstra(routing, s, t, 'distance'), queries)
+                before_str = f"{before * 1000:12.2f}"
+                speedup_str = f"{before / after:9.1f}x"
+            else:
+                before_str = f"{'skipped':>12}"
+                speedup_str = f"{'-':>10}"
+
+            print(f"{len(names):>8} {len(routing.edge_weights):>8} {before_str} {after * 1000:12.2f} {speedup_str}")
+
+            for criterion in ('distance', 'carbon'):
+                counts = [expansions_per_query(routing, queries, method, criterion)
+                          for method in EXPANSION_METHODS]
+                expansion_rows.append((len(names), criterion, counts))
+
+    print("\nMean nodes expanded per query")
+    header = ''.join(f"{method:>22}" for method in EXPANSION_METHODS)
+    print(f"{'Nodes':>8} {'Criterion':>10}{header}")
+    print("-" * (19 + 22 * len(EXPANSION_METHODS)))
+    for node_count, criterion, counts in expansion_rows:
+        print(f"{node_count:>8} {criterion:>10}" + ''.join(f"{count:>22.1f}" for count in counts))
+
+
+if __name__ == "__main__":
+    main()
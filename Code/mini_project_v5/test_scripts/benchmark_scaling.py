@@ -0,0 +1,139 @@
+# benchmark_scaling.py - Load time, memory and query latency vs. map size
+# Generates maps with map_generator.py for each topology and size, then measures each
+# one in a fresh child process so peak RSS is not polluted by earlier sizes.
+#
+# Usage:
+#   python benchmark_scaling.py
+#   python benchmark_scaling.py --sizes 1000 10000 100000 1000000 --topologies grid geometric --json scaling.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import from mini_project_v5, not the older copies in test_scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import map_generator
+
+# === Config ===
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+DEFAULT_TOPOLOGIES = list(map_generator.TOPOLOGIES)
+QUERIES = 50
+VEHICLES = 10
+SEED = 42
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    # VmHWM is reset on exec; ru_maxrss can carry over the parent's peak on Linux
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(map_path: str, vehicles_path: str, queries: int, seed: int):
+    """Child process: time a cold parse, a compiled-map load and point-to-point queries"""
+    from route import VehicleRoutingSystem
+
+    cache_path = map_path + '.vrsmap'
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        VehicleRoutingSystem(map_path, vehicles_path)
+        parse_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        routing = VehicleRoutingSystem(map_path, vehicles_path)
+        compiled_load_time = time.perf_counter() - started
+
+    rnd = random.Random(seed)
+    names = routing.node_names
+    latencies = []
+    for _ in range(queries):
+        start_node, end_node = rnd.choice(names), rnd.choice(names)
+        started = time.perf_counter()
+        routing.shortest_path(start_node, end_node, 'distance')
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        'nodes': len(names),
+        'edges': len(routing.adj_targets) // 2,
+        'parse_s': parse_time,
+        'compiled_load_s': compiled_load_time,
+        'query_mean_ms': statistics.mean(latencies) * 1000,
+        'query_median_ms': statistics.median(latencies) * 1000,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run_child(map_path: str, vehicles_path: str, queries: int, seed: int):
+    """Run measure() in a fresh interpreter and return its result"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', map_path, vehicles_path,
+         '--queries', str(queries), '--seed', str(seed)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load time, memory and query latency vs. map size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--topologies', nargs='+', choices=map_generator.TOPOLOGIES, default=DEFAULT_TOPOLOGIES)
+    parser.add_argument('--queries', type=int, default=QUERIES)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--child', nargs=2, metavar=('MAP', 'VEHICLES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.queries, args.seed)))
+        return
+
+    print(f"{'Topology':<10} {'Nodes':>9} {'Edges':>9} {'Parse (s)':>10} {'Compiled (s)':>13} "
+          f"{'Query mean (ms)':>16} {'Query p50 (ms)':>15} {'Peak RSS (MB)':>14}")
+    print("-" * 104)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for topology in args.topologies:
+            for size in args.sizes:
+                map_path = os.path.join(directory, f"{topology}_{size}.txt")
+                vehicles_path = os.path.join(directory, f"{topology}_{size}_vehicles.txt")
+                map_generator.generate(topology, size, VEHICLES, map_path, vehicles_path, args.seed)
+
+                result = dict(run_child(map_path, vehicles_path, args.queries, args.seed), topology=topology)
+                results.append(result)
+
+                rss = f"{result['peak_rss_mb']:14.1f}" if result['peak_rss_mb'] is not None else f"{'n/a':>14}"
+                print(f"{topology:<10} {result['nodes']:>9} {result['edges']:>9} {result['parse_s']:>10.3f} "
+                      f"{result['compiled_load_s']:>13.3f} {result['query_mean_ms']:>16.2f} "
+                      f"{result['query_median_ms']:>15.2f} {rss}")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# benchmark_suite.py - Latency, throughput, memory and expansions for every route.py query API
+# Each (topology, size) runs in a fresh child process on a generated map with random and
+# worst-case query sets. Results are written to a JSON baseline; pass --compare with an
+# older baseline to flag regressions between versions.
+#
+# Usage:
+#   python benchmark_suite.py --json baseline.json
+#   python benchmark_suite.py --sizes 1000 10000 --json new.json --compare baseline.json
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Import from mini_project_v5, not the older copies in test_scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import map_generator
+from benchmark_scaling import peak_rss_mb
+
+# === Config ===
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_TOPOLOGIES = ['grid', 'geometric']
+QUERIES = 50
+VEHICLES = 10
+SEED = 42
+REGRESSION_THRESHOLD = 1.25   # flag p50 slow-downs above 25%...
+REGRESSION_MIN_MS = 0.5       # ...that also cost at least this much, so sub-ms noise is ignored
+
+# Query APIs under test: name -> callable(routing, start_node, end_node, vehicle_id)
+APIS = {
+    'dijkstra_shortest_path': lambda routing, start, end, vehicle_id: routing.dijkstra_shortest_path(start, end, 'distance'),
+    'find_all_optimal_paths': lambda routing, start, end, vehicle_id: routing.find_all_optimal_paths(start, end, vehicle_id),
+    'find_optimal_path_for_vehicle': lambda routing, start, end, vehicle_id: routing.find_optimal_path_for_vehicle(
+        vehicle_id, end, priority=1, override_start=start),
+    'get_all_vehicle_times_for_route': lambda routing, start, end, vehicle_id: routing.get_all_vehicle_times_for_route(start, end),
+    'get_fleet_routes_to_destination': lambda routing, start, end, vehicle_id: routing.get_fleet_routes_to_destination(end),
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def build_query_sets(routing, count: int, seed: int):
+    """Random pairs, plus worst-case pairs: double-sweep far pairs and unreachable pairs"""
+    rnd = random.Random(seed)
+    names = routing.node_names
+    random_pairs = [(rnd.choice(names), rnd.choice(names)) for _ in range(count)]
+
+    # Double sweep: farthest node from a random node, then farthest from that one
+    worst_pairs = []
+    for _ in range(max(1, count // 10)):
+        distances, _ = routing._dijkstra(routing.node_index[rnd.choice(names)], -1, 'distance')
+        reachable = [i for i, d in enumerate(distances) if d != float('inf')]
+        first = max(reachable, key=distances.__getitem__)
+        distances, _ = routing._dijkstra(first, -1, 'distance')
+        reachable = [i for i, d in enumerate(distances) if d != float('inf')]
+        second = max(reachable, key=distances.__getitem__)
+        worst_pairs.append((names[first], names[second]))
+
+        # A node outside the first node's component makes an unreachable query
+        unreachable = [i for i, d in enumerate(distances) if d == float('inf')]
+        if unreachable:
+            worst_pairs.append((names[first], names[rnd.choice(unreachable)]))
+
+    worst_pairs = (worst_pairs * (count // len(worst_pairs) + 1))[:count]
+    return {'random': random_pairs, 'worst_case': worst_pairs}
+
+
+def measure(map_path: str, vehicles_path: str, queries: int, seed: int, search_method: str):
+    """Child process: run every API over every query set, return one record per combination"""
+    from route import VehicleRoutingSystem
+
+    devnull = open(os.devnull, 'w')
+    with contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        # Route cache off so repeated queries measure the search, not the cache
+        routing = VehicleRoutingSystem(map_path, vehicles_path, route_cache_size=0)
+        load_time = time.perf_counter() - started
+        routing.set_search_method(search_method)
+        query_sets = build_query_sets(routing, queries, seed)
+
+    vehicle_ids = list(routing.vehicles.keys())
+    records = []
+    for api_name, api in APIS.items():
+        for set_name, pairs in query_sets.items():
+            latencies = []
+            routing.reset_search_stats()
+            with contextlib.redirect_stdout(devnull):
+                started_all = time.perf_counter()
+                for i, (start_node, end_node) in enumerate(pairs):
+                    started = time.perf_counter()
+                    api(routing, start_node, end_node, vehicle_ids[i % len(vehicle_ids)])
+                    latencies.append(time.perf_counter() - started)
+                elapsed = time.perf_counter() - started_all
+
+            latencies.sort()
+            records.append({
+                'api': api_name,
+                'query_set': set_name,
+                'queries': len(pairs),
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'throughput_qps': len(pairs) / elapsed if elapsed > 0 else float('inf'),
+                'expanded_per_query': routing.search_stats['expanded_nodes'] / len(pairs)
+            })
+
+    devnull.close()
+    return {
+        'nodes': len(routing.node_names),
+        'edges': len(routing.adj_targets) // 2,
+        'load_s': load_time,
+        'peak_rss_mb': peak_rss_mb(),
+        'records': records
+    }
+
+
+def run_child(map_path: str, vehicles_path: str, queries: int, seed: int, search_method: str):
+    """Run measure() in a fresh interpreter and return its result"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', map_path, vehicles_path,
+         '--queries', str(queries), '--seed', str(seed), '--method', search_method],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def result_key(result):
+    return (result['topology'], result['size'], result['api'], result['query_set'])
+
+
+def compare(results, baseline_path: str, threshold: float) -> int:
+    """Print p50 ratios against an older baseline; returns the number of regressions"""
+    with open(baseline_path) as file:
+        baseline = {result_key(result): result for result in json.load(file)['results']}
+
+    print(f"\nComparison with {baseline_path} (p50 new / old, flagged above {threshold:.2f}x)")
+    regressions = 0
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None or old['p50_ms'] <= 0:
+            continue
+        ratio = result['p50_ms'] / old['p50_ms']
+        slower = result['p50_ms'] - old['p50_ms'] >= REGRESSION_MIN_MS
+        flag = "  REGRESSION" if ratio > threshold and slower else ""
+        regressions += bool(flag)
+        print(f"  {result['topology']:<10} {result['size']:>8} {result['api']:<32} {result['query_set']:<11} "
+              f"{old['p50_ms']:>9.2f} -> {result['p50_ms']:>9.2f} ms ({ratio:4.2f}x){flag}")
+    print(f"{regressions} regression(s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every route.py query API on generated maps")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--topologies', nargs='+', choices=map_generator.TOPOLOGIES, default=DEFAULT_TOPOLOGIES)
+    parser.add_argument('--queries', type=int, default=QUERIES, help="queries per query set")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--method', default='dijkstra', help="search method passed to set_search_method")
+    parser.add_argument('--json', help="write results to this baseline file")
+    parser.add_argument('--compare', help="older baseline file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--child', nargs=2, metavar=('MAP', 'VEHICLES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.queries, args.seed, args.method)))
+        return
+
+    print(f"{'Topology':<10} {'Nodes':>8} {'API':<32} {'Queries':<11} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'q/s':>9} {'Expanded':>10} {'RSS MB':>8}")
+    print("-" * 124)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for topology in args.topologies:
+            for size in args.sizes:
+                map_path = os.path.join(directory, f"{topology}_{size}.txt")
+                vehicles_path = os.path.join(directory, f"{topology}_{size}_vehicles.txt")
+                map_generator.generate(topology, size, VEHICLES, map_path, vehicles_path, args.seed)
+
+                measured = run_child(map_path, vehicles_path, args.queries, args.seed, args.method)
+                rss = measured['peak_rss_mb']
+                for record in measured['records']:
+                    result = dict(record, topology=topology, size=size, nodes=measured['nodes'],
+                                  edges=measured['edges'], load_s=measured['load_s'], peak_rss_mb=rss)
+                    results.append(result)
+                    print(f"{topology:<10} {measured['nodes']:>8} {record['api']:<32} {record['query_set']:<11} "
+                          f"{record['p50_ms']:>9.2f} {record['p95_ms']:>9.2f} {record['p99_ms']:>9.2f} "
+                          f"{record['throughput_qps']:>9.1f} {record['expanded_per_query']:>10.1f} "
+                          f"{rss if rss is not None else float('nan'):>8.1f}")
+
+    if args.json:
+        baseline = {
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'search_method': args.method,
+                'queries': args.queries,
+                'seed': args.seed
+            },
+            'results': results
+        }
+        with open(args.json, 'w') as file:
+            json.dump(baseline, file, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# vehicle_routing.py - Route planning for the vehicle agents
+# Both 02_vehicle_agent*.py entry points plan through a VehicleRouter: it owns the agent's
+# VehicleRoutingSystem (a private copy of the map, or an attachment to a graph published
+# by shared_graph.py), searches routes and k-shortest alternatives locally or on a
+# routing_server.py process, and encodes planned paths for protocol messages. refresh()
+# keeps the local graph current: it follows republished shared graphs and re-reads the
+# road conditions file (closures and weight overrides, see route.iter_road_conditions_file)
+# whenever it changes. The settings below apply to every vehicle agent.
+#
+# Usage:
+#   from vehicle_routing import VehicleRouter
+#   router = VehicleRouter(vehicle_id, priority, MAP_FILE, VEHICLES_FILE, PROFILE_FILE,
+#                          ROAD_CONDITIONS_FILE)
+#   router.refresh()   # cheap; call before relying on current edge weights
+#   route = await router.find_route(destination, start=current_node)
+#   alternatives = await router.find_alternatives(current_node, destination)
+import os
+from typing import Dict, List, Optional
+
+import shared_graph
+from route import MapParseError, VehicleRoutingSystem
+from routing_log import get_logger
+from routing_server import RoutingClient, RoutingServerError
+
+log = get_logger('vehicle')
+
+# Shared-memory graph published by `python shared_graph.py MAP_FILE --name vrs_graph`;
+# None = every agent loads MAP_FILE itself
+SHARED_GRAPH: Optional[str] = None
+# Routing server started with `python routing_server.py MAP_FILE VEHICLES_FILE` ('host:port'
+# or 'unix:/path'); routes and alternatives are then searched there. None = search locally
+ROUTING_SERVER: Optional[str] = None
+# Send planned paths to the manager as encoded node IDs (planned_path_ids) instead of name
+# lists. Opt-in: every manager must load the same MAP_FILE (and decode planned_path_ids),
+# otherwise it cannot recover the path
+COMPACT_PATHS = False
+# K-shortest alternatives cached at CFP time, so a closed road (infinite distance weight)
+# can be bypassed without another search
+ALTERNATIVE_PATHS = 3
+ALTERNATIVES_TIME_BUDGET = 0.05  # seconds per CFP
+PRIORITY_CRITERIA = {1: 'distance', 2: 'carbon', 3: 'cost', 4: 'time'}
+
+
+class VehicleRouter:
+    """Routing for one vehicle agent"""
+
+    def __init__(self, vehicle_id: int, priority: int, map_file: str, vehicles_file: str,
+                 profile_file: Optional[str] = None, road_conditions_file: Optional[str] = None):
+        self.vehicle_id = vehicle_id
+        self.priority = priority
+        if SHARED_GRAPH:
+            self.routing_system = shared_graph.attach(SHARED_GRAPH, vehicles_file)
+        else:
+            self.routing_system = VehicleRoutingSystem(map_file, vehicles_file)
+        if profile_file and os.path.exists(profile_file):
+            self.routing_system.load_time_profiles(profile_file)
+        self.client: Optional[RoutingClient] = None
+        # Road conditions are re-read whenever the file's mtime changes (None = file missing)
+        self.road_conditions_file = road_conditions_file
+        self._road_conditions_mtime = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Pick up a newly published shared graph and road condition edits; True when the graph changed
+
+        Local searches and the closed-road check see the road conditions; a ROUTING_SERVER
+        process only sees the map it loaded.
+        """
+        version = self.routing_system.graph_version
+        shared_graph.refresh(self.routing_system)
+        if self.road_conditions_file:
+            try:
+                mtime = os.stat(self.road_conditions_file).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._road_conditions_mtime:
+                self._road_conditions_mtime = mtime
+                try:
+                    if mtime is None:
+                        self.routing_system.clear_road_conditions()
+                    else:
+                        self.routing_system.load_road_conditions(self.road_conditions_file)
+                except (OSError, MapParseError) as e:
+                    log.warning("[Vehicle %s] Keeping previous road conditions: %s", self.vehicle_id, e)
+        return self.routing_system.graph_version != version
+
+    def departure_time(self) -> Optional[float]:
+        """Current time of day on the profile clock, or None when no time profiles are loaded"""
+        if self.routing_system.time_profiles is None:
+            return None
+        return self.routing_system.profile_clock()
+
+    def route_criterion(self, objective_weights: Optional[Dict[str, float]] = None) -> str:
+        """Criterion for alternatives: the task's objective key, or the one the priority optimises"""
+        if objective_weights:
+            return self.routing_system.objective_key(objective_weights, self.vehicle_id)
+        return PRIORITY_CRITERIA.get(self.priority, 'distance')
+
+    def encode_message_path(self, path: Optional[List[str]]):
+        """(planned_path, planned_path_ids) message fields for path"""
+        if path and COMPACT_PATHS:
+            return None, self.routing_system.encode_path(path)
+        return path, None
+
+    async def _server(self) -> Optional[RoutingClient]:
+        """Connection to ROUTING_SERVER (None when unset or unreachable, so routing stays local)"""
+        if not ROUTING_SERVER:
+            return None
+        if self.client is None or self.client.receiver.done():
+            try:
+                self.client = await RoutingClient.connect(ROUTING_SERVER)
+            except OSError as e:
+                log.warning("[Vehicle %s] Routing server %s unavailable, routing locally: %s",
+                            self.vehicle_id, ROUTING_SERVER, e)
+                self.client = None
+        return self.client
+
+    async def find_route(self, destination: str, objective_weights: Optional[Dict[str, float]] = None,
+                         start: Optional[str] = None) -> Optional[Dict]:
+        """Best path to destination for the task's objective weights, or for the priority without them
+
+        start is the vehicle's current node; the routing server needs it because it does not
+        track vehicle locations.
+        """
+        client = await self._server()
+        if client:
+            try:
+                return await client.vehicle_route(self.vehicle_id, destination, start=start,
+                                                  priority=self.priority, objective_weights=objective_weights,
+                                                  departure_time=None if objective_weights else self.departure_time())
+            except RoutingServerError as e:
+                log.warning("[Vehicle %s] Routing server: %s", self.vehicle_id, e)
+                return None
+            except ConnectionError as e:
+                log.warning("[Vehicle %s] Routing server connection lost, routing locally: %s", self.vehicle_id, e)
+        if objective_weights:
+            return self.routing_system.find_weighted_path_for_vehicle(self.vehicle_id, destination, objective_weights)
+        return self.routing_system.find_optimal_path_for_vehicle(
+            self.vehicle_id,
+            destination,
+            self.priority,
+            departure_time=self.departure_time()
+        )
+
+    async def find_alternatives(self, start: str, destination: str,
+                                objective_weights: Optional[Dict[str, float]] = None) -> List[List[str]]:
+        """Up to ALTERNATIVE_PATHS paths from start to destination, kept for rerouting around closed roads"""
+        criterion = self.route_criterion(objective_weights)
+        client = await self._server()
+        if client:
+            try:
+                alternatives = await client.k_shortest_paths(start, destination, ALTERNATIVE_PATHS,
+                                                             criterion, time_budget=ALTERNATIVES_TIME_BUDGET)
+                return [path for path, _ in alternatives]
+            except (RoutingServerError, ConnectionError) as e:
+                log.warning("[Vehicle %s] Routing server alternatives failed: %s", self.vehicle_id, e)
+        alternatives = self.routing_system.k_shortest_paths(start, destination, ALTERNATIVE_PATHS,
+                                                            criterion, time_budget=ALTERNATIVES_TIME_BUDGET)
+        return [path for path, _ in alternatives]